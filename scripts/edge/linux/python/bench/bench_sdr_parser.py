@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Micro-Benchmark für den SDR-Parser von get_ipmi_data.py
+
+Vergleicht parse_sdr() (ein Durchlauf, tabellengesteuert) mit den bisherigen
+parse_*-Funktionen bzw. classify_sdr_rows() + parse_* auf synthetischen
+ipmitool-Ausgaben mit mehreren tausend Zeilen und prüft, dass beide
+identische Dokumente liefern.
+
+Verwendung:
+    python3 bench/bench_sdr_parser.py --rows 5000 --repeat 20
+"""
+
+import os
+import sys
+import argparse
+import timeit
+from typing import Any, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fake_ipmitool import temperature_rows, fan_rows, power_rows, other_rows
+from get_ipmi_data import (FAN_ENTITY_IDS, POWER_KEYWORDS, parse_sdr,
+                           parse_temperature_data, parse_fan_data, parse_power_data)
+
+# ---- Bisherige Implementierung (unverändert kopiert, nur umbenannt) ----
+def legacy_parse_temperature_data(output: str) -> List[Dict[str, Any]]:
+    """Parst Temperatur-Daten (Stand vor parse_sdr)"""
+    temps = []
+    if not output:
+        return temps
+    
+    for line in output.split('\n'):
+        if '|' not in line:
+            continue
+            
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) < 5:
+            continue
+            
+        sensor_name = parts[0]
+        status = parts[2]
+        reading = parts[4]
+        
+        if 'degrees C' in reading:
+            try:
+                temp_value = float(reading.replace(' degrees C', ''))
+                temps.append({
+                    'name': sensor_name,
+                    'value': temp_value,
+                    'status': status,
+                    'unit': 'celsius'
+                })
+            except ValueError:
+                continue
+    
+    return temps
+
+def legacy_parse_fan_data(output: str) -> List[Dict[str, Any]]:
+    """Parst Fan-Daten"""
+    fans = []
+    if not output:
+        return fans
+    
+    for line in output.split('\n'):
+        if '|' not in line:
+            continue
+            
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) < 5:
+            continue
+            
+        sensor_name = parts[0]
+        status = parts[2]
+        reading = parts[4]
+        
+        if 'percent' in reading:
+            try:
+                duty_value = float(reading.replace(' percent', ''))
+                fans.append({
+                    'name': sensor_name,
+                    'value': duty_value,
+                    'status': status,
+                    'unit': 'percent'
+                })
+            except ValueError:
+                continue
+    
+    return fans
+
+def legacy_parse_power_data(output: str, debug: bool = False) -> List[Dict[str, Any]]:
+    """Parst Power-Daten aus sdr type power supply"""
+    power_data = []
+    if not output:
+        return power_data
+    
+    if debug:
+        print(f"[DEBUG] Parse Power Data - Input: {len(output)} Zeichen")
+        print(f"[DEBUG] Erste 200 Zeichen: {output[:200]}")
+    
+    for line in output.split('\n'):
+        if '|' not in line:
+            continue
+            
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) < 5:
+            continue
+            
+        # Korrekte Spalten-Aufteilung:
+        # Spalte 0: Sensor Name (Power Supply 1)
+        # Spalte 1: Laufzeit in Stunden (41h) 
+        # Spalte 2: Status (ok)
+        # Spalte 3: Wert 10.1 (unbekannte Bedeutung)
+        # Spalte 4: Watts + Presence (60 Watts, Presence detected)
+        sensor_name = parts[0]      # Power Supply 1
+        runtime_hours = parts[1]    # 41h (Laufzeit in Stunden)
+        status = parts[2]           # ok
+        value_unknown = parts[3]    # 10.1 (unbekannte Bedeutung)
+        reading = parts[4]          # 60 Watts, Presence detected
+        
+        if debug:
+            print(f"[DEBUG] Sensor: '{sensor_name}' | Runtime: '{runtime_hours}' | Status: '{status}' | Value: '{value_unknown}' | Reading: '{reading}'")
+        
+        # Nur Power-Sensoren verarbeiten (PS, Power Supply, Power Supplies)
+        has_power_keyword = any(keyword in sensor_name.lower() for keyword in ['ps ', 'power supply', 'power supplies'])
+        has_watts = 'watts' in reading.lower()
+        has_presence = 'presence' in reading.lower()
+        has_redundant = 'redundant' in reading.lower()
+        
+        if debug:
+            print(f"[DEBUG] Has power keyword: {has_power_keyword}, Has watts: {has_watts}, Has presence: {has_presence}, Has redundant: {has_redundant}")
+        
+        if has_power_keyword and (has_watts or has_presence or has_redundant):
+            sensor_data = {
+                'name': sensor_name,
+                'runtime_hours': runtime_hours,    # 41h, 42h, etc.
+                'status': status,
+                'value_unknown': value_unknown,    # 10.1, 10.2, etc. (unbekannte Bedeutung)
+                'raw_reading': reading
+            }
+            
+            # Watt-Werte extrahieren
+            if has_watts:
+                try:
+                    power_value = float(reading.replace(' Watts', '').split(',')[0])
+                    sensor_data['value'] = power_value
+                    sensor_data['unit'] = 'watts'
+                except ValueError:
+                    pass
+            
+            # Presence-Status extrahieren
+            if has_presence:
+                if 'presence detected' in reading.lower():
+                    sensor_data['presence'] = 'detected'
+                elif 'device present' in reading.lower():
+                    sensor_data['presence'] = 'present'
+                else:
+                    sensor_data['presence'] = 'unknown'
+            
+            # Redundancy-Status extrahieren
+            if has_redundant:
+                if 'fully redundant' in reading.lower():
+                    sensor_data['redundancy'] = 'fully_redundant'
+                else:
+                    sensor_data['redundancy'] = reading.lower()
+            
+            power_data.append(sensor_data)
+            
+            if debug:
+                print(f"[DEBUG] ✓ Power sensor gefunden: {sensor_name} = {sensor_data}")
+    
+    if debug:
+        print(f"[DEBUG] Gefundene Power-Sensoren: {len(power_data)}")
+    
+    return power_data
+
+def legacy_classify_sdr_rows(output: str) -> Dict[str, str]:
+    """Verteilt die Zeilen einer "sdr elist"-Ausgabe auf temp/fan/power
+    
+    Die Zeilen haben dasselbe Format wie bei "sdr type ...", daher bekommen
+    die bestehenden parse_*-Funktionen die Zeilen ihres Typs unverändert.
+    """
+    routed: Dict[str, List[str]] = {'temp': [], 'fan': [], 'power': []}
+    if not output:
+        return {data_type: '' for data_type in routed}
+    
+    for line in output.split('\n'):
+        if '|' not in line:
+            continue
+        parts = line.split('|')
+        if len(parts) < 5:
+            continue
+        
+        sensor_name = parts[0].strip().lower()
+        entity = parts[3].strip().split('.')[0]
+        reading = parts[4]
+        
+        if 'degrees C' in reading:
+            routed['temp'].append(line)
+        elif any(keyword in sensor_name for keyword in POWER_KEYWORDS):
+            routed['power'].append(line)
+        elif entity in FAN_ENTITY_IDS or 'fan' in sensor_name:
+            routed['fan'].append(line)
+    
+    return {data_type: '\n'.join(lines) for data_type, lines in routed.items()}
+
+# ---- Synthetische Ausgaben ----
+EDGE_CASE_ROWS = [
+    "CPU2 Temp        | 0Fh | cr  |  3.2 | 97 degrees C",
+    "Board Temp       | 10h | ok  |  7.1 |  -3.5 degrees C ",
+    "Broken Temp      | 11h | ok  |  7.1 | n/a degrees C",
+    "Fan Redundancy   | 30h | ok  | 29.1 | Fully Redundant",
+    "FAN 7 DUTY       | 32h | lnc | 30.1 | 12 percent",
+    "PS2 Input Power  | 44h | ok  | 10.2 | 120 Watts",
+    "PS 3 Status      | 45h | ok  | 10.3 | Device Present",
+    "Power Supplies   | 46h | ok  | 10.1 | Redundancy Lost",
+    "PS 4 Status      | 47h | nc  | 10.4 | 0 Watts, Presence detected, Power Supply AC lost",
+    "no pipes in this line",
+    "Short | row | only",
+    ""
+]
+
+def synthetic_outputs(rows: int) -> Dict[str, str]:
+    """sdr type ... und sdr elist mit jeweils ~rows Zeilen pro Typ"""
+    count = max(1, rows)
+    return {
+        'temp': "\n".join(temperature_rows(count) + EDGE_CASE_ROWS),
+        'fan': "\n".join(fan_rows(count) + EDGE_CASE_ROWS),
+        'power': "\n".join(power_rows(count) + EDGE_CASE_ROWS),
+        'elist': "\n".join(temperature_rows(count) + fan_rows(count) + power_rows(count)
+                           + other_rows(count) + EDGE_CASE_ROWS)
+    }
+
+def legacy_elist(output: str) -> Dict[str, List[Dict[str, Any]]]:
+    routed = legacy_classify_sdr_rows(output)
+    return {
+        'temp': legacy_parse_temperature_data(routed['temp']),
+        'fan': legacy_parse_fan_data(routed['fan']),
+        'power': legacy_parse_power_data(routed['power'])
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-Benchmark SDR-Parser (alt vs. parse_sdr)")
+    parser.add_argument("--rows", type=int, default=5000, help="Zeilen pro Sensortyp")
+    parser.add_argument("--repeat", type=int, default=20, help="Wiederholungen pro Messung")
+    args = parser.parse_args(argv)
+
+    outputs = synthetic_outputs(args.rows)
+    cases = [
+        ("sdr type temperature", 'temp', lambda: legacy_parse_temperature_data(outputs['temp']),
+         lambda: parse_temperature_data(outputs['temp'])),
+        ("sdr type fan", 'fan', lambda: legacy_parse_fan_data(outputs['fan']),
+         lambda: parse_fan_data(outputs['fan'])),
+        ("sdr type power supply", 'power', lambda: legacy_parse_power_data(outputs['power']),
+         lambda: parse_power_data(outputs['power'])),
+        ("sdr elist (alle Typen)", 'elist', lambda: legacy_elist(outputs['elist']),
+         lambda: parse_sdr(outputs['elist']))
+    ]
+
+    failed = False
+    print(f"[*] {args.rows} Zeilen pro Typ, {args.repeat} Wiederholungen (beste Zeit)")
+    for label, key, old, new in cases:
+        if old() != new():
+            print(f"[!] {label}: Ausgaben unterscheiden sich!")
+            failed = True
+            continue
+        old_time = min(timeit.repeat(old, number=1, repeat=args.repeat))
+        new_time = min(timeit.repeat(new, number=1, repeat=args.repeat))
+        lines = outputs[key].count("\n") + 1
+        print(f"[✓] {label:<24} alt {old_time * 1000:8.2f} ms  neu {new_time * 1000:8.2f} ms  "
+              f"Faktor {old_time / new_time:4.2f}x  ({lines / new_time / 1e6:.2f} Mio. Zeilen/s)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
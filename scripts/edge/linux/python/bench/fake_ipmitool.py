@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Stand-in für ipmitool (Benchmark, komplett offline)
+Liefert vorgefertigte "sdr type ..." / "sdr elist" Ausgaben mit
+konfigurierbarer Latenz und Fehlerquote
+
+Verwendung: IPMI_COMMAND=/pfad/zu/bench/fake_ipmitool.py
+
+Umgebungsvariablen:
+    BENCH_IPMI_LATENCY    Antwortzeit pro Aufruf in Sekunden (Default 0.3)
+    BENCH_IPMI_FAIL_RATE  Anteil fehlschlagender Aufrufe 0..1 (Default 0)
+    BENCH_IPMI_SENSORS    Anzahl Sensoren pro Typ (Default 4)
+    BENCH_IPMI_SDR_WALK   Zusätzliche Zeit für den SDR-Repository-Walk, entfällt
+                          mit "-S <dump>" (Default 0.2)
+"""
+
+import os
+import sys
+import time
+import random
+
+LATENCY = float(os.getenv("BENCH_IPMI_LATENCY", "0.3"))
+FAIL_RATE = float(os.getenv("BENCH_IPMI_FAIL_RATE", "0"))
+SENSORS = int(os.getenv("BENCH_IPMI_SENSORS", "4"))
+SDR_WALK = float(os.getenv("BENCH_IPMI_SDR_WALK", "0.2"))
+
+def temperature_rows(count: int) -> list:
+    rows = []
+    for i in range(count):
+        if i % 10 == 9:
+            rows.append(f"Temp {i:<11} | {i % 256:02X}h | ns  |  3.{i % 8} | Disabled")
+        else:
+            rows.append(f"Temp {i:<11} | {i % 256:02X}h | ok  |  3.{i % 8} | {20 + i % 50} degrees C")
+    return rows
+
+def fan_rows(count: int) -> list:
+    return [f"Fan{i:<13} | {(0x30 + i) % 256:02X}h | ok  | 29.{i % 8} | {20 + (i * 7) % 70}.{i % 100:02d} percent"
+            for i in range(count)]
+
+def power_rows(count: int) -> list:
+    rows = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            rows.append(f"PS {i} Status{'':<7} | {(0x40 + i) % 256:02X}h | ok  | 10.1 | {50 + i % 400} Watts, Presence detected")
+        elif kind == 1:
+            rows.append(f"Power Supply {i:<3} | {(0x40 + i) % 256:02X}h | ok  | 10.2 | Presence detected")
+        else:
+            rows.append(f"PS Redundancy {i:<2} | {(0x40 + i) % 256:02X}h | ok  | 10.1 | Fully Redundant")
+    return rows
+
+def other_rows(count: int) -> list:
+    return [f"Voltage {i:<8} | {(0x60 + i) % 256:02X}h | ok  | 10.1 | {230 + i % 5} Volts" for i in range(count)]
+
+def elist_output(count: int) -> str:
+    # Fan-Zeilen im elist mit Entity-ID 29.x (wie bei echten BMCs)
+    return "\n".join(temperature_rows(count) + fan_rows(count) + power_rows(count) + other_rows(count))
+
+def main(argv) -> int:
+    time.sleep(LATENCY)
+    if FAIL_RATE > 0 and random.random() < FAIL_RATE:
+        print("Error: Unable to establish IPMI v2 / RMCP+ session", file=sys.stderr)
+        return 1
+
+    args = argv[1:]
+    if "sdr" in args and "-S" not in args:
+        time.sleep(SDR_WALK)
+    if "mc" in args:
+        print("Device ID                 : 32\nFirmware Revision         : 2.80")
+        return 0
+    if "sdr" not in args:
+        print(f"fake_ipmitool: nicht unterstützt: {' '.join(args)}", file=sys.stderr)
+        return 1
+
+    if "dump" in args:
+        with open(args[-1], "wb") as f:
+            f.write(b"FAKE-SDR" + SENSORS.to_bytes(4, "big"))
+        print(f"Dumping Sensor Data Repository to '{args[-1]}'")
+    elif "elist" in args:
+        print(elist_output(SENSORS))
+    elif "temperature" in args:
+        print("\n".join(temperature_rows(SENSORS)))
+    elif "fan" in args:
+        print("\n".join(fan_rows(SENSORS)))
+    elif "power supply" in args:
+        print("\n".join(power_rows(SENSORS)))
+    else:
+        print(f"fake_ipmitool: nicht unterstützt: {' '.join(args)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Lokaler HTTPS-Server, der die Redfish-Ressourcen eines iLO nachbildet
+(Benchmark, komplett offline): Service Root, Chassis/1, Chassis/1/Thermal
+und Chassis/1/Power, inkl. $expand=. und $select (abschaltbar), sowie
+SessionService-Sessions (X-Auth-Token) neben Basic Auth
+
+Lauscht auf allen Adressen, damit jedes 127.x.y.z als eigener "Host" mit
+eigenem Connection-Pool angesprochen werden kann.
+
+Verwendung:
+    python3 fake_redfish.py --port 18443 --cert cert.pem --key key.pem --latency 0.05
+    python3 fake_redfish.py ... --no-expand --no-select   # ältere Firmware
+    python3 fake_redfish.py ... --auth-delay 0.05         # Kosten einer Passwortprüfung
+"""
+
+import json
+import ssl
+import time
+import uuid
+import random
+import argparse
+import threading
+from urllib.parse import parse_qs, urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+def thermal_payload(temps: int, fans: int) -> dict:
+    return {
+        "@odata.id": "/redfish/v1/Chassis/1/Thermal",
+        "Temperatures": [
+            {
+                "Name": f"{i + 1:02d}-Sensor {i + 1}",
+                "SensorNumber": i + 1,
+                "ReadingCelsius": 20 + (i * 3) % 50,
+                "PhysicalContext": "SystemBoard",
+                "Status": {"Health": "OK", "State": "Enabled"},
+                "UpperThresholdCritical": 80,
+                "UpperThresholdFatal": 90,
+                "Oem": {"Hpe": {"WarningTempUserThreshold": 70}}
+            }
+            for i in range(temps)
+        ],
+        "Fans": [
+            {
+                "Name": f"Fan {i + 1}",
+                "Reading": 20 + (i * 7) % 60,
+                "ReadingUnits": "Percent",
+                "Status": {"Health": "OK", "State": "Enabled"}
+            }
+            for i in range(fans)
+        ]
+    }
+
+def power_payload(psus: int) -> dict:
+    return {
+        "@odata.id": "/redfish/v1/Chassis/1/Power",
+        "PowerControl": [
+            {
+                "Name": "Server Power Control",
+                "PowerConsumedWatts": 180 + 40 * psus,
+                "PowerCapacityWatts": 800 * psus,
+                "PowerMetrics": {"AverageConsumedWatts": 175 + 40 * psus, "MinConsumedWatts": 150,
+                                 "MaxConsumedWatts": 260 + 40 * psus},
+                "Status": {"Health": "OK", "State": "Enabled"}
+            }
+        ],
+        "PowerSupplies": [
+            {
+                "MemberId": str(i),
+                "Name": f"HpeServerPowerSupply {i + 1}",
+                "Model": "865414-B21",
+                "PowerCapacityWatts": 800,
+                "LastPowerOutputWatts": 90 + 20 * i,
+                "LineInputVoltage": 230,
+                "Status": {"Health": "OK", "State": "Enabled"}
+            }
+            for i in range(psus)
+        ]
+    }
+
+def service_root(expand: bool, select: bool) -> dict:
+    return {
+        "@odata.id": "/redfish/v1/",
+        "RedfishVersion": "1.6.0",
+        "Chassis": {"@odata.id": "/redfish/v1/Chassis/"},
+        "ProtocolFeaturesSupported": {
+            "ExpandQuery": {"ExpandAll": expand, "Levels": expand, "Links": expand, "NoLinks": expand, "MaxLevels": 1},
+            "SelectQuery": select
+        }
+    }
+
+def select_fields(payload: dict, query: dict) -> dict:
+    fields = query.get("$select", [""])[0].split(",") if "$select" in query else None
+    if not fields:
+        return payload
+    return {k: v for k, v in payload.items() if k in fields or k.startswith("@odata")}
+
+class RedfishHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+    fail_rate = 0.0
+    expand = True
+    select = True
+    sessions = True
+    auth_delay = 0.0         # zusätzliche Zeit für eine Passwortprüfung (Basic Auth / Login)
+    session_timeout = 1800.0  # Leerlauf-Timeout einer Session
+    thermal = {}
+    power = {}
+    tokens = {}              # Token -> letzte Nutzung
+    lock = threading.Lock()
+    counters = {"basic": 0, "token": 0, "logins": 0, "logouts": 0, "rejected": 0}
+
+    def count(self, key: str):
+        with self.lock:
+            self.counters[key] += 1
+
+    def authorized(self) -> bool:
+        token = self.headers.get("X-Auth-Token")
+        if token:
+            with self.lock:
+                last = self.tokens.get(token)
+                if last is None or time.monotonic() - last > self.session_timeout:
+                    self.tokens.pop(token, None)
+                    self.counters["rejected"] += 1
+                    return False
+                self.tokens[token] = time.monotonic()
+                self.counters["token"] += 1
+            return True
+        if self.headers.get("Authorization", "").startswith("Basic "):
+            time.sleep(self.auth_delay)
+            self.count("basic")
+            return True
+        self.count("rejected")
+        return False
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/")
+        query = parse_qs(url.query)
+        if self.fail_rate > 0 and random.random() < self.fail_rate:
+            self.send_body(503, b'{"error": "Service Unavailable"}')
+            return
+        if ("$select" in query and not self.select) or ("$expand" in query and not self.expand):
+            # Wie ältere Firmware: unbekannte Query-Parameter werden abgelehnt
+            self.send_body(400, b'{"error": "query not supported"}')
+            return
+        if path == "/redfish/v1":
+            payload = service_root(self.expand, self.select)
+        elif not self.authorized():
+            self.send_body(401, b'{"error": "unauthorized"}')
+            return
+        elif path == "/redfish/v1/Chassis/1":
+            payload = {"@odata.id": "/redfish/v1/Chassis/1", "Id": "1", "Name": "Computer System Chassis",
+                       "Thermal": {"@odata.id": "/redfish/v1/Chassis/1/Thermal"},
+                       "Power": {"@odata.id": "/redfish/v1/Chassis/1/Power"}}
+            if "$expand" in query:
+                payload["Thermal"], payload["Power"] = self.thermal, self.power
+        elif path == "/redfish/v1/Chassis/1/Thermal":
+            payload = self.thermal
+        elif path == "/redfish/v1/Chassis/1/Power":
+            payload = self.power
+        else:
+            self.send_body(404, b'{"error": "not found"}')
+            return
+        self.send_body(200, json.dumps(select_fields(payload, query)).encode("utf-8"))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+        time.sleep(self.latency)
+        if not self.sessions or urlsplit(self.path).path.rstrip("/") != "/redfish/v1/SessionService/Sessions":
+            self.send_body(404, b'{"error": "not found"}')
+            return
+        try:
+            credentials = json.loads(body or b"{}")
+        except ValueError:
+            credentials = {}
+        if not credentials.get("UserName") or not credentials.get("Password"):
+            self.send_body(400, b'{"error": "UserName/Password fehlt"}')
+            return
+        time.sleep(self.auth_delay)
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.tokens[token] = time.monotonic()
+            self.counters["logins"] += 1
+        body = json.dumps({"Id": token[:8], "UserName": credentials["UserName"]}).encode("utf-8")
+        self.send_response(201)
+        self.send_header("X-Auth-Token", token)
+        self.send_header("Location", f"/redfish/v1/SessionService/Sessions/{token[:8]}/")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_DELETE(self):
+        token = self.headers.get("X-Auth-Token", "")
+        with self.lock:
+            known = self.tokens.pop(token, None) is not None
+            if known:
+                self.counters["logouts"] += 1
+        self.send_body(200 if known else 401, b"{}")
+
+def serve(port: int, cert: str, key: str, latency: float = 0.05,
+          fail_rate: float = 0.0, temps: int = 20, fans: int = 6, psus: int = 2,
+          expand: bool = True, select: bool = True, sessions: bool = True,
+          auth_delay: float = 0.0, session_timeout: float = 1800.0):
+    RedfishHandler.latency = latency
+    RedfishHandler.fail_rate = fail_rate
+    RedfishHandler.expand = expand
+    RedfishHandler.select = select
+    RedfishHandler.sessions = sessions
+    RedfishHandler.auth_delay = auth_delay
+    RedfishHandler.session_timeout = session_timeout
+    RedfishHandler.thermal = thermal_payload(temps, fans)
+    RedfishHandler.power = power_payload(psus)
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), RedfishHandler)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    print(f"[*] Fake Redfish auf Port {port} (Latenz {latency}s, Fehlerquote {fail_rate}, "
+          f"$expand {'an' if expand else 'aus'}, $select {'an' if select else 'aus'})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[*] Auth: {RedfishHandler.counters}", flush=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Redfish Thermal/Power-Endpunkte (HTTPS)")
+    parser.add_argument("--port", type=int, default=18443)
+    parser.add_argument("--cert", required=True, help="Zertifikat (PEM)")
+    parser.add_argument("--key", required=True, help="Privater Schlüssel (PEM)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Antwortzeit in Sekunden")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Anteil 503-Antworten 0..1")
+    parser.add_argument("--temps", type=int, default=20, help="Temperatursensoren pro Host")
+    parser.add_argument("--fans", type=int, default=6, help="Lüfter pro Host")
+    parser.add_argument("--psus", type=int, default=2, help="Netzteile pro Host")
+    parser.add_argument("--no-expand", action="store_true", help="$expand ablehnen (400)")
+    parser.add_argument("--no-select", action="store_true", help="$select ablehnen (400)")
+    parser.add_argument("--no-sessions", action="store_true", help="Kein SessionService (nur Basic Auth)")
+    parser.add_argument("--auth-delay", type=float, default=0.0,
+                        help="Zusatzzeit pro Passwortprüfung (Basic Auth/Login) in Sekunden")
+    parser.add_argument("--session-timeout", type=float, default=1800.0, help="Leerlauf-Timeout einer Session (s)")
+    args = parser.parse_args()
+    serve(args.port, args.cert, args.key, args.latency, args.fail_rate, args.temps, args.fans,
+          args.psus, not args.no_expand, not args.no_select, not args.no_sessions,
+          args.auth_delay, args.session_timeout)
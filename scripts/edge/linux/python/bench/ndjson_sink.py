@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+TCP-Sink, der NDJSON-Zeilen zählt (Ersatz für den Edge-Logstash im Benchmark)
+HttpNdjsonSink nimmt stattdessen gzip-NDJSON per HTTP POST an (EDGE_OUTPUT=http)
+
+Standalone:  python3 ndjson_sink.py --port 10550
+             python3 ndjson_sink.py --port 10551 --http
+Im Benchmark wird NdjsonSink als Thread im Harness-Prozess gestartet.
+"""
+
+import gzip
+import socket
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class NdjsonSink:
+    """Zählt empfangene Zeilen (Dokumente), Bytes, Verbindungen und Fehler-Dokumente"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen(256)
+        self.port = self.server.getsockname()[1]
+        self.lock = threading.Lock()
+        self.lines = 0
+        self.bytes = 0
+        self.failures = 0
+        self.connections = 0
+        self.last_activity = time.monotonic()
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            with self.lock:
+                self.connections += 1
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket):
+        rest = b""
+        with conn:
+            while True:
+                try:
+                    chunk = conn.recv(262144)
+                except OSError:
+                    break
+                if not chunk:
+                    break
+                # Nur vollständige Zeilen auswerten, angebrochene Zeile für den nächsten Chunk merken
+                data = rest + chunk
+                end = data.rfind(b"\n") + 1
+                complete, rest = data[:end], data[end:]
+                self._count(complete, len(chunk))
+
+    def _count(self, complete: bytes, nbytes: int):
+        with self.lock:
+            self.lines += complete.count(b"\n")
+            self.bytes += nbytes
+            self.failures += complete.count(b'"outcome": "failure"')
+            self.last_activity = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"lines": self.lines, "bytes": self.bytes,
+                    "failures": self.failures, "connections": self.connections}
+
+    def wait_idle(self, idle: float = 0.3, timeout: float = 10.0):
+        """Wartet, bis idle Sekunden lang nichts mehr angekommen ist"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                quiet = time.monotonic() - self.last_activity
+            if quiet >= idle:
+                return
+            time.sleep(idle / 3)
+
+    def close(self):
+        self.server.close()
+
+class HttpNdjsonSink(NdjsonSink):
+    """Wie NdjsonSink, aber als Logstash-http-Input-Ersatz (POST, optional gzip)
+
+    bytes zählt die übertragenen (komprimierten) Bytes, connections die
+    TCP-Verbindungen und requests die POSTs.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        sink = self
+        self.lock = threading.Lock()
+        self.lines = 0
+        self.bytes = 0
+        self.failures = 0
+        self.connections = 0
+        self.requests = 0
+        self.last_activity = time.monotonic()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with sink.lock:
+                    sink.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    data = gzip.decompress(body) if self.headers.get("Content-Encoding") == "gzip" else body
+                except (OSError, EOFError):
+                    self.send_response(400)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                with sink.lock:
+                    sink.requests += 1
+                sink._count(data, len(body))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def snapshot(self) -> dict:
+        snap = super().snapshot()
+        with self.lock:
+            snap["requests"] = self.requests
+        return snap
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NDJSON-Zeilen-Zähler (TCP oder HTTP)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=10550)
+    parser.add_argument("--http", action="store_true", help="HTTP-POST (gzip) statt TCP json_lines")
+    args = parser.parse_args()
+    sink = (HttpNdjsonSink if args.http else NdjsonSink)(args.host, args.port).start()
+    print(f"[*] Sink lauscht auf {args.host}:{sink.port}", flush=True)
+    last = None
+    try:
+        while True:
+            time.sleep(2)
+            snap = sink.snapshot()
+            if snap != last:
+                print(f"[*] {snap['lines']} Zeilen, {snap['bytes']} Bytes, "
+                      f"{snap['connections']} Verbindungen, {snap['failures']} Fehler-Dokumente"
+                      + (f", {snap['requests']} POSTs" if "requests" in snap else ""), flush=True)
+                last = snap
+    except KeyboardInterrupt:
+        sink.close()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Benchmark für die Collector-Scripts (komplett offline)
+
+Startet einen NDJSON-Sink (statt Edge-Logstash), einen Fake-Redfish-Server
+(HTTPS, ein "Host" pro 127.0.x.y) und ruft get_ipmi_data.py mit
+fake_ipmitool.py als IPMI_COMMAND auf. Gemessen werden pro Collector und
+Host-Anzahl: Zykluszeit (Start bis alle Dokumente im Sink), Hosts/s und Docs/s.
+Ergebnisse landen als JSON in bench/results/ und lassen sich mit --compare
+gegen einen früheren Lauf vergleichen.
+
+Beispiele:
+    python3 bench/run_bench.py
+    python3 bench/run_bench.py --sizes 10 100 --collectors ipmi --ipmi-args "--all --single-session"
+    python3 bench/run_bench.py --compare bench/results/bench-20260101-120000.json
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import socket
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+
+import yaml
+
+from ndjson_sink import NdjsonSink, HttpNdjsonSink
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+COLLECTORS = {
+    "ipmi": os.path.join(SCRIPT_DIR, "get_ipmi_data.py"),
+    "ilo": os.path.join(SCRIPT_DIR, "get_ilo_temps.py")
+}
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def make_cert(directory: str):
+    """Selbstsigniertes Zertifikat für den Fake-Redfish-Server (openssl)"""
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+                    "-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=localhost"],
+                   check=True, capture_output=True)
+    return cert, key
+
+def write_ipmi_hosts(path: str, count: int):
+    hosts = [{"ip": f"10.{i // 62500}.{i // 250 % 250}.{i % 250 + 1}", "name": f"bench-ipmi-{i}",
+              "username": "bench", "password": "bench"} for i in range(count)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"hosts": hosts}, f)
+
+def write_ilo_hosts(path: str, count: int, port: int):
+    ilos = [{"host": f"127.0.{i // 250}.{i % 250 + 1}:{port}", "name": f"bench-ilo-{i}",
+             "username": "bench", "password": "bench"} for i in range(count)]
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump({"ilos": ilos}, f)
+
+def wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Port {port} nicht erreichbar")
+
+def run_cycle(collector: str, args: list, env: dict, sink: NdjsonSink, timeout: float) -> dict:
+    """Ein Collector-Lauf: Zeit vom Start bis das letzte Dokument im Sink angekommen ist"""
+    before = sink.snapshot()
+    start = time.monotonic()
+    proc = subprocess.run([sys.executable, COLLECTORS[collector], *args], env=env,
+                          capture_output=True, text=True, timeout=timeout)
+    exited = time.monotonic()
+    sink.wait_idle(idle=0.3)
+    after = sink.snapshot()
+    # Ende = Prozessende oder letzte Zeile im Sink, je nachdem was später kam
+    cycle = max(exited, min(sink.last_activity, time.monotonic())) - start
+    return {
+        "cycle_s": cycle,
+        "returncode": proc.returncode,
+        "docs": after["lines"] - before["lines"],
+        "failures": after["failures"] - before["failures"],
+        "bytes": after["bytes"] - before["bytes"],
+        "stderr": proc.stderr[-500:] if proc.returncode else ""
+    }
+
+def compare(results: dict, previous_file: str):
+    with open(previous_file, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    old = {(r["collector"], r["hosts"]): r for r in previous.get("results", [])}
+    print(f"\n[*] Vergleich mit {previous_file} ({previous.get('git', '?')}):")
+    for r in results["results"]:
+        o = old.get((r["collector"], r["hosts"]))
+        if not o:
+            continue
+        change = (r["cycle_s"] - o["cycle_s"]) / o["cycle_s"] * 100 if o["cycle_s"] else 0.0
+        print(f"   {r['collector']:>4} {r['hosts']:>5} Hosts: {o['cycle_s']:.2f}s -> {r['cycle_s']:.2f}s "
+              f"({change:+.1f}%), {o['docs_per_s']:.0f} -> {r['docs_per_s']:.0f} Docs/s")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline-Benchmark für get_ipmi_data.py und get_ilo_temps.py")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Host-Anzahlen")
+    parser.add_argument("--collectors", nargs="+", choices=sorted(COLLECTORS), default=["ipmi", "ilo"])
+    parser.add_argument("--repeat", type=int, default=1, help="Läufe pro Messpunkt (Median wird berichtet)")
+    parser.add_argument("--ipmi-args", default="--all", help="Argumente für get_ipmi_data.py")
+    parser.add_argument("--ilo-args", default="", help="Argumente für get_ilo_temps.py")
+    parser.add_argument("--ipmi-latency", type=float, default=0.3, help="Latenz pro ipmitool-Aufruf (s)")
+    parser.add_argument("--ipmi-fail-rate", type=float, default=0.0)
+    parser.add_argument("--ipmi-sensors", type=int, default=4, help="Sensoren pro Typ und Host")
+    parser.add_argument("--ipmi-sdr-walk", type=float, default=0.2,
+                        help="Zusatzzeit für den SDR-Walk ohne -S Cache (s)")
+    parser.add_argument("--redfish-latency", type=float, default=0.05, help="Latenz pro Redfish-Request (s)")
+    parser.add_argument("--redfish-fail-rate", type=float, default=0.0)
+    parser.add_argument("--redfish-no-expand", action="store_true", help="Fake-iLO ohne $expand-Unterstützung")
+    parser.add_argument("--redfish-no-select", action="store_true", help="Fake-iLO ohne $select-Unterstützung")
+    parser.add_argument("--redfish-no-sessions", action="store_true", help="Fake-iLO ohne SessionService")
+    parser.add_argument("--redfish-auth-delay", type=float, default=0.0,
+                        help="Zusatzzeit pro Passwortprüfung im Fake-iLO (Basic Auth/Login, s)")
+    parser.add_argument("--output-mode", choices=["tcp", "http"], default="tcp",
+                        help="Sender der Collectors (EDGE_OUTPUT): tcp json_lines oder http gzip-Bulk")
+    parser.add_argument("--timeout", type=float, default=900, help="Maximale Laufzeit pro Collector-Lauf (s)")
+    parser.add_argument("--output", help="Ergebnisdatei (Default: bench/results/bench-<Zeit>.json)")
+    parser.add_argument("--compare", help="Früheres Ergebnis zum Vergleich")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="edge-bench-")
+    sink = (HttpNdjsonSink if args.output_mode == "http" else NdjsonSink)().start()
+    redfish = None
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git": subprocess.run(["git", "-C", SCRIPT_DIR, "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True).stdout.strip() or None,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": []
+    }
+
+    env = dict(os.environ,
+               EDGE_HOST="127.0.0.1",
+               EDGE_SPOOL_DIR="off",
+               EDGE_STATE_DIR=os.path.join(workdir, "state"),
+               IPMI_COMMAND=os.path.join(BENCH_DIR, "fake_ipmitool.py"),
+               IPMI_HOSTS_FILE=os.path.join(workdir, "ipmi_hosts.json"),
+               ILO_HOSTS_FILE=os.path.join(workdir, "ilo_hosts.yml"),
+               BENCH_IPMI_LATENCY=str(args.ipmi_latency),
+               BENCH_IPMI_FAIL_RATE=str(args.ipmi_fail_rate),
+               BENCH_IPMI_SENSORS=str(args.ipmi_sensors),
+               BENCH_IPMI_SDR_WALK=str(args.ipmi_sdr_walk),
+               PYTHONWARNINGS="ignore")
+
+    try:
+        if "ilo" in args.collectors:
+            cert, key = make_cert(workdir)
+            redfish_port = free_port()
+            redfish = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "fake_redfish.py"),
+                                        "--port", str(redfish_port), "--cert", cert, "--key", key,
+                                        "--latency", str(args.redfish_latency),
+                                        "--fail-rate", str(args.redfish_fail_rate),
+                                        *(["--no-expand"] if args.redfish_no_expand else []),
+                                        *(["--no-select"] if args.redfish_no_select else []),
+                                        *(["--no-sessions"] if args.redfish_no_sessions else []),
+                                        "--auth-delay", str(args.redfish_auth_delay)],
+                                       stdout=subprocess.DEVNULL)
+            wait_for_port(redfish_port)
+
+        for collector in args.collectors:
+            collector_args = shlex.split(args.ipmi_args if collector == "ipmi" else args.ilo_args)
+            run_env = dict(env, EDGE_PORT=str(sink.port), EDGE_HTTP_PORT=str(sink.port),
+                           EDGE_OUTPUT=args.output_mode)
+            for size in args.sizes:
+                if collector == "ipmi":
+                    write_ipmi_hosts(run_env["IPMI_HOSTS_FILE"], size)
+                else:
+                    write_ilo_hosts(run_env["ILO_HOSTS_FILE"], size, redfish_port)
+
+                runs = [run_cycle(collector, collector_args, run_env, sink, args.timeout)
+                        for _ in range(args.repeat)]
+                cycle = statistics.median(r["cycle_s"] for r in runs)
+                docs = runs[-1]["docs"]
+                entry = {
+                    "collector": collector,
+                    "hosts": size,
+                    "args": collector_args,
+                    "cycle_s": round(cycle, 3),
+                    "cycle_runs": [round(r["cycle_s"], 3) for r in runs],
+                    "hosts_per_s": round(size / cycle, 2) if cycle else None,
+                    "docs": docs,
+                    "docs_per_s": round(docs / cycle, 1) if cycle else None,
+                    "failures": runs[-1]["failures"],
+                    "bytes": runs[-1]["bytes"],
+                    "returncode": runs[-1]["returncode"]
+                }
+                results["results"].append(entry)
+                print(f"[✓] {collector:>4} {size:>5} Hosts: {cycle:7.2f}s Zyklus, "
+                      f"{entry['hosts_per_s']:8.1f} Hosts/s, {docs:>6} Docs ({entry['docs_per_s']:.0f}/s), "
+                      f"{entry['failures']} Fehler-Docs, {entry['bytes']} Bytes, rc={entry['returncode']}")
+                if runs[-1]["stderr"]:
+                    print(f"[!] stderr: {runs[-1]['stderr']}")
+    finally:
+        if redfish is not None:
+            redfish.terminate()
+            redfish.wait()
+        sink.close()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"[*] Ergebnisse gespeichert: {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Metriken für den Edge Monitoring Daemon
+Sammelt Laufzeit-Kennzahlen der Scripts und stellt sie im
+Prometheus-Textformat per HTTP (nur localhost) bereit
+"""
+
+import asyncio
+import bisect
+import resource
+from typing import Callable, Dict, Tuple
+
+DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 15, 60)
+
+class Histogram:
+    """Kumulatives Histogramm wie bei Prometheus (le-Buckets plus +Inf)"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class DaemonMetrics:
+    """Zähler und Histogramme pro Script"""
+
+    def __init__(self):
+        self.runs: Dict[Tuple[str, str], int] = {}
+        self.durations: Dict[str, Histogram] = {}
+        self.lags: Dict[str, Histogram] = {}
+        self.missed_ticks: Dict[str, int] = {}
+        self.skipped_runs: Dict[str, int] = {}
+        self.cpu_seconds: Dict[Tuple[str, str], float] = {}
+        self.max_rss: Dict[str, int] = {}
+
+    def observe_run(self, script: str, status: str, duration: float):
+        self.runs[(script, status)] = self.runs.get((script, status), 0) + 1
+        self.durations.setdefault(script, Histogram(DURATION_BUCKETS)).observe(duration)
+
+    def observe_usage(self, script: str, usage):
+        """rusage eines beendeten Script-Prozesses (aus os.wait4)"""
+        for mode, seconds in (("user", usage.ru_utime), ("system", usage.ru_stime)):
+            self.cpu_seconds[(script, mode)] = self.cpu_seconds.get((script, mode), 0.0) + seconds
+        self.max_rss[script] = usage.ru_maxrss * 1024
+
+    def observe_lag(self, script: str, lag: float):
+        self.lags.setdefault(script, Histogram(LAG_BUCKETS)).observe(max(0.0, lag))
+
+    def count_missed(self, script: str, ticks: int):
+        self.missed_ticks[script] = self.missed_ticks.get(script, 0) + ticks
+
+    def count_skipped(self, script: str):
+        self.skipped_runs[script] = self.skipped_runs.get(script, 0) + 1
+
+    def render(self, running: Dict[str, dict], uptime: float) -> str:
+        out = [
+            "# HELP edge_daemon_uptime_seconds Laufzeit des Daemons",
+            "# TYPE edge_daemon_uptime_seconds gauge",
+            f"edge_daemon_uptime_seconds {uptime:.3f}",
+            "# HELP edge_scripts_running Aktuell laufende Scripts",
+            "# TYPE edge_scripts_running gauge",
+            f"edge_scripts_running {len(running)}",
+            "# HELP edge_script_running 1 wenn das Script gerade läuft",
+            "# TYPE edge_script_running gauge",
+        ]
+        scripts = sorted({s for s, _ in self.runs} | set(self.durations) | set(running))
+        for script in scripts:
+            out.append(f'edge_script_running{{script="{_label(script)}"}} {1 if script in running else 0}')
+
+        out += ["# HELP edge_script_runs_total Beendete Läufe nach Status",
+                "# TYPE edge_script_runs_total counter"]
+        for (script, status), count in sorted(self.runs.items()):
+            out.append(f'edge_script_runs_total{{script="{_label(script)}",status="{_label(status)}"}} {count}')
+
+        out += ["# HELP edge_script_duration_seconds Laufzeit pro Lauf",
+                "# TYPE edge_script_duration_seconds histogram"]
+        for script, hist in sorted(self.durations.items()):
+            out += hist.render("edge_script_duration_seconds", f'script="{_label(script)}"')
+
+        out += ["# HELP edge_script_schedule_lag_seconds Verspätung des Starts gegenüber dem Soll-Termin",
+                "# TYPE edge_script_schedule_lag_seconds histogram"]
+        for script, hist in sorted(self.lags.items()):
+            out += hist.render("edge_script_schedule_lag_seconds", f'script="{_label(script)}"')
+
+        out += ["# HELP edge_script_missed_ticks_total Zusammengefasste (verpasste) Takte",
+                "# TYPE edge_script_missed_ticks_total counter"]
+        for script, count in sorted(self.missed_ticks.items()):
+            out.append(f'edge_script_missed_ticks_total{{script="{_label(script)}"}} {count}')
+
+        out += ["# HELP edge_script_skipped_runs_total Übersprungene Takte (Script lief noch)",
+                "# TYPE edge_script_skipped_runs_total counter"]
+        for script, count in sorted(self.skipped_runs.items()):
+            out.append(f'edge_script_skipped_runs_total{{script="{_label(script)}"}} {count}')
+
+        out += ["# HELP edge_script_cpu_seconds_total CPU-Zeit der Script-Prozesse (wait4, nur Subprocess-Modus)",
+                "# TYPE edge_script_cpu_seconds_total counter"]
+        for (script, mode), seconds in sorted(self.cpu_seconds.items()):
+            out.append(f'edge_script_cpu_seconds_total{{script="{_label(script)}",mode="{mode}"}} {seconds:.6f}')
+
+        out += ["# HELP edge_script_max_rss_bytes Maximaler RSS des letzten Laufs (wait4, nur Subprocess-Modus)",
+                "# TYPE edge_script_max_rss_bytes gauge"]
+        for script, rss in sorted(self.max_rss.items()):
+            out.append(f'edge_script_max_rss_bytes{{script="{_label(script)}"}} {rss}')
+
+        # Summen: Plugins laufen im Daemon-Prozess selbst (RUSAGE_SELF)
+        for name, who, help_text in (("daemon", resource.RUSAGE_SELF, "des Daemon-Prozesses inkl. Plugins"),
+                                     ("children", resource.RUSAGE_CHILDREN, "aller beendeten Script-Prozesse")):
+            usage = resource.getrusage(who)
+            out += [f"# HELP edge_{name}_cpu_seconds_total CPU-Zeit {help_text} (rusage)",
+                    f"# TYPE edge_{name}_cpu_seconds_total counter",
+                    f'edge_{name}_cpu_seconds_total{{mode="user"}} {usage.ru_utime:.6f}',
+                    f'edge_{name}_cpu_seconds_total{{mode="system"}} {usage.ru_stime:.6f}',
+                    f"# HELP edge_{name}_max_rss_bytes Maximaler RSS {help_text} (rusage)",
+                    f"# TYPE edge_{name}_max_rss_bytes gauge",
+                    f"edge_{name}_max_rss_bytes {usage.ru_maxrss * 1024}"]
+
+        return "\n".join(out) + "\n"
+
+async def serve_metrics(render: Callable[[], str], host: str = "127.0.0.1",
+                        port: int = 9464) -> asyncio.AbstractServer:
+    """Minimaler HTTP-Server für GET /metrics"""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Header überlesen
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                body = render().encode("utf-8")
+                status = "200 OK"
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                body = b"not found\n"
+                status = "404 Not Found"
+                content_type = "text/plain"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
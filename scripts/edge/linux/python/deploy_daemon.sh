@@ -14,12 +14,27 @@ sudo mkdir -p /opt/python_scripts
 echo "📋 Copying scripts..."
 sudo cp edge_daemon.py /opt/monitoring/edge_daemon.py
 sudo cp status_daemon.py /opt/monitoring/status_daemon.py
+sudo cp daemon_metrics.py /opt/monitoring/daemon_metrics.py
+sudo cp runlog.py /opt/monitoring/runlog.py
 sudo cp config.yaml /opt/monitoring/config.yaml
 
+# Collectors samt Helfer-Modulen (werden per Import aus dem Script-Verzeichnis geladen)
+echo "📋 Copying collectors and helper modules..."
+COLLECTOR_FILES="get_ipmi_data.py get_ilo_temps.py
+                 logstash_sender.py edge_spool.py edge_shard.py edge_state.py edge_deadband.py
+                 edge_health.py edge_deadline.py edge_rollup.py edge_alerts.py edge_tsdb.py"
+for file in $COLLECTOR_FILES; do
+    sudo cp "$file" "/opt/python_scripts/$file"
+done
+
 # 3. Berechtigungen setzen
 sudo chmod +x /opt/monitoring/edge_daemon.py
 sudo chmod +x /opt/monitoring/status_daemon.py
 sudo chown -R monitoring:monitoring /opt/monitoring
+sudo chmod +x /opt/python_scripts/get_ipmi_data.py /opt/python_scripts/get_ilo_temps.py
+for file in $COLLECTOR_FILES; do
+    sudo chown monitoring:monitoring "/opt/python_scripts/$file"
+done
 
 # 4. Alten IPMI Timer stoppen (falls vorhanden)
 echo "🛑 Stopping old IPMI timer..."
@@ -45,7 +60,9 @@ echo "✅ Deployment completed!"
 echo ""
 echo "💡 Useful commands:"
 echo "   Status anzeigen:     python3 /opt/monitoring/status_daemon.py"
+echo "   Laufhistorie (24h):  python3 /opt/monitoring/runlog.py stats --hours 24"
 echo "   Logs anzeigen:       journalctl -u edge-monitoring.service -f"
 echo "   Service stoppen:     sudo systemctl stop edge-monitoring.service"
 echo "   Service starten:     sudo systemctl start edge-monitoring.service"
 echo "   Service neustarten:  sudo systemctl restart edge-monitoring.service"
+echo "   Config neu laden:    sudo systemctl reload edge-monitoring.service"
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Schwellwert-Auswertung auf dem Edge
+Prüft Messwerte gegen die Schwellen der Geräte (Redfish, IPMI-Status) und
+gegen konfigurierte Regeln und erzeugt bei jedem Zustandswechsel pro Sensor
+(ok -> warning -> critical -> fatal und zurück) genau ein Alert-Dokument,
+das die Collectors über den Prioritätspfad des Senders sofort verschicken.
+Der letzte Zustand pro Sensor überlebt Läufe in einer kleinen JSON-Datei.
+"""
+
+import os
+import copy
+import time
+import fnmatch
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from edge_state import load_state, save_state, state_path
+
+# ---- Konfiguration ----
+ALERTS_ENABLED = os.getenv("EDGE_ALERTS", "1") != "0"
+RULES_FILE = os.getenv("EDGE_ALERT_RULES", "/etc/edge-monitoring/alerts.yml")
+HYSTERESIS_PCT = float(os.getenv("EDGE_ALERT_HYSTERESIS_PCT", "3"))  # Abstand zur Schwelle für die Entwarnung in %
+STATE_MAX_AGE = float(os.getenv("EDGE_ALERT_STATE_MAX_AGE", str(7 * 24 * 3600)))
+
+LEVELS = ("ok", "warning", "critical", "fatal")
+RANK = {level: rank for rank, level in enumerate(LEVELS)}
+
+# Status-Spalte von ipmitool sdr (ns = kein Messwert -> keine Aussage)
+IPMI_STATUS_LEVELS = {"ok": "ok", "nc": "warning", "cr": "critical", "nr": "fatal"}
+# Redfish Status.Health
+REDFISH_HEALTH_LEVELS = {"OK": "ok", "Warning": "warning", "Critical": "critical"}
+# Sensor liefert gerade keine Aussage (IPMI-Status bzw. Redfish Status.State): Zustand behalten
+IPMI_NOT_PRESENT = {"ns"}
+REDFISH_NOT_PRESENT = {"Absent", "Disabled", "StandbyOffline", "UnavailableOffline"}
+
+# Regel-Schlüssel -> (Level, Richtung)
+RULE_THRESHOLDS = {
+    "warning": ("warning", "upper"),
+    "critical": ("critical", "upper"),
+    "fatal": ("fatal", "upper"),
+    "low_warning": ("warning", "lower"),
+    "low_critical": ("critical", "lower")
+}
+
+def load_rules(path: str = RULES_FILE) -> List[Dict[str, Any]]:
+    """Regeln aus der YAML-Datei ({"rules": [...]}); fehlt die Datei, gibt es nur Geräteschwellen
+
+    Eine Regel gilt für Sensoren, deren Name auf "sensor" passt (fnmatch),
+    optional eingeschränkt auf "host" (fnmatch) und "dataset" (z.B. temp,
+    thermal, fan, power; String oder Liste), und setzt Schwellen aus
+    RULE_THRESHOLDS. "hysteresis" (absolut, in der Einheit des Sensors)
+    ersetzt für die Schwellen der Regel den relativen Default.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            rules = (yaml.safe_load(f) or {}).get("rules") or []
+    except FileNotFoundError:
+        return []
+    except (OSError, yaml.YAMLError, AttributeError) as e:
+        print(f"[!] Alert-Regeln {path} unlesbar, nur Geräteschwellen aktiv: {e}")
+        return []
+    valid = []
+    for index, rule in enumerate(rules):
+        if not isinstance(rule, dict) or not any(k in rule for k in RULE_THRESHOLDS):
+            print(f"[!] Alert-Regel #{index} in {path} ohne Schwellen, ignoriert")
+            continue
+        try:
+            if rule.get("hysteresis") is not None and float(rule["hysteresis"]) < 0:
+                raise ValueError("negativ")
+        except (TypeError, ValueError) as e:
+            print(f"[!] Alert-Regel #{index} in {path}: ungültige hysteresis ({e}), ignoriert")
+            continue
+        valid.append(rule)
+    return valid
+
+def _matches(rule: Dict[str, Any], kind: str, host: str, sensor: str) -> bool:
+    datasets = rule.get("dataset")
+    if datasets is not None and kind not in ([datasets] if isinstance(datasets, str) else datasets):
+        return False
+    if not fnmatch.fnmatchcase(host, str(rule.get("host", "*"))):
+        return False
+    return fnmatch.fnmatchcase(sensor, str(rule.get("sensor", "*")))
+
+class AlertEvaluator:
+    """Zustand pro Sensor und Erkennung von Zustandswechseln
+
+    evaluate() liefert nur bei einem Wechsel ein Ergebnis, wiederholte
+    Überschreitungen erzeugen also keine weiteren Alerts. Schwellen bis zum
+    bisherigen Level gelten als unterschritten erst eine Hysterese unter (bzw.
+    bei unteren Schwellen über) dem Schwellwert, damit ein Sensor an der
+    Schwelle nicht in jedem Lauf hin und her springt: "hysteresis" der Regel
+    oder hysteresis_pct Prozent der Schwelle. Ein Sensor, der zum ersten Mal
+    und ohne Überschreitung gesehen wird, erzeugt keinen Alert; ein Sensor
+    ohne Aussage (nicht vorhanden, kein Messwert) behält seinen Zustand.
+    """
+
+    def __init__(self, state_file: str, rules: Optional[List[Dict[str, Any]]] = None,
+                 hysteresis_pct: float = HYSTERESIS_PCT):
+        self.state_file = state_file
+        self.rules = rules or []
+        self.hysteresis_pct = hysteresis_pct
+        self.sensors: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'evaluated': 0, 'skipped': 0, 'breaches': 0, 'recoveries': 0}
+        self.load()
+
+    def load(self):
+        self.sensors = load_state(self.state_file, "Alert-State").get("sensors", {})
+
+    def save(self):
+        """Schreibt den Zustand atomar; Sensoren, die lange nicht mehr gesehen wurden, fliegen raus"""
+        horizon = time.time() - STATE_MAX_AGE
+        with self._lock:
+            self.sensors = {key: s for key, s in self.sensors.items() if s.get("seen", 0) >= horizon}
+            save_state(self.state_file, {"sensors": self.sensors})
+
+    def thresholds(self, kind: str, host: str, sensor: str,
+                   device: Optional[Dict[str, float]] = None) -> List[Tuple[str, str, float, str, float]]:
+        """(Level, Richtung, Schwelle, Quelle, Hysterese) aus Geräteschwellen und passenden Regeln"""
+        relative = self.hysteresis_pct / 100.0
+        result = [(level, "upper", float(value), f"device:{name}", abs(float(value)) * relative)
+                  for name, (level, value) in (device or {}).items() if value is not None]
+        for rule in self.rules:
+            if not _matches(rule, kind, host, sensor):
+                continue
+            source = f"rule:{rule.get('name', rule.get('sensor', '*'))}"
+            for key, (level, direction) in RULE_THRESHOLDS.items():
+                if rule.get(key) is not None:
+                    value = float(rule[key])
+                    margin = float(rule["hysteresis"]) if rule.get("hysteresis") is not None else abs(value) * relative
+                    result.append((level, direction, value, source, margin))
+        return result
+
+    def evaluate(self, key: str, kind: str, host: str, sensor: str, value: Optional[float],
+                 status_level: Optional[str] = None,
+                 device: Optional[Dict[str, Tuple[str, Optional[float]]]] = None,
+                 present: bool = True) -> Optional[Dict[str, Any]]:
+        """Bewertet einen Messwert; liefert edge.alert-Daten bei Zustandswechsel, sonst None
+
+        device: {"upper_critical": ("critical", 90.0), ...} aus den Gerätedaten,
+        status_level: Level aus dem Sensorstatus (IPMI_STATUS_LEVELS, REDFISH_HEALTH_LEVELS),
+        present: False, wenn der Status keine Aussage erlaubt (IPMI_NOT_PRESENT, REDFISH_NOT_PRESENT).
+        """
+        thresholds = self.thresholds(kind, host, sensor, device)
+        # Ohne Aussage kein "ok" annehmen (sonst falsche Entwarnung): nicht vorhanden, oder Sensor
+        # mit Schwellen ohne Messwert, solange der Status nicht selbst eine Überschreitung meldet
+        if not present or (value is None and thresholds and RANK.get(status_level, 0) == 0):
+            with self._lock:
+                self.stats['skipped'] += 1
+                if key in self.sensors:
+                    self.sensors[key]["seen"] = time.time()
+            return None
+
+        with self._lock:
+            previous = self.sensors.get(key)
+        held = RANK.get(previous["level"], 0) if previous is not None else 0
+
+        level, threshold, direction, source = "ok", None, None, None
+        if value is not None:
+            for t_level, t_direction, t_value, t_source, t_hysteresis in thresholds:
+                # Bis zum bisherigen Level gilt die Schwelle abzüglich Hysterese (kein Flattern)
+                margin = t_hysteresis if RANK[t_level] <= held else 0.0
+                if t_direction == "upper":
+                    breached = value >= t_value - margin
+                else:
+                    breached = value <= t_value + margin
+                if breached and RANK[t_level] > RANK[level]:
+                    level, threshold, direction, source = t_level, t_value, t_direction, t_source
+        if status_level in RANK and RANK[status_level] > RANK[level]:
+            level, threshold, direction, source = status_level, None, None, "status"
+
+        now = time.time()
+        with self._lock:
+            self.stats['evaluated'] += 1
+            previous = self.sensors.get(key)
+            if previous is None:
+                self.sensors[key] = {"level": level, "seen": now}
+                if level == "ok":
+                    return None
+                previous = {"level": "ok"}
+            else:
+                previous["seen"] = now
+                if level == previous["level"]:
+                    return None
+
+            self.sensors[key] = {"level": level, "seen": now, "since": now}
+            if RANK[level] > RANK[previous["level"]]:
+                self.stats['breaches'] += 1
+            else:
+                self.stats['recoveries'] += 1
+        return {
+            "state": level,
+            "previous": previous["level"],
+            "value": value,
+            "threshold": threshold,
+            "direction": direction,
+            "source": source
+        }
+
+    def summary(self) -> str:
+        s = self.stats
+        active = sum(1 for st in self.sensors.values() if st.get("level") != "ok")
+        return (f"{s['evaluated']} Werte geprüft, {s['skipped']} ohne Aussage, {s['breaches']} Überschreitungen, "
+                f"{s['recoveries']} Entwarnungen, {active} Sensoren aktuell nicht ok")
+
+def build_alert_doc(metric_doc: Dict[str, Any], alert: Dict[str, Any]) -> Dict[str, Any]:
+    """Alert-Dokument aus dem Metrik-Dokument des Sensors (gleiche Felder plus edge.alert)"""
+    doc = copy.deepcopy(metric_doc)
+    doc.pop("edge", None)
+    escalated = RANK[alert["state"]] > RANK[alert["previous"]]
+    doc["event"].update({
+        "kind": "alert",
+        "type": ["start"] if alert["previous"] == "ok" else ["end"] if alert["state"] == "ok" else ["change"],
+        "action": "threshold-breach" if escalated else "threshold-recovery",
+        "severity": RANK[alert["state"]]
+    })
+    doc["edge"] = {"alert": {k: v for k, v in alert.items() if v is not None}}
+    return doc
+
+def open_alerts(name: str, shard: Optional[str] = None) -> Optional[AlertEvaluator]:
+    """Evaluator mit aktuellen Regeln (pro Lauf neu geladen); None wenn deaktiviert (EDGE_ALERTS=0)"""
+    if not ALERTS_ENABLED:
+        return None
+    return AlertEvaluator(state_path(f"{name}-alerts", shard), load_rules())
@@ -5,22 +5,81 @@ Orchestriert die Ausführung von Monitoring-Scripts
 """
 
 import asyncio
+import heapq
+import importlib.util
+import inspect
 import subprocess
+import threading
 import yaml
 from datetime import datetime, timedelta
 import logging
 import os
 import json
+import random
 import signal
 import sys
+import time
+
+from daemon_metrics import DaemonMetrics, serve_metrics
+from runlog import RUNLOG_DIR, RunLogWriter
+
+# Umgebungsvariable mit der absoluten Deadline eines Laufs (siehe edge_deadline.py der Collectors)
+DEADLINE_ENV = "EDGE_DEADLINE"
+
+# Laufzeit-Felder in der Script-Konfiguration, die beim Reload-Vergleich ignoriert werden
+RUNTIME_KEYS = ('last_run',)
+
+def start_reaper(process):
+    """Liest stderr des Scripts bis EOF und holt den Prozess mit os.wait4 ab (eigener Thread)
+
+    asyncio und Popen.wait() holen Kinder per waitpid ab und verwerfen deren rusage;
+    wait4 liefert CPU-Zeit und max. RSS genau dieses Prozesses. Das Future liefert
+    (returncode, stderr, rusage).
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def reap():
+        try:
+            stderr = process.stderr.read()
+            process.stderr.close()
+            _, wait_status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(wait_status)
+            loop.call_soon_threadsafe(resolve, (process.returncode, stderr, usage), None)
+        except Exception as e:
+            loop.call_soon_threadsafe(resolve, None, e)
+
+    threading.Thread(target=reap, name=f"reap-{process.pid}", daemon=True).start()
+    return future
 
 class EdgeMonitoringDaemon:
     def __init__(self, config_file="/opt/monitoring/config.yaml"):
         self.check_permissions()  # Prüfe Berechtigungen zuerst
+        self.config_file = config_file
         self.config = self.load_config(config_file)
+        self.config_mtime = self.get_config_mtime()
         self.setup_logging()
+        self.setup_runlog()
         self.running_scripts = {}  # Track running scripts
         self.script_stats = {}     # Track script statistics
+        self.plugins = {}          # Geladene Plugin-Module (Pfad -> Modul)
+        self.queued_scripts = set()  # Fällige Scripts, die auf einen freien Job-Slot warten
+        self.schedule = []         # Heap aus (fällig um [monotonic], seq, script_name)
+        self.next_runs = {}        # script_name -> nächster Termin (monotonic)
+        self.schedule_tokens = {}  # script_name -> seq des gültigen Heap-Eintrags (ältere sind verworfen)
+        self.schedule_seq = 0
+        self.metrics = DaemonMetrics()  # Kennzahlen für den /metrics-Endpunkt
+        self.metrics_server = None
+        self.status_server = None
+        self.status_socket = None
         self.start_time = datetime.now()
     
     def check_permissions(self):
@@ -47,7 +106,127 @@ class EdgeMonitoringDaemon:
     def load_config(self, config_file):
         """Lädt Konfiguration aus YAML"""
         with open(config_file, 'r') as f:
-            return yaml.safe_load(f)
+            config = yaml.safe_load(f)
+        config['scripts'] = self.expand_shards(config.get('scripts') or {})
+        return config
+    
+    def expand_shards(self, scripts):
+        """Fächert Scripts mit "shards: N" in N Worker-Prozesse auf (name#0 ... name#N-1)
+        
+        Jeder Worker bekommt "--shard i/total" als Argument und eigene Statistiken.
+        Für mehrere Edge-Knoten: shard_total = Shards über alle Knoten,
+        shard_offset = erster Shard-Index dieses Knotens.
+        """
+        expanded = {}
+        for script_name, script_config in scripts.items():
+            shards = int(script_config.get('shards', 1))
+            if shards <= 1 and 'shard_total' not in script_config:
+                expanded[script_name] = script_config
+                continue
+            
+            offset = int(script_config.get('shard_offset', 0))
+            total = int(script_config.get('shard_total', shards))
+            if offset + shards > total:
+                raise ValueError(f"{script_name}: shard_offset + shards ({offset + shards}) > shard_total ({total})")
+            if script_config.get('mode') == 'plugin':
+                # Shards sollen auf mehrere CPU-Kerne verteilen -> eigene Prozesse
+                print(f"⚠️  {script_name}: mode plugin wird für Shards ignoriert, verwende Subprocess-Modus")
+            
+            for i in range(shards):
+                shard_config = {k: v for k, v in script_config.items()
+                                if k not in ('shards', 'shard_offset', 'shard_total', 'mode')}
+                shard_config['args'] = list(script_config.get('args', [])) + ['--shard', f"{offset + i}/{total}"]
+                shard_config['shard_of'] = script_name
+                expanded[f"{script_name}#{offset + i}"] = shard_config
+        return expanded
+    
+    def get_config_mtime(self):
+        try:
+            return os.stat(self.config_file).st_mtime
+        except OSError:
+            return None
+    
+    def reload_config(self, reason="SIGHUP"):
+        """Liest config.yaml neu ein und plant nur geänderte Scripts um
+        
+        Neue Scripts werden eingeplant, entfernte ausgeplant, bei geänderten
+        gilt die neue Konfiguration ab dem nächsten Takt. Laufende Jobs
+        laufen mit der alten Konfiguration zu Ende; Statistiken und die
+        Phase (Soll-Termine) bleiben erhalten. Ist die neue Datei fehlerhaft,
+        bleibt die alte Konfiguration aktiv.
+        """
+        self.config_mtime = self.get_config_mtime()
+        try:
+            new_config = self.load_config(self.config_file)
+            for script_name, script_config in new_config['scripts'].items():
+                for key in ('path', 'interval'):
+                    if key not in script_config:
+                        raise ValueError(f"{script_name}: '{key}' fehlt")
+                if float(script_config['interval']) <= 0:
+                    raise ValueError(f"{script_name}: interval muss > 0 sein")
+        except Exception as e:
+            self.logger.error(f"💥 Config reload ({reason}) failed, keeping current config: {e}")
+            return
+        
+        old_scripts = self.config['scripts']
+        new_scripts = new_config['scripts']
+        added = [name for name in new_scripts if name not in old_scripts]
+        removed = [name for name in old_scripts if name not in new_scripts]
+        changed = [name for name in new_scripts if name in old_scripts
+                   and self.strip_runtime(new_scripts[name]) != self.strip_runtime(old_scripts[name])]
+        
+        for section in ('scheduler', 'metrics', 'status_socket', 'runlog'):
+            if new_config.get(section) != self.config.get(section):
+                self.logger.warning(f"⚠️ Config reload: changes to '{section}' require a restart")
+        
+        now = time.monotonic()
+        for script_name in removed:
+            self.unschedule_script(script_name)
+        for script_name in changed:
+            old_config, new_script = old_scripts[script_name], new_scripts[script_name]
+            for key in RUNTIME_KEYS:
+                if key in old_config:
+                    new_script[key] = old_config[key]
+            if not new_script.get('enabled', True):
+                self.unschedule_script(script_name)
+            elif not old_config.get('enabled', True) or script_name not in self.next_runs:
+                self.schedule_script(script_name, now)
+            elif new_script['interval'] != old_config['interval']:
+                # Phase behalten: nächster Termin = letzter Soll-Termin + neues Intervall
+                last_due = self.next_runs[script_name] - old_config['interval']
+                self.schedule_script(script_name, max(now, last_due + new_script['interval']))
+        for script_name in added:
+            if new_scripts[script_name].get('enabled', True):
+                self.schedule_script(script_name, now)
+        
+        # Nicht umgeplante Scripts behalten ihren Heap-Eintrag und nutzen beim nächsten Takt die neue Konfiguration
+        self.config['scripts'] = new_scripts
+        self.wakeup.set()
+        
+        if added or removed or changed:
+            self.logger.info(f"🔁 Config reloaded ({reason}): {len(added)} added, {len(removed)} removed, "
+                             f"{len(changed)} changed, {len(new_scripts) - len(added) - len(changed)} unchanged")
+            for label, names in (('added', added), ('removed', removed), ('changed', changed)):
+                if names:
+                    self.logger.info(f"   {label}: {', '.join(names)}")
+        else:
+            self.logger.info(f"🔁 Config reloaded ({reason}): no script changes")
+    
+    @staticmethod
+    def strip_runtime(script_config):
+        return {k: v for k, v in script_config.items() if k not in RUNTIME_KEYS}
+    
+    async def config_watch_loop(self, interval):
+        """Optionaler Reload bei geänderter mtime von config.yaml (config_watch: Sekunden)"""
+        while not self.shutdown_event.is_set():
+            try:
+                await asyncio.wait_for(self.shutdown_event.wait(), timeout=interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+            mtime = self.get_config_mtime()
+            if mtime is not None and mtime != self.config_mtime:
+                self.reload_config("mtime")
     
     def setup_logging(self):
         """Konfiguriert Logging"""
@@ -82,17 +261,110 @@ class EdgeMonitoringDaemon:
             )
             self.logger = logging.getLogger(__name__)
     
+    def setup_runlog(self):
+        """Strukturiertes Run-Log (ein JSON-Record pro Start/Ende), abschaltbar mit runlog.dir: off"""
+        self.runlog = None
+        runlog_config = self.config.get('runlog') or {}
+        directory = runlog_config.get('dir')
+        if directory is None:
+            directory = RUNLOG_DIR if self.is_root else os.path.expanduser('~/edge-monitoring-runs')
+        # YAML macht aus unquotiertem "off" ein False
+        if not directory or str(directory).lower() in ('off', 'none'):
+            return
+        try:
+            self.runlog = RunLogWriter(
+                directory,
+                segment_bytes=int(runlog_config.get('segment_bytes', 8 * 1024 * 1024)),
+                keep=int(runlog_config.get('keep', 20))
+            )
+            self.logger.info(f"📝 Run log: {directory}")
+        except OSError as e:
+            self.logger.error(f"💥 Run log could not be opened in {directory}: {e}")
+    
+    def write_runlog(self, event):
+        if self.runlog is None:
+            return
+        try:
+            self.runlog.write(event)
+        except OSError as e:
+            self.logger.error(f"💥 Run log write failed, disabling run log: {e}")
+            self.runlog = None
+    
     def should_run_script(self, script_name, script_config):
         """Prüft ob Script ausgeführt werden soll"""
-        if script_name in self.running_scripts:
+        if not script_config.get('enabled', True):
             return False
         
-        if 'last_run' not in script_config:
-            return True
+        # Kein zweiter Lauf, solange der vorherige noch läuft oder auf einen Slot wartet
+        if script_name in self.running_scripts or script_name in self.queued_scripts:
+            return False
         
-        now = datetime.now()
-        time_since_last = (now - script_config['last_run']).total_seconds()
-        return time_since_last >= script_config['interval']
+        return True
+    
+    def get_script_stats(self, script_name):
+        """Liefert (und initialisiert) die Statistiken eines Scripts"""
+        if script_name not in self.script_stats:
+            self.script_stats[script_name] = {
+                'total_runs': 0,
+                'successful_runs': 0,
+                'failed_runs': 0,
+                'last_run': None,
+                'last_duration': None,
+                'last_status': None,
+                'last_lag': None,
+                'max_lag': 0.0,
+                'missed_ticks': 0,
+                'skipped_runs': 0
+            }
+        return self.script_stats[script_name]
+    
+    def get_plugin(self, script_name, script_config):
+        """Lädt ein Collector-Modul für mode: plugin (einmalig, danach aus dem Cache)
+        
+        Das Modul muss eine Coroutine collect(args, context) -> int bereitstellen.
+        Gibt None zurück, wenn das Script im Subprocess-Modus laufen soll.
+        """
+        if script_config.get('mode', 'subprocess') != 'plugin':
+            return None
+        
+        path = script_config['path']
+        if path in self.plugins:
+            return self.plugins[path]
+        
+        try:
+            # Script-Verzeichnis für Hilfsmodule (z.B. logstash_sender) importierbar machen
+            script_dir = os.path.dirname(os.path.abspath(path))
+            if script_dir not in sys.path:
+                sys.path.insert(0, script_dir)
+            
+            module_name = f"edge_plugin_{script_name}"
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            
+            if not inspect.iscoroutinefunction(getattr(module, 'collect', None)):
+                raise AttributeError("async def collect(args, context) fehlt")
+        except Exception as e:
+            self.logger.error(f"💥 {script_name}: Plugin konnte nicht geladen werden ({e}), verwende Subprocess-Modus")
+            module = None
+        
+        self.plugins[path] = module
+        if module is not None:
+            self.logger.info(f"🔌 {script_name}: Plugin geladen aus {path}")
+        return module
+    
+    async def shutdown_plugins(self):
+        """Ruft shutdown() der geladenen Plugins auf (Verbindungen schließen, Puffer senden)"""
+        for path, module in self.plugins.items():
+            hook = getattr(module, 'shutdown', None) if module is not None else None
+            if hook is None:
+                continue
+            try:
+                result = hook()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.logger.error(f"💥 Plugin-Shutdown fehlgeschlagen ({path}): {e}")
     
     async def run_script(self, script_name, script_config):
         """Führt Script aus"""
@@ -101,6 +373,9 @@ class EdgeMonitoringDaemon:
         duration = 0
         status = 'unknown'
         process = None
+        reaper = None
+        worker = None
+        cancel_event = threading.Event()
         
         # Script als laufend markieren
         self.running_scripts[script_name] = {
@@ -110,28 +385,55 @@ class EdgeMonitoringDaemon:
         
         try:
             self.logger.info(f"🔄 Starting {script_name}...")
+            self.write_runlog({'event': 'start', 'script': script_name})
             
-            # Script ausführen (sendet selbst an Logstash)
-            process = await asyncio.create_subprocess_exec(
-                'python3', script_config['path'], *script_config.get('args', []),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
+            # Absolute Deadline (Unix-Zeit), zu der der Lauf abgebrochen wird; Collectors
+            # kürzen daran ihre Timeouts und senden vorher, was sie gesammelt haben
+            deadline = time.time() + script_config.get('timeout', 300)
             
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(), 
-                timeout=script_config.get('timeout', 300)
-            )
+            plugin = self.get_plugin(script_name, script_config)
+            if plugin is not None:
+                # Plugin-Modus: Modul ist bereits importiert, collect() läuft im Daemon-Prozess
+                context = {
+                    'name': script_name,
+                    'timeout': script_config.get('timeout', 300),
+                    'deadline': deadline,
+                    'cancel': cancel_event,
+                    'logger': self.logger
+                }
+                # Eigener Task statt wait_for: ein Abbruch stoppt den Worker-Thread in collect()
+                # nicht, deshalb bleibt der Task bis zum echten Ende in running_scripts (siehe finally)
+                worker = asyncio.ensure_future(plugin.collect(list(script_config.get('args', [])), context))
+                done, _ = await asyncio.wait({worker}, timeout=script_config.get('timeout', 300))
+                if not done:
+                    raise asyncio.TimeoutError()
+                returncode = worker.result()
+                error_output = f"collect() returned {returncode}"
+            else:
+                # Script ausführen (sendet selbst an Logstash); stdout wird nicht ausgewertet
+                process = subprocess.Popen(
+                    ['python3', script_config['path'], *script_config.get('args', [])],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    env={**os.environ, DEADLINE_ENV: f"{deadline:.3f}"}
+                )
+                reaper = start_reaper(process)
+                
+                returncode, stderr, _ = await asyncio.wait_for(
+                    asyncio.shield(reaper),
+                    timeout=script_config.get('timeout', 300)
+                )
+                error_output = stderr.decode()
             
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
             
-            if process.returncode == 0:
+            if returncode == 0:
                 self.logger.info(f"✅ {script_name} completed successfully in {duration:.1f}s")
                 script_config['last_run'] = end_time
                 status = 'success'
             else:
-                self.logger.error(f"❌ {script_name} failed: {stderr.decode()}")
+                self.logger.error(f"❌ {script_name} failed: {error_output}")
                 status = 'failed'
                 
         except asyncio.TimeoutError:
@@ -139,15 +441,16 @@ class EdgeMonitoringDaemon:
             duration = (end_time - start_time).total_seconds()
             self.logger.error(f"⏰ {script_name} timed out after {duration:.1f}s")
             status = 'timeout'
+            cancel_event.set()
             
             # Prozess bei Timeout beenden
             if process and process.returncode is None:
                 try:
                     process.terminate()
-                    await asyncio.wait_for(process.wait(), timeout=5.0)
+                    await asyncio.wait_for(asyncio.shield(reaper), timeout=5.0)
                 except asyncio.TimeoutError:
                     process.kill()
-                    await process.wait()
+                    await reaper
                 except Exception:
                     pass
         except asyncio.CancelledError:
@@ -156,17 +459,18 @@ class EdgeMonitoringDaemon:
             duration = (end_time - start_time).total_seconds()
             self.logger.warning(f"⚠️ {script_name} was cancelled after {duration:.1f}s")
             status = 'cancelled'
+            cancel_event.set()
             
             # Versuche den Prozess sauber zu beenden
             if process and process.returncode is None:
                 try:
                     process.terminate()
                     # Gib dem Prozess 5 Sekunden Zeit zum Beenden
-                    await asyncio.wait_for(process.wait(), timeout=5.0)
+                    await asyncio.wait_for(asyncio.shield(reaper), timeout=5.0)
                 except asyncio.TimeoutError:
                     # Wenn er nicht beendet, kill ihn
                     process.kill()
-                    await process.wait()
+                    await reaper
                 except Exception:
                     pass  # Ignoriere Fehler beim Cleanup
             
@@ -182,29 +486,61 @@ class EdgeMonitoringDaemon:
                 end_time = datetime.now()
                 duration = (end_time - start_time).total_seconds()
             # Script-Statistiken aktualisieren
-            if script_name not in self.script_stats:
-                self.script_stats[script_name] = {
-                    'total_runs': 0,
-                    'successful_runs': 0,
-                    'failed_runs': 0,
-                    'last_run': None,
-                    'last_duration': None,
-                    'last_status': None
-                }
-            
-            self.script_stats[script_name]['total_runs'] += 1
-            self.script_stats[script_name]['last_run'] = end_time
-            self.script_stats[script_name]['last_duration'] = duration
-            self.script_stats[script_name]['last_status'] = status
+            stats = self.get_script_stats(script_name)
+            stats['total_runs'] += 1
+            stats['last_run'] = end_time
+            stats['last_duration'] = duration
+            stats['last_status'] = status
             
             if status == 'success':
-                self.script_stats[script_name]['successful_runs'] += 1
+                stats['successful_runs'] += 1
             else:
-                self.script_stats[script_name]['failed_runs'] += 1
+                stats['failed_runs'] += 1
+            self.metrics.observe_run(script_name, status, duration)
+            if reaper is not None and reaper.done() and not reaper.cancelled() and reaper.exception() is None:
+                # CPU/RSS pro Script nur im Subprocess-Modus (Plugins laufen im Daemon-Prozess)
+                self.metrics.observe_usage(script_name, reaper.result()[2])
+            self.write_runlog({
+                'event': 'finish',
+                'script': script_name,
+                'status': status,
+                'duration': round(duration, 3),
+                'lag': round(stats['last_lag'], 3) if stats['last_lag'] is not None else None
+            })
             
-            # Script als beendet markieren
-            if script_name in self.running_scripts:
+            # Script als beendet markieren; ein abgebrochener Plugin-Worker blockiert weitere Läufe,
+            # bis sein Thread wirklich zurückkehrt (kein zweiter, überlappender Lauf im selben Prozess)
+            if worker is not None and not worker.done():
+                self.linger_plugin_worker(script_name, worker)
+            elif script_name in self.running_scripts:
+                del self.running_scripts[script_name]
+    
+    def linger_plugin_worker(self, script_name, worker):
+        """Hält einen abgebrochenen, noch arbeitenden Plugin-Lauf in running_scripts, bis er endet"""
+        entry = self.running_scripts.setdefault(script_name, {'start_time': datetime.now()})
+        entry['status'] = 'stopping'
+        entry['worker'] = worker
+        self.logger.warning(f"⏳ {script_name}: plugin worker still running after cancel, "
+                            f"new runs are skipped until it returns")
+        
+        def finished(task):
+            if self.running_scripts.get(script_name, {}).get('worker') is task:
                 del self.running_scripts[script_name]
+            error = task.exception() if not task.cancelled() else None
+            self.logger.info(f"🧹 {script_name}: cancelled plugin worker finished"
+                             + (f" with error: {error}" if error else ""))
+        
+        worker.add_done_callback(finished)
+    
+    async def wait_plugin_workers(self, timeout=30.0):
+        """Wartet beim Shutdown auf abgebrochene Plugin-Worker, bevor deren shutdown() läuft"""
+        workers = [entry['worker'] for entry in self.running_scripts.values() if entry.get('worker')]
+        if not workers:
+            return
+        self.logger.info(f"⏳ Waiting up to {timeout:.0f}s for {len(workers)} plugin worker(s) to return...")
+        _, pending = await asyncio.wait(workers, timeout=timeout)
+        if pending:
+            self.logger.warning(f"⚠️ {len(pending)} plugin worker(s) still running at shutdown")
     
     def print_status(self):
         """Zeigt aktuellen Status in der Konsole"""
@@ -223,6 +559,9 @@ class EdgeMonitoringDaemon:
         for script_name, script_config in self.config['scripts'].items():
             print(f"📋 Script: {script_name}")
             print(f"   Path: {script_config['path']}")
+            print(f"   Mode: {script_config.get('mode', 'subprocess')}")
+            if script_config.get('shard_of'):
+                print(f"   Shard: {script_config['args'][-1]} of {script_config['shard_of']}")
             print(f"   Interval: {script_config['interval']}s")
             print(f"   Timeout: {script_config.get('timeout', 300)}s")
             
@@ -230,25 +569,21 @@ class EdgeMonitoringDaemon:
             if script_name in self.running_scripts:
                 running = self.running_scripts[script_name]
                 duration = (datetime.now() - running['start_time']).total_seconds()
-                print(f"   Status: 🔄 RUNNING (since {duration:.1f}s)")
+                label = "STOPPING (cancelled, worker still busy)" if running.get('status') == 'stopping' else "RUNNING"
+                print(f"   Status: 🔄 {label} (since {duration:.1f}s)")
             else:
                 print(f"   Status: ⏸️  IDLE")
             
-            # Letzte Ausführung
+            # Letzte und nächste Ausführung
             if script_config.get('last_run'):
-                last_run = script_config['last_run']
-                next_run = last_run + timedelta(seconds=script_config['interval'])
-                print(f"   Last Run: {last_run.strftime('%Y-%m-%d %H:%M:%S')}")
-                print(f"   Next Run: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+                print(f"   Last Run: {script_config['last_run'].strftime('%Y-%m-%d %H:%M:%S')}")
             else:
                 print(f"   Last Run: Never")
-                # Wenn Script gerade läuft, zeige wann es fertig sein sollte
-                if script_name in self.running_scripts:
-                    estimated_end = self.running_scripts[script_name]['start_time'] + timedelta(seconds=script_config['interval'])
-                    print(f"   Next Run: ~{estimated_end.strftime('%Y-%m-%d %H:%M:%S')} (after current run)")
-                else:
-                    # Zeige sofort als nächste Ausführung
-                    print(f"   Next Run: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} (immediately)")
+            if not script_config.get('enabled', True):
+                print(f"   Next Run: disabled")
+            elif script_name in self.next_runs:
+                next_run = datetime.now() + timedelta(seconds=max(0.0, self.next_runs[script_name] - time.monotonic()))
+                print(f"   Next Run: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
             
             # Statistiken
             if script_name in self.script_stats:
@@ -258,21 +593,29 @@ class EdgeMonitoringDaemon:
                 print(f"   Success Rate: {success_rate:.1f}%")
                 print(f"   Last Duration: {stats['last_duration']:.1f}s" if stats['last_duration'] else "   Last Duration: N/A")
                 print(f"   Last Status: {stats['last_status']}")
+                if stats['last_lag'] is not None:
+                    print(f"   Schedule Lag: {stats['last_lag']:.2f}s (max {stats['max_lag']:.2f}s)")
+                if stats['missed_ticks'] or stats['skipped_runs']:
+                    print(f"   Missed Ticks: {stats['missed_ticks']}, Skipped (still running/queued): {stats['skipped_runs']}")
             
             print()
         
         print("="*60)
     
     def setup_signal_handlers(self):
-        """Setup für Signal-Handler"""
+        """Setup für Signal-Handler (im Event-Loop, damit Handler asyncio-Objekte anfassen dürfen)"""
         self.shutdown_event = asyncio.Event()
+        self.wakeup = asyncio.Event()  # weckt den Scheduler bei Shutdown oder geändertem Heap
+        loop = asyncio.get_running_loop()
         
-        def signal_handler(signum, frame):
+        def shutdown_handler(signum):
             print(f"\n🛑 Received signal {signum}, shutting down gracefully...")
             self.shutdown_event.set()
+            self.wakeup.set()
         
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, shutdown_handler, signum)
+        loop.add_signal_handler(signal.SIGHUP, self.reload_config, "SIGHUP")
     
     async def status_loop(self):
         """Status-Loop für regelmäßige Anzeige"""
@@ -287,6 +630,205 @@ class EdgeMonitoringDaemon:
                 # Timeout erreicht, Status anzeigen
                 self.print_status()
     
+    def schedule_script(self, script_name, due):
+        """Legt den nächsten Termin eines Scripts in den Heap (ersetzt einen vorhandenen)"""
+        self.schedule_seq += 1
+        heapq.heappush(self.schedule, (due, self.schedule_seq, script_name))
+        self.schedule_tokens[script_name] = self.schedule_seq
+        self.next_runs[script_name] = due
+    
+    def unschedule_script(self, script_name):
+        """Verwirft den Termin eines Scripts; der Heap-Eintrag wird beim Erreichen übersprungen"""
+        self.schedule_tokens.pop(script_name, None)
+        self.next_runs.pop(script_name, None)
+    
+    def build_schedule(self):
+        """Erster Termin pro Script: jetzt plus zufälliger Start-Jitter (verteilt Lastspitzen)"""
+        scheduler_config = self.config.get('scheduler') or {}
+        start_jitter = float(scheduler_config.get('start_jitter', 0))
+        now = time.monotonic()
+        for script_name, script_config in self.config['scripts'].items():
+            if not script_config.get('enabled', True):
+                continue
+            jitter = random.uniform(0, min(start_jitter, script_config['interval'])) if start_jitter > 0 else 0.0
+            self.schedule_script(script_name, now + jitter)
+    
+    async def run_scheduled(self, script_name, script_config, due):
+        """Wartet auf einen freien Job-Slot und startet das Script; misst die Verspätung"""
+        try:
+            async with self.job_slots:
+                self.queued_scripts.discard(script_name)
+                lag = time.monotonic() - due
+                stats = self.get_script_stats(script_name)
+                stats['last_lag'] = lag
+                stats['max_lag'] = max(stats['max_lag'], lag)
+                self.metrics.observe_lag(script_name, lag)
+                if lag > 1.0:
+                    self.logger.warning(f"⏱️ {script_name} started {lag:.1f}s behind schedule")
+                await self.run_script(script_name, script_config)
+        finally:
+            self.queued_scripts.discard(script_name)
+    
+    async def scheduler_loop(self):
+        """Zentraler Scheduler: Fixed-Rate-Ticks aus einem Heap der nächsten Termine"""
+        while not self.shutdown_event.is_set():
+            if not self.schedule:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            
+            due, seq, script_name = self.schedule[0]
+            if self.schedule_tokens.get(script_name) != seq:
+                # Durch Reload ersetzter oder entfernter Termin
+                heapq.heappop(self.schedule)
+                continue
+            delay = due - time.monotonic()
+            if delay > 0:
+                # Aufwachen bei Fälligkeit, Shutdown oder Reload (neuer, evtl. früherer Termin)
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            heapq.heappop(self.schedule)
+            script_config = self.config['scripts'].get(script_name)
+            if script_config is None:
+                self.unschedule_script(script_name)
+                continue
+            
+            # Fixed-Rate: nächster Termin relativ zum Soll-Termin, nicht zum Laufende.
+            # Verpasste Ticks (z.B. nach Suspend oder Überlast) werden zu einem Lauf zusammengefasst.
+            interval = script_config['interval']
+            missed = int((time.monotonic() - due) // interval)
+            stats = self.get_script_stats(script_name)
+            if missed > 0:
+                stats['missed_ticks'] += missed
+                self.metrics.count_missed(script_name, missed)
+                self.logger.warning(f"⏭️ {script_name}: {missed} missed tick(s) coalesced")
+            self.schedule_script(script_name, due + (missed + 1) * interval)
+            
+            if not self.should_run_script(script_name, script_config):
+                if script_config.get('enabled', True):
+                    stats['skipped_runs'] += 1
+                    self.metrics.count_skipped(script_name)
+                    self.logger.warning(f"⏭️ {script_name} still running or queued, skipping this tick")
+                continue
+            
+            self.queued_scripts.add(script_name)
+            self.running_tasks = [task for task in self.running_tasks if not task.done()]
+            self.running_tasks.append(asyncio.create_task(self.run_scheduled(script_name, script_config, due)))
+    
+    def render_metrics(self):
+        uptime = (datetime.now() - self.start_time).total_seconds()
+        return self.metrics.render(self.running_scripts, uptime)
+    
+    async def start_metrics_server(self):
+        """Startet den Prometheus-Endpunkt (metrics.enabled), standardmäßig nur auf localhost"""
+        metrics_config = self.config.get('metrics') or {}
+        if not metrics_config.get('enabled', False):
+            return
+        host = metrics_config.get('host', '127.0.0.1')
+        port = int(metrics_config.get('port', 9464))
+        try:
+            self.metrics_server = await serve_metrics(self.render_metrics, host, port)
+            self.logger.info(f"📈 Metrics endpoint listening on http://{host}:{port}/metrics")
+        except OSError as e:
+            self.logger.error(f"💥 Metrics endpoint could not be started on {host}:{port}: {e}")
+    
+    def status_snapshot(self):
+        """Aktueller In-Memory-Zustand als JSON-serialisierbares Dict (für status_daemon.py)"""
+        now = datetime.now()
+        now_mono = time.monotonic()
+        scripts = {}
+        for script_name, script_config in self.config['scripts'].items():
+            running = self.running_scripts.get(script_name)
+            if running:
+                # stopping = abgebrochener Plugin-Lauf, dessen Worker-Thread noch arbeitet
+                state = 'stopping' if running.get('status') == 'stopping' else 'running'
+            elif script_name in self.queued_scripts:
+                state = 'queued'
+            elif not script_config.get('enabled', True):
+                state = 'disabled'
+            else:
+                state = 'idle'
+            
+            entry = {
+                'path': script_config['path'],
+                'mode': script_config.get('mode', 'subprocess'),
+                'interval': script_config['interval'],
+                'timeout': script_config.get('timeout', 300),
+                'enabled': script_config.get('enabled', True),
+                'shard_of': script_config.get('shard_of'),
+                'state': state,
+                'running_since': running['start_time'].isoformat() if running else None,
+                'running_for': (now - running['start_time']).total_seconds() if running else None,
+                'next_run': None
+            }
+            if script_name in self.next_runs and script_config.get('enabled', True):
+                next_run = now + timedelta(seconds=max(0.0, self.next_runs[script_name] - now_mono))
+                entry['next_run'] = next_run.isoformat()
+            
+            stats = dict(self.get_script_stats(script_name))
+            if stats['last_run'] is not None:
+                stats['last_run'] = stats['last_run'].isoformat()
+            entry['stats'] = stats
+            scripts[script_name] = entry
+        
+        return {
+            'pid': os.getpid(),
+            'started': self.start_time.isoformat(),
+            'uptime': (now - self.start_time).total_seconds(),
+            'running': len(self.running_scripts),
+            'queued': len(self.queued_scripts),
+            'runlog_dir': self.runlog.directory if self.runlog else None,
+            'scripts': scripts
+        }
+    
+    async def handle_status_client(self, reader, writer):
+        """Beantwortet jede Verbindung mit einem JSON-Snapshot (eine Zeile) und schließt sie"""
+        try:
+            writer.write(json.dumps(self.status_snapshot()).encode('utf-8') + b'\n')
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def start_status_server(self):
+        """Startet den Status-Socket (Unix Domain Socket, nur für root/monitoring lesbar)"""
+        socket_path = self.config.get('status_socket')
+        if socket_path is None:
+            if self.is_root:
+                socket_path = '/run/edge-monitoring/status.sock'
+            else:
+                socket_path = os.path.expanduser('~/edge-monitoring.sock')
+        if not socket_path or str(socket_path).lower() in ('off', 'none'):
+            return
+        
+        try:
+            os.makedirs(os.path.dirname(socket_path) or '.', exist_ok=True)
+            # Verwaister Socket eines vorherigen Laufs
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self.status_server = await asyncio.start_unix_server(self.handle_status_client, path=socket_path)
+            os.chmod(socket_path, 0o660)
+            self.status_socket = socket_path
+            self.logger.info(f"🔌 Status socket listening on {socket_path}")
+        except OSError as e:
+            self.logger.error(f"💥 Status socket could not be started on {socket_path}: {e}")
+    
+    async def stop_status_server(self):
+        if self.status_server is None:
+            return
+        self.status_server.close()
+        await self.status_server.wait_closed()
+        try:
+            os.unlink(self.status_socket)
+        except OSError:
+            pass
+    
     async def main_loop(self):
         """Hauptschleife"""
         self.logger.info("🚀 Edge Monitoring Daemon started")
@@ -295,33 +837,28 @@ class EdgeMonitoringDaemon:
         # Alle laufenden Tasks sammeln
         self.running_tasks = []
         
+        scheduler_config = self.config.get('scheduler') or {}
+        max_concurrent = int(scheduler_config.get('max_concurrent', 4))
+        self.job_slots = asyncio.Semaphore(max_concurrent)
+        
         try:
+            await self.start_metrics_server()
+            await self.start_status_server()
+            
             # Status-Loop starten
             status_task = asyncio.create_task(self.status_loop())
             self.running_tasks.append(status_task)
             
-            # Timer für jedes Script erstellen
-            for script_name, script_config in self.config['scripts'].items():
-                # Sofort ausführen beim Start
-                task = asyncio.create_task(self.run_script(script_name, script_config))
-                self.running_tasks.append(task)
-                
-                # Timer für regelmäßige Ausführung
-                async def timer_loop(name=script_name, config=script_config):
-                    while not self.shutdown_event.is_set():
-                        try:
-                            await asyncio.wait_for(
-                                self.shutdown_event.wait(), 
-                                timeout=config['interval']
-                            )
-                            break  # Shutdown requested
-                        except asyncio.TimeoutError:
-                            # Interval erreicht, Script ausführen
-                            if not self.shutdown_event.is_set():
-                                await self.run_script(name, config)
-                
-                timer_task = asyncio.create_task(timer_loop())
-                self.running_tasks.append(timer_task)
+            # Scheduler starten (ersetzt die Timer-Schleife pro Script)
+            self.build_schedule()
+            scheduler_task = asyncio.create_task(self.scheduler_loop())
+            self.running_tasks.append(scheduler_task)
+            
+            # Optional: config.yaml bei geänderter mtime neu laden (zusätzlich zu SIGHUP)
+            config_watch = float(self.config.get('config_watch') or 0)
+            if config_watch > 0:
+                self.running_tasks.append(asyncio.create_task(self.config_watch_loop(config_watch)))
+                self.logger.info(f"👀 Watching {self.config_file} for changes every {config_watch:.0f}s")
             
             # Warte auf Shutdown
             await self.shutdown_event.wait()
@@ -329,15 +866,24 @@ class EdgeMonitoringDaemon:
             self.logger.info("🛑 Shutdown initiated, cancelling tasks...")
             
             # Alle Tasks abbrechen
-            for task in self.running_tasks:
+            tasks = list(self.running_tasks)
+            for task in tasks:
                 if not task.done():
                     task.cancel()
             
             # Warte darauf, dass alle Tasks beendet sind
-            await asyncio.gather(*self.running_tasks, return_exceptions=True)
+            await asyncio.gather(*tasks, return_exceptions=True)
             
             # Kleine Verzögerung für Subprocess-Cleanup
             await asyncio.sleep(0.1)
+            await self.wait_plugin_workers()
+            await self.shutdown_plugins()
+            if self.metrics_server is not None:
+                self.metrics_server.close()
+                await self.metrics_server.wait_closed()
+            await self.stop_status_server()
+            if self.runlog is not None:
+                self.runlog.close()
             
             self.logger.info("✅ All tasks cancelled, shutting down cleanly")
             self.print_status()
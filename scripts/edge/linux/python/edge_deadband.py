@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Deadband-Filter für Edge-Monitoring
+Sendet Sensorwerte nur bei relevanter Änderung, Statuswechsel oder als
+periodischen Keyframe; der Zustand überlebt Läufe in einer kleinen JSON-Datei
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+from edge_state import load_state, save_state
+
+# ---- Konfiguration ----
+KEYFRAME_EVERY = int(os.getenv("EDGE_KEYFRAME_EVERY", "12"))
+
+class DeadbandFilter:
+    """Change-only-Filter pro (Host, Sensor)
+
+    check() liefert None, wenn der Wert unterdrückt wird, sonst eine
+    Annotation {"suppressed": n, "keyframe": bool} für das Dokument.
+    "suppressed" ist die Zahl der seit der letzten Emission unterdrückten
+    Messungen dieses Sensors, damit Dashboards Lücken korrekt gewichten.
+    """
+
+    def __init__(self, state_file: str, deadbands: Dict[str, float],
+                 keyframe_every: int = KEYFRAME_EVERY):
+        self.state_file = state_file
+        self.deadbands = deadbands
+        self.keyframe_every = max(1, keyframe_every)
+        self.cycle = 0
+        self.sensors: Dict[str, Dict[str, Any]] = {}
+        self.stats = {'emitted': 0, 'suppressed': 0, 'keyframes': 0}
+        self.load()
+
+    def load(self):
+        state = load_state(self.state_file, "Deadband-State")
+        try:
+            self.cycle = int(state.get("cycle", 0))
+        except (TypeError, ValueError):
+            self.cycle = 0
+        self.sensors = state.get("sensors", {})
+
+    def save(self):
+        """Schreibt den Zustand atomar; Sensoren, die lange nicht mehr gesehen wurden, fliegen raus"""
+        horizon = self.cycle - 10 * self.keyframe_every
+        self.sensors = {key: s for key, s in self.sensors.items() if s.get("c", 0) >= horizon}
+        save_state(self.state_file, {"cycle": self.cycle, "sensors": self.sensors})
+
+    def begin_cycle(self):
+        self.cycle += 1
+        self.stats = {'emitted': 0, 'suppressed': 0, 'keyframes': 0}
+
+    def check(self, key: str, kind: str, value: Optional[float],
+              status: Optional[str]) -> Optional[Dict[str, Any]]:
+        last = self.sensors.get(key)
+        if last is not None:
+            last["c"] = self.cycle
+            changed = last.get("s") != status
+            if not changed:
+                previous = last.get("v")
+                if (value is None) != (previous is None):
+                    changed = True
+                elif value is not None and abs(value - previous) > self.deadbands.get(kind, 0.0):
+                    changed = True
+            keyframe = last.get("n", 0) + 1 >= self.keyframe_every
+            if not changed and not keyframe:
+                last["n"] = last.get("n", 0) + 1
+                self.stats['suppressed'] += 1
+                return None
+            suppressed = last.get("n", 0)
+        else:
+            keyframe = True
+            changed = False
+            suppressed = 0
+
+        self.sensors[key] = {"v": value, "s": status, "n": 0, "c": self.cycle}
+        self.stats['emitted'] += 1
+        is_keyframe = keyframe and not changed
+        if is_keyframe:
+            self.stats['keyframes'] += 1
+        return {"suppressed": suppressed, "keyframe": is_keyframe}
+
+    def summary(self) -> str:
+        s = self.stats
+        return f"{s['emitted']} gesendet ({s['keyframes']} Keyframes), {s['suppressed']} unterdrückt"
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Deadline-Weitergabe für Edge-Monitoring
+Der Daemon übergibt jedem Lauf den absoluten Zeitpunkt, zu dem er das
+Script abbricht (EDGE_DEADLINE, Unix-Zeit). Collectors leiten daraus die
+Timeouts pro Host ab, überspringen Hosts, die nicht mehr fertig werden,
+und behalten eine Reserve, um gesammelte Dokumente noch zu senden.
+Im Plugin-Modus kommt das cancel-Event des Daemons dazu: nach einem
+Abbruch startet keine Abfrage mehr.
+"""
+
+import os
+import math
+import time
+import threading
+from typing import Optional, Set
+
+# ---- Konfiguration ----
+DEADLINE_ENV = "EDGE_DEADLINE"
+RESERVE = float(os.getenv("EDGE_DEADLINE_RESERVE", "5.0"))           # Zeit für den Flush am Ende
+MIN_TIMEOUT = float(os.getenv("EDGE_DEADLINE_MIN_TIMEOUT", "2.0"))   # kürzerer Restbudget -> Host überspringen
+
+class DeadlineExceeded(Exception):
+    """Für diese Abfrage reicht das Restbudget nicht mehr"""
+
+class Deadline:
+    """Absolute Deadline eines Laufs (None = keine, z.B. manueller Aufruf)
+
+    timeout() liefert den Timeout für die nächste Abfrage: den normalen
+    Timeout, gekürzt auf das Restbudget abzüglich reserve. Ist dieses
+    kleiner als min_timeout oder cancel gesetzt, wird DeadlineExceeded
+    geworfen.
+    """
+
+    def __init__(self, at: Optional[float], reserve: float = RESERVE, min_timeout: float = MIN_TIMEOUT,
+                 cancel: Optional[threading.Event] = None):
+        self.at = at
+        self.reserve = reserve
+        self.min_timeout = min_timeout
+        self.cancel = cancel
+        self._lock = threading.Lock()
+        self._skipped: Set[str] = set()
+        self._completed: Set[str] = set()
+
+    @classmethod
+    def from_env(cls, at: Optional[float] = None, cancel: Optional[threading.Event] = None) -> "Deadline":
+        """Deadline aus dem Plugin-Kontext (at, cancel) oder aus EDGE_DEADLINE"""
+        if at is None:
+            value = os.getenv(DEADLINE_ENV, "")
+            try:
+                at = float(value) if value else None
+            except ValueError:
+                print(f"[!] Ungültige {DEADLINE_ENV}='{value}', ignoriert")
+        return cls(at, cancel=cancel)
+
+    def remaining(self) -> float:
+        return math.inf if self.at is None else self.at - time.time()
+
+    @property
+    def cancelled(self) -> bool:
+        """Der Daemon hat den Lauf abgebrochen (Timeout oder Shutdown im Plugin-Modus)"""
+        return self.cancel is not None and self.cancel.is_set()
+
+    def timeout(self, default: float) -> float:
+        if self.cancelled:
+            raise DeadlineExceeded("Abbruch angefordert")
+        budget = self.remaining() - self.reserve
+        if budget < min(self.min_timeout, default):
+            raise DeadlineExceeded(f"Restbudget {max(budget, 0.0):.1f}s")
+        return min(default, budget)
+
+    def skip(self, host: str):
+        """Mindestens eine Abfrage des Hosts wurde aus Zeitmangel nicht gestartet"""
+        with self._lock:
+            self._skipped.add(host)
+
+    def complete(self, host: str):
+        """Mindestens eine Abfrage des Hosts wurde durchgeführt (auch fehlgeschlagene)"""
+        with self._lock:
+            self._completed.add(host)
+
+    @property
+    def skipped(self) -> int:
+        """Hosts, von denen gar nichts abgefragt wurde"""
+        with self._lock:
+            return len(self._skipped - self._completed)
+
+    @property
+    def partial(self) -> int:
+        """Hosts, bei denen nur ein Teil der Abfragen lief"""
+        with self._lock:
+            return len(self._skipped & self._completed)
+
+    def summary(self) -> str:
+        return f"{self.skipped} Hosts übersprungen, {self.partial} unvollständig ({self.describe()})"
+
+    def describe(self) -> str:
+        if self.at is None:
+            return "keine Deadline"
+        return f"Deadline in {self.remaining():.1f}s (Reserve {self.reserve:.0f}s)"
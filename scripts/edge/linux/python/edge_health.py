@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker für Edge-Monitoring
+Merkt sich pro Host aufeinanderfolgende Fehler; nach K Fehlern wird der
+Host mit exponentiellem Backoff übersprungen und vor der vollen Abfrage
+erst mit einem billigen Probe geprüft. Der Zustand überlebt Läufe in
+einer kleinen JSON-Datei.
+"""
+
+import os
+import time
+import random
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from edge_state import load_state, save_state
+
+# ---- Konfiguration ----
+FAILURE_THRESHOLD = int(os.getenv("EDGE_BREAKER_FAILURES", "3"))
+BACKOFF_BASE = float(os.getenv("EDGE_BREAKER_BACKOFF", "300"))        # erste Pause in s
+BACKOFF_MAX = float(os.getenv("EDGE_BREAKER_BACKOFF_MAX", "3600"))    # Obergrenze in s
+
+# Entscheidungen von admit()
+POLL = "poll"
+PROBE = "probe"
+SKIP = "skip"
+
+class HostHealth:
+    """Per-Host Circuit Breaker (closed -> open mit Backoff -> Probe -> closed)
+
+    Gezählt werden aufeinanderfolgende fehlgeschlagene Abfragen; eine
+    erfolgreiche Abfrage setzt den Zähler zurück. Ab threshold Fehlern ist
+    der Host bis "until" gesperrt, die Pause verdoppelt sich mit jedem
+    weiteren Fehler (bis max_backoff, plus bis zu 10 % Jitter).
+    """
+
+    def __init__(self, state_file: str, threshold: int = FAILURE_THRESHOLD,
+                 base_backoff: float = BACKOFF_BASE, max_backoff: float = BACKOFF_MAX):
+        self.state_file = state_file
+        self.threshold = max(1, threshold)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.hosts: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'skipped': 0, 'probed': 0, 'opened': 0, 'recovered': 0}
+        self.load()
+
+    def load(self):
+        self.hosts = load_state(self.state_file, "Health-State").get("hosts", {})
+
+    def save(self):
+        with self._lock:
+            save_state(self.state_file, {"hosts": self.hosts})
+
+    def admit(self, host: str) -> str:
+        """POLL (normal), PROBE (Backoff abgelaufen, erst billig prüfen) oder SKIP"""
+        with self._lock:
+            state = self.hosts.get(host)
+            if state is None or state.get("failures", 0) < self.threshold:
+                return POLL
+            if time.time() < state.get("until", 0):
+                self.stats['skipped'] += 1
+                return SKIP
+            self.stats['probed'] += 1
+            return PROBE
+
+    def record_success(self, host: str):
+        with self._lock:
+            state = self.hosts.pop(host, None)
+            if state is not None and state.get("failures", 0) >= self.threshold:
+                self.stats['recovered'] += 1
+                print(f"[✓] {host}: wieder erreichbar nach {state['failures']} Fehlern, Circuit Breaker geschlossen")
+
+    def record_failure(self, host: str, error: Any):
+        with self._lock:
+            state = self.hosts.setdefault(host, {"failures": 0})
+            state["failures"] = state.get("failures", 0) + 1
+            state["last_error"] = str(error)[:300]
+            state["last_failure"] = time.time()
+            excess = state["failures"] - self.threshold
+            if excess < 0:
+                return
+            backoff = min(self.max_backoff, self.base_backoff * (2 ** min(excess, 20)))
+            backoff *= 1 + random.uniform(0, 0.1)
+            state["until"] = time.time() + backoff
+            if excess == 0:
+                self.stats['opened'] += 1
+            print(f"[!] {host}: {state['failures']} Fehler in Folge, pausiere {backoff:.0f}s (Circuit Breaker)")
+
+    def should_report(self, host: str) -> bool:
+        """True genau einmal pro Backoff-Fenster (für das Fehler-Dokument übersprungener Hosts)"""
+        with self._lock:
+            state = self.hosts.get(host)
+            if state is None or state.get("reported") == state.get("until"):
+                return False
+            state["reported"] = state.get("until")
+            return True
+
+    def info(self, host: str) -> Dict[str, Any]:
+        with self._lock:
+            state = dict(self.hosts.get(host) or {})
+        return {
+            "failures": state.get("failures", 0),
+            "retry_at": state.get("until"),
+            "last_error": state.get("last_error")
+        }
+
+    def summary(self) -> str:
+        s = self.stats
+        open_hosts = sum(1 for st in self.hosts.values() if st.get("failures", 0) >= self.threshold)
+        return (f"{open_hosts} Hosts im Backoff, {s['skipped']} übersprungen, "
+                f"{s['probed']} Probes, {s['opened']} neu gesperrt, {s['recovered']} wieder aufgenommen")
+
+class HostOutcomes:
+    """Ergebnis pro Host für einen Lauf (alle Datentypen, alle Sampling-Durchläufe)
+
+    HostHealth bekommt pro Host genau ein Ergebnis, erst mit commit() nach dem
+    letzten Durchlauf. Ein Fehler bei irgendeinem Datentyp oder Durchlauf macht
+    den ganzen Lauf zum Fehler; ein Erfolg bei einem anderen Datentyp setzt ihn
+    nicht zurück. Hosts mit Fehler werden im selben Fenster nicht erneut
+    abgefragt. Nur vom Haupt-Thread benutzen.
+    """
+
+    def __init__(self, health: HostHealth):
+        self.health = health
+        self.decisions: Dict[str, str] = {}
+        self.errors: Dict[str, str] = {}
+        self.succeeded: Set[str] = set()
+
+    def admit(self, host: str) -> Optional[str]:
+        """Wie HostHealth.admit(), aber einmal pro Lauf; None = Host hatte im Lauf schon einen Fehler"""
+        if host in self.errors:
+            return None
+        decision = self.decisions.get(host)
+        if decision is None:
+            decision = self.decisions[host] = self.health.admit(host)
+        if decision == PROBE and host in self.succeeded:
+            # Probe hat in einem früheren Durchlauf schon geklappt
+            return POLL
+        return decision
+
+    def success(self, host: str):
+        self.succeeded.add(host)
+
+    def failure(self, host: str, error: Any):
+        # Erster Fehler des Laufs zählt
+        self.errors.setdefault(host, str(error))
+
+    def commit(self) -> List[str]:
+        """Meldet jedes Ergebnis an HostHealth; gibt die Hosts zurück, die aus dem Backoff kamen und wieder fehlschlugen"""
+        for host in self.succeeded - set(self.errors):
+            self.health.record_success(host)
+        for host, error in self.errors.items():
+            self.health.record_failure(host, error)
+        return [host for host in self.errors if self.decisions.get(host) == PROBE]
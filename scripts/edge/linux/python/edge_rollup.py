@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Sampling mit Rollups für Edge-Monitoring
+Collectors fragen innerhalb eines Laufs mehrfach ab (z.B. alle 15s) und
+senden am Ende pro Sensor ein Dokument mit min/max/avg/last/count des
+Fensters statt eines Dokuments pro Abfrage. Kurze Temperatur- oder
+Leistungsspitzen werden so sichtbar, ohne mehr Events ins RZ zu schicken.
+"""
+
+import os
+import math
+import time
+import threading
+from array import array
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from edge_deadline import Deadline
+
+# ---- Konfiguration ----
+SAMPLE_INTERVAL = float(os.getenv("EDGE_SAMPLE_INTERVAL", "0"))   # 0 = ein Durchlauf pro Lauf (kein Sampling)
+ROLLUP_WINDOW = float(os.getenv("EDGE_ROLLUP_WINDOW", "0"))       # 0 = bis kurz vor die Deadline des Daemons
+FALLBACK_WINDOW = 60.0                                            # Fenster ohne Deadline (manueller Aufruf)
+
+class RollupBuffer:
+    """Samples pro Sensor als array('d') plus der zuletzt gesehene Sensor-Datensatz
+
+    add() ist thread-sicher. rollups() liefert pro Sensor (key, latest, rollup);
+    rollup ist None, wenn im Fenster kein numerischer Wert kam (z.B. reine
+    Status-Sensoren), dann zählt nur latest.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, array] = {}
+        self._latest: Dict[str, Any] = {}
+        self.started = time.time()
+        self.passes = 0
+
+    def add(self, key: str, value: Optional[float], latest: Any):
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = array("d")
+            if value is not None:
+                values.append(value)
+            self._latest[key] = latest
+
+    def rollups(self) -> Iterator[Tuple[str, Any, Optional[Dict[str, Any]]]]:
+        window = round(time.time() - self.started, 1)
+        with self._lock:
+            items = [(key, self._latest[key], values) for key, values in self._values.items()]
+        for key, latest, values in items:
+            stats = rollup(values)
+            if stats is not None:
+                stats["window_s"] = window
+                stats["samples"] = self.passes
+            yield key, latest, stats
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+def rollup(values: array) -> Optional[Dict[str, Any]]:
+    """min/max/avg/last/count über die Samples (C-Schleifen von min/max/fsum über das array)"""
+    count = len(values)
+    if not count:
+        return None
+    return {
+        "min": min(values),
+        "max": max(values),
+        "avg": round(math.fsum(values) / count, 3),
+        "last": values[-1],
+        "count": count
+    }
+
+def sample_passes(interval: float, window: float, deadline: Deadline,
+                  cancel: Optional[threading.Event] = None,
+                  buffer: Optional[RollupBuffer] = None) -> Iterator[int]:
+    """Liefert die Nummern der Abfrage-Durchläufe im Abstand interval
+
+    Ein weiterer Durchlauf startet nur, wenn er (geschätzt nach dem längsten
+    bisherigen) vor Fensterende und vor Deadline minus Reserve fertig wird.
+    Ohne interval gibt es genau einen Durchlauf.
+    """
+    if window <= 0:
+        window = deadline.remaining() - deadline.reserve if deadline.at is not None else FALLBACK_WINDOW
+    start = time.monotonic()
+    longest = 0.0
+    number = 0
+    while True:
+        pass_start = time.monotonic()
+        yield number
+        number += 1
+        if buffer is not None:
+            buffer.passes = number
+        longest = max(longest, time.monotonic() - pass_start)
+        if interval <= 0:
+            return
+        next_start = pass_start + interval
+        end = min(start + window, time.monotonic() + deadline.remaining() - deadline.reserve)
+        if next_start + longest > end:
+            return
+        delay = next_start - time.monotonic()
+        if delay > 0:
+            if cancel is not None:
+                if cancel.wait(delay):
+                    return
+            else:
+                time.sleep(delay)
+        elif cancel is not None and cancel.is_set():
+            return
+
+def describe(interval: float, window: float) -> str:
+    if interval <= 0:
+        return "kein Sampling"
+    span = f"{window:g}s" if window > 0 else "bis zur Deadline"
+    return f"Sampling alle {interval:g}s, Rollup über {span}"
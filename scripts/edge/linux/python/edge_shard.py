@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Host-Sharding für Edge-Monitoring
+Verteilt das Host-Inventar stabil auf N Shards (Prozesse oder Edge-Knoten)
+"""
+
+import os
+import hashlib
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+# Default für --shard, z.B. EDGE_SHARD="1/4" auf dem zweiten von vier Edge-Knoten
+SHARD_SPEC = os.getenv("EDGE_SHARD", "")
+
+def parse_shard(spec: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Parst "i/N" (0-basiert) zu (i, N); leer/None bedeutet kein Sharding"""
+    if not spec:
+        return None
+    try:
+        index_str, total_str = spec.split("/", 1)
+        index, total = int(index_str), int(total_str)
+    except ValueError:
+        raise ValueError(f"Ungültige Shard-Angabe '{spec}', erwartet i/N (z.B. 0/4)")
+    if total < 1 or not 0 <= index < total:
+        raise ValueError(f"Ungültige Shard-Angabe '{spec}': 0 <= i < N erforderlich")
+    return index, total
+
+def _score(shard: int, key: str) -> int:
+    digest = hashlib.blake2b(f"{shard}:{key}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+def shard_of(key: str, total: int) -> int:
+    """Rendezvous-Hashing: Shard mit dem höchsten Score für den Key
+
+    Ändert sich N, wandern nur ~1/N der Hosts auf einen anderen Shard.
+    """
+    return max(range(total), key=lambda shard: _score(shard, key))
+
+def select_shard(items: Iterable[Any], spec: Optional[str],
+                 key: Callable[[Any], str]) -> List[Any]:
+    """Filtert items auf die Einträge des Shards spec ("i/N")"""
+    items = list(items)
+    shard = parse_shard(spec)
+    if shard is None:
+        return items
+    index, total = shard
+    return [item for item in items if shard_of(str(key(item)), total) == index]
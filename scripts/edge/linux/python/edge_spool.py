@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Disk-Spool für Edge-Monitoring
+Puffert nicht zustellbare NDJSON-Zeilen in append-only Segment-Dateien,
+bis der Edge-Logstash wieder erreichbar ist
+"""
+
+import os
+import time
+import fcntl
+from typing import Callable, List, Optional, Tuple
+
+# ---- Konfiguration ----
+SPOOL_DIR = os.getenv("EDGE_SPOOL_DIR", "/var/spool/edge-monitoring")
+SPOOL_MAX_BYTES = int(os.getenv("EDGE_SPOOL_MAX_BYTES", str(256 * 1024 * 1024)))
+SPOOL_MAX_AGE = float(os.getenv("EDGE_SPOOL_MAX_AGE", str(7 * 24 * 3600)))
+SPOOL_SEGMENT_BYTES = int(os.getenv("EDGE_SPOOL_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+REPLAY_CHUNK_BYTES = int(os.getenv("EDGE_SPOOL_REPLAY_CHUNK", str(256 * 1024)))
+REPLAY_MAX_BYTES = int(os.getenv("EDGE_SPOOL_REPLAY_MAX_BYTES", str(4 * 1024 * 1024)))  # pro Replay-Aufruf
+
+SEGMENT_PREFIX = "seg-"
+SEGMENT_SUFFIX = ".ndjson"
+
+class DiskSpool:
+    """Begrenzter Spool aus append-only Segmenten (ein offenes Segment pro Prozess)
+
+    Segmente werden nach Größe rotiert. Vor jedem neuen Segment werden Segmente
+    gelöscht, die älter als max_age sind oder das Gesamtlimit max_bytes
+    überschreiten (älteste zuerst). Ein Prozess hält auf seinem offenen Segment
+    einen Shared-Lock, damit ein parallel laufender Replay es nicht anfasst;
+    Replay und Löschen nehmen einen exklusiven Lock und überspringen Segmente,
+    die gerade ein anderer Prozess hält.
+    Die Zustellung ist at-least-once: bricht ein Replay ab, wird höchstens
+    der zuletzt gesendete Chunk erneut übertragen. Ein Replay sendet höchstens
+    max_bytes bzw. bis stop_at, der Rest folgt beim nächsten Aufruf.
+    """
+
+    def __init__(self, directory: str,
+                 max_bytes: int = SPOOL_MAX_BYTES,
+                 max_age: float = SPOOL_MAX_AGE,
+                 segment_bytes: int = SPOOL_SEGMENT_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, mode=0o750, exist_ok=True)
+
+        self._file = None
+        self._path: Optional[str] = None
+        self.stats = {
+            'docs_spooled': 0,
+            'bytes_spooled': 0,
+            'docs_replayed': 0,
+            'bytes_replayed': 0,
+            'segments_dropped': 0
+        }
+
+    # ---- Schreiben ----
+    def _open_segment(self):
+        # Limits nur bei Rotation prüfen statt bei jedem append (listdir + stat pro Segment)
+        self.enforce_limits()
+        name = f"{SEGMENT_PREFIX}{time.time_ns():020d}-{os.getpid()}{SEGMENT_SUFFIX}"
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path, "ab")
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_SH)
+
+    def seal(self):
+        """Schließt das offene Segment, damit es beim Replay berücksichtigt wird"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._path = None
+
+    def append(self, payload: bytes):
+        """Hängt NDJSON-Zeilen an das offene Segment an"""
+        if not payload:
+            return
+        if self._file is None:
+            self._open_segment()
+        self._file.write(payload)
+        self._file.flush()
+        self.stats['docs_spooled'] += payload.count(b"\n")
+        self.stats['bytes_spooled'] += len(payload)
+        if self._file.tell() >= self.segment_bytes:
+            self.seal()
+
+    # ---- Verwaltung ----
+    def segments(self) -> List[str]:
+        """Alle Segmente, älteste zuerst"""
+        try:
+            names = [n for n in os.listdir(self.directory)
+                     if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX)]
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, n) for n in sorted(names)]
+
+    def pending_bytes(self) -> int:
+        total = 0
+        for path in self.segments():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def enforce_limits(self):
+        """Löscht zu alte Segmente und die ältesten, solange max_bytes überschritten ist"""
+        now = time.time()
+        entries = []
+        for path in self.segments():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+
+        total = sum(size for _, size, _ in entries)
+        for path, size, mtime in entries:
+            if path == self._path:
+                continue
+            if now - mtime > self.max_age or total > self.max_bytes:
+                if self._drop_segment(path):
+                    total -= size
+
+    def _drop_segment(self, path: str) -> bool:
+        """Löscht ein Segment unter exklusivem Lock; False wenn es gerade geschrieben oder abgespielt wird"""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            os.unlink(path)
+        except OSError:
+            return False
+        finally:
+            os.close(fd)
+        self.stats['segments_dropped'] += 1
+        print(f"[!] Spool-Segment verworfen (Alter/Größenlimit): {os.path.basename(path)}")
+        return True
+
+    # ---- Replay ----
+    def _keep_rest(self, path: str, data: bytes, offset: int):
+        """Gesendeten Anfang eines Segments entfernen, Rest behalten (atomar per rename)"""
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data[offset:])
+        os.replace(tmp, path)
+
+    def replay(self, write: Callable[[bytes], None],
+               chunk_bytes: int = REPLAY_CHUNK_BYTES,
+               max_bytes: int = REPLAY_MAX_BYTES,
+               stop_at: Optional[float] = None) -> Tuple[int, int, bool]:
+        """Sendet abgeschlossene Segmente in großen Chunks über write()
+
+        Erfolgreich gesendete Segmente werden gelöscht. Vor jedem Chunk wird
+        das Budget geprüft: sind max_bytes gesendet oder ist stop_at
+        (time.monotonic()) erreicht, bleibt der Rest im Segment. Wirft
+        write() eine Exception, bleibt der nicht gesendete Rest ebenfalls im
+        Segment und die Exception wird weitergereicht.
+        Gibt (docs, bytes, fertig) zurück; fertig=False heißt, es ist noch
+        etwas übrig.
+        """
+        self.seal()
+        docs = 0
+        sent = 0
+        done = True
+
+        def exhausted() -> bool:
+            return sent >= max_bytes or (stop_at is not None and time.monotonic() >= stop_at)
+
+        for path in self.segments():
+            if exhausted():
+                done = False
+                break
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                try:
+                    # Segmente, die ein anderer Prozess noch schreibt oder gerade abspielt, überspringen
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                with os.fdopen(os.dup(fd), "rb") as f:
+                    data = f.read()
+                offset = 0
+                try:
+                    while offset < len(data):
+                        if offset and exhausted():
+                            done = False
+                            break
+                        end = data.rfind(b"\n", offset, offset + chunk_bytes) + 1
+                        if end <= offset:
+                            # Zeile länger als chunk_bytes: bis zum nächsten Zeilenende senden
+                            end = data.find(b"\n", offset) + 1 or len(data)
+                        chunk = data[offset:end]
+                        write(chunk)
+                        offset = end
+                        docs += chunk.count(b"\n")
+                        sent += len(chunk)
+                except Exception:
+                    self._keep_rest(path, data, offset)
+                    raise
+                if offset < len(data):
+                    self._keep_rest(path, data, offset)
+                else:
+                    os.unlink(path)
+            finally:
+                os.close(fd)
+
+        self.stats['docs_replayed'] += docs
+        self.stats['bytes_replayed'] += sent
+        return docs, sent, done
+
+def open_spool(name: str) -> Optional[DiskSpool]:
+    """Spool unter SPOOL_DIR/<name>; None wenn deaktiviert (EDGE_SPOOL_DIR=off) oder nicht beschreibbar"""
+    if not SPOOL_DIR or SPOOL_DIR.lower() in ("off", "none", "0"):
+        return None
+    directory = os.path.join(SPOOL_DIR, name)
+    try:
+        spool = DiskSpool(directory)
+    except OSError as e:
+        print(f"[!] Spool-Verzeichnis {directory} nicht nutzbar, Spool deaktiviert: {e}")
+        return None
+    if not os.access(directory, os.W_OK):
+        print(f"[!] Spool-Verzeichnis {directory} nicht beschreibbar, Spool deaktiviert")
+        return None
+    return spool
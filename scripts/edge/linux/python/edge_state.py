@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+State-Dateien für Edge-Monitoring
+Pfade pro Collector und Shard sowie Laden und atomares Speichern der kleinen
+JSON-Dateien, in denen Collectors und Helfer-Module ihren Zustand über
+Läufe hinweg halten
+"""
+
+import os
+import json
+from typing import Any, Dict, Optional
+
+# ---- Konfiguration ----
+STATE_DIR = os.getenv("EDGE_STATE_DIR", "/var/lib/edge-monitoring")
+
+def state_path(kind: str, shard: Optional[str] = None, directory: str = STATE_DIR,
+               ext: str = ".json") -> str:
+    """Pfad einer State-Datei, pro Shard getrennt (Shards laufen als eigene Prozesse)
+
+    kind z.B. "ipmi-deadband" oder "ilo-sessions"; Shard "2/4" wird zu "-shard2of4".
+    """
+    suffix = f"-shard{shard.replace('/', 'of')}" if shard else ""
+    return os.path.join(directory, f"{kind}{suffix}{ext}")
+
+def load_state(path: str, label: str) -> Dict[str, Any]:
+    """Inhalt einer State-Datei; {} wenn sie fehlt oder unlesbar ist (label für die Meldung)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"[!] {label} {path} unlesbar, starte neu: {e}")
+        return {}
+    return state if isinstance(state, dict) else {}
+
+def save_state(path: str, state: Dict[str, Any], mode: Optional[int] = None):
+    """Schreibt den Zustand atomar (tmp + os.replace); mode z.B. 0o600 für Zugangsdaten"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = path + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666 if mode is None else mode)
+    if mode is not None:
+        os.fchmod(fd, mode)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(tmp, path)
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Lokaler Zeitreihen-Speicher für Edge-Monitoring
+Hält die letzten N Messwerte pro (Host, Sensor) in einer memory-mapped
+Ringpuffer-Datei fester Größe, damit Trends und Raten auch ohne Uplink
+direkt auf dem Edge abfragbar sind. Host-, Sensor- und Einheitennamen
+stehen einmal in einer Namenstabelle (interniert), die Serien verweisen
+nur auf deren Index. Gesucht wird über einen Hash des vollständigen Namens,
+lange Namen werden nur für die Anzeige gekürzt.
+
+CLI:
+    python3 edge_tsdb.py list --host srv-01
+    python3 edge_tsdb.py last srv-01 "temp/CPU1 Temp" -n 10
+    python3 edge_tsdb.py stats srv-01 "temp/CPU1 Temp" --minutes 60
+"""
+
+import os
+import sys
+import glob
+import mmap
+import fcntl
+import hashlib
+import struct
+import argparse
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from edge_state import STATE_DIR, state_path
+
+# ---- Konfiguration ----
+TSDB_ENABLED = os.getenv("EDGE_TSDB", "1") != "0"
+TSDB_DIR = os.getenv("EDGE_TSDB_DIR", os.path.join(STATE_DIR, "tsdb"))
+TSDB_SERIES = int(os.getenv("EDGE_TSDB_SERIES", "4096"))   # max. (Host, Sensor)-Paare pro Datei
+TSDB_DEPTH = int(os.getenv("EDGE_TSDB_DEPTH", "288"))      # Werte pro Serie (288 x 300s = 24h)
+TSDB_NAMES = int(os.getenv("EDGE_TSDB_NAMES", "8192"))     # Einträge der Namenstabelle
+
+# ---- Dateiformat (little endian, alle Bereiche 8-Byte-aligned) ----
+# Header | Namenstabelle (NAME_BYTES pro Name) | Serienverzeichnis | Daten (ts, value als double)
+MAGIC = b"EDGETSDB"
+VERSION = 2                                # 2: Hash des vollen Namens in der Namenstabelle
+HEADER = struct.Struct("<8sIIIIII")        # magic, version, series_cap, depth, name_cap, n_names, n_series
+HEADER_BYTES = 64
+NAME_BYTES = 64                            # 8 Byte Hash + 1 Byte Länge + max. 55 Byte UTF-8 (Anzeige)
+NAME_HASH_BYTES = 8
+NAME_TEXT_BYTES = NAME_BYTES - NAME_HASH_BYTES - 1
+SERIES = struct.Struct("<IIIIQ8x")         # host_id, sensor_id, unit_id, reserviert, Anzahl geschriebener Werte
+COUNT = struct.Struct("<Q")
+COUNT_OFFSET = 16                          # Position des Zählers im Serieneintrag
+N_NAMES_OFFSET = 24
+N_SERIES_OFFSET = 28
+FILE_SUFFIX = ".ring"
+
+def name_key(name: str) -> bytes:
+    """Hash des vollständigen Namens (blake2b, 8 Byte); Schlüssel der Namenstabelle"""
+    return hashlib.blake2b(name.encode("utf-8"), digest_size=NAME_HASH_BYTES).digest()
+
+def truncated(text: str, key: bytes) -> str:
+    """Anzeigename eines gekürzten Namens; der Hash-Anfang hält gleiche Präfixe auseinander"""
+    return f"{text}…{key[:4].hex()}"
+
+class RingStore:
+    """Ringpuffer fester Größe pro (Host, Sensor) in einer mmap-Datei
+
+    Ein Prozess schreibt (exklusiver flock auf die Datei), beliebig viele
+    lesen ohne Lock. Schreibreihenfolge Wert -> Zähler bzw. Name -> Anzahl,
+    Leser sehen daher höchstens den gerade geschriebenen Wert noch nicht.
+    Ist das Serienverzeichnis oder die Namenstabelle voll, werden neue
+    Serien verworfen (stats['dropped']). Eine Datei älterer Version legt
+    der Writer neu an.
+    """
+
+    def __init__(self, path: str, writable: bool = False, series_cap: int = TSDB_SERIES,
+                 depth: int = TSDB_DEPTH, name_cap: int = TSDB_NAMES):
+        self.path = path
+        self.writable = writable
+        self._lock = threading.Lock()
+        self.stats = {'written': 0, 'series_created': 0, 'dropped': 0}
+
+        if writable:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, mode=0o750, exist_ok=True)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o640)
+            try:
+                # Zweiter Writer (z.B. manueller Lauf neben dem Daemon) -> BlockingIOError
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                if os.fstat(fd).st_size == 0 or self._outdated(fd):
+                    self._create(fd, series_cap, depth, name_cap)
+            except Exception:
+                os.close(fd)
+                raise
+        else:
+            fd = os.open(path, os.O_RDONLY)
+        self._fd = fd
+
+        try:
+            self._mm = mmap.mmap(fd, 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+            magic, version, self.series_cap, self.depth, self.name_cap, _, _ = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path}: kein TSDB-Ringpuffer (Version {VERSION})")
+            self._series_off = HEADER_BYTES + self.name_cap * NAME_BYTES
+            self._data_off = self._series_off + self.series_cap * SERIES.size
+            if len(self._mm) < self._data_off + self.series_cap * self.depth * 16:
+                raise ValueError(f"{path}: Datei zu kurz")
+        except Exception:
+            os.close(fd)
+            raise
+        # Daten als Array von doubles: Serie s, Position i -> [ts, value] bei 2 * (s * depth + i)
+        self._data = memoryview(self._mm)[self._data_off:].cast("d")
+
+        self._names: List[str] = []
+        self._name_ids: Dict[bytes, int] = {}
+        self._display_ids: Dict[str, int] = {}    # Anzeigename (ggf. gekürzt, wie series() ihn liefert)
+        self._series: Dict[Tuple[int, int], int] = {}
+        self._series_list: List[Tuple[int, int, int]] = []
+        self.refresh()
+
+    def _outdated(self, fd: int) -> bool:
+        """Ringpuffer einer älteren Version (wird verworfen, die Werte sind nur ein Cache)"""
+        magic, version = struct.unpack("<8sI", os.pread(fd, 12, 0))
+        if magic != MAGIC or version >= VERSION:
+            return False
+        print(f"[*] TSDB {self.path}: Version {version} -> {VERSION}, starte leer")
+        return True
+
+    @staticmethod
+    def _create(fd: int, series_cap: int, depth: int, name_cap: int):
+        size = HEADER_BYTES + name_cap * NAME_BYTES + series_cap * (SERIES.size + depth * 16)
+        os.ftruncate(fd, 0)
+        os.ftruncate(fd, size)    # sparse, belegt erst beim Schreiben Platz
+        os.pwrite(fd, HEADER.pack(MAGIC, VERSION, series_cap, depth, name_cap, 0, 0), 0)
+
+    def refresh(self):
+        """Übernimmt Namen und Serien, die ein Writer seit dem letzten Aufruf angelegt hat"""
+        n_names, n_series = struct.unpack_from("<II", self._mm, N_NAMES_OFFSET)
+        for name_id in range(len(self._names), min(n_names, self.name_cap)):
+            offset = HEADER_BYTES + name_id * NAME_BYTES
+            key = bytes(self._mm[offset:offset + NAME_HASH_BYTES])
+            length = self._mm[offset + NAME_HASH_BYTES]
+            text = offset + NAME_HASH_BYTES + 1
+            name = self._mm[text:text + length].decode("utf-8", "replace")
+            if name_key(name) != key:
+                name = truncated(name, key)
+            self._names.append(name)
+            self._name_ids.setdefault(key, name_id)
+            self._display_ids.setdefault(name, name_id)
+        for slot in range(len(self._series_list), min(n_series, self.series_cap)):
+            host_id, sensor_id, unit_id, _, _ = SERIES.unpack_from(self._mm, self._series_off + slot * SERIES.size)
+            self._series[(host_id, sensor_id)] = slot
+            self._series_list.append((host_id, sensor_id, unit_id))
+
+    # ---- Schreiben ----
+    def _intern(self, name: str) -> Optional[int]:
+        key = name_key(name)
+        name_id = self._name_ids.get(key)
+        if name_id is not None:
+            return name_id
+        name_id = len(self._names)
+        if name_id >= self.name_cap:
+            return None
+        # Anzeige auf NAME_TEXT_BYTES kürzen, ohne ein UTF-8-Zeichen zu zerschneiden
+        raw = name.encode("utf-8")[:NAME_TEXT_BYTES].decode("utf-8", "ignore").encode("utf-8")
+        offset = HEADER_BYTES + name_id * NAME_BYTES
+        self._mm[offset:offset + NAME_HASH_BYTES] = key
+        self._mm[offset + NAME_HASH_BYTES] = len(raw)
+        text = offset + NAME_HASH_BYTES + 1
+        self._mm[text:text + len(raw)] = raw
+        struct.pack_into("<I", self._mm, N_NAMES_OFFSET, name_id + 1)
+        display = name if len(raw) == len(name.encode("utf-8")) else truncated(raw.decode("utf-8"), key)
+        self._names.append(display)
+        self._name_ids[key] = name_id
+        self._display_ids.setdefault(display, name_id)
+        return name_id
+
+    def _slot(self, host: str, sensor: str, unit: str) -> Optional[int]:
+        host_id = self._intern(host)
+        sensor_id = self._intern(sensor)
+        if host_id is None or sensor_id is None:
+            return None
+        slot = self._series.get((host_id, sensor_id))
+        if slot is not None:
+            return slot
+        slot = len(self._series_list)
+        unit_id = self._intern(unit) if unit else None
+        if slot >= self.series_cap or (unit and unit_id is None):
+            return None
+        unit_id = 0xFFFFFFFF if unit_id is None else unit_id
+        SERIES.pack_into(self._mm, self._series_off + slot * SERIES.size, host_id, sensor_id, unit_id, 0, 0)
+        struct.pack_into("<I", self._mm, N_SERIES_OFFSET, slot + 1)
+        self._series[(host_id, sensor_id)] = slot
+        self._series_list.append((host_id, sensor_id, unit_id))
+        self.stats['series_created'] += 1
+        return slot
+
+    def record(self, host: str, sensor: str, value: float, ts: Optional[float] = None, unit: str = ""):
+        """Hängt einen Messwert an die Serie (host, sensor) an (legt sie bei Bedarf an)"""
+        with self._lock:
+            slot = self._slot(host, sensor, unit)
+            if slot is None:
+                self.stats['dropped'] += 1
+                return
+            count_off = self._series_off + slot * SERIES.size + COUNT_OFFSET
+            count = COUNT.unpack_from(self._mm, count_off)[0]
+            index = 2 * (slot * self.depth + count % self.depth)
+            self._data[index] = time.time() if ts is None else ts
+            self._data[index + 1] = float(value)
+            COUNT.pack_into(self._mm, count_off, count + 1)
+            self.stats['written'] += 1
+
+    # ---- Lesen ----
+    def series(self, host: Optional[str] = None) -> List[Tuple[str, str, str, int]]:
+        """(Host, Sensor, Einheit, Anzahl Werte) aller Serien, optional nur eines Hosts"""
+        self.refresh()
+        wanted = None if host is None else self._name_id(host)
+        result = []
+        for slot, (host_id, sensor_id, unit_id) in enumerate(self._series_list):
+            if host is not None and host_id != wanted:
+                continue
+            host_name = self._names[host_id]
+            unit = self._names[unit_id] if unit_id < len(self._names) else ""
+            count = COUNT.unpack_from(self._mm, self._series_off + slot * SERIES.size + COUNT_OFFSET)[0]
+            result.append((host_name, self._names[sensor_id], unit, min(count, self.depth)))
+        return result
+
+    def values(self, host: str, sensor: str, n: Optional[int] = None,
+               since: Optional[float] = None) -> Tuple[List[float], List[float]]:
+        """(Zeitstempel, Werte) einer Serie, älteste zuerst; leer wenn unbekannt"""
+        slot = self._find(host, sensor)
+        if slot is None:
+            return [], []
+        count = COUNT.unpack_from(self._mm, self._series_off + slot * SERIES.size + COUNT_OFFSET)[0]
+        filled = min(count, self.depth)
+        base = 2 * slot * self.depth
+        ring = self._data[base:base + 2 * filled].tolist()
+        start = 2 * (count % self.depth) if count > self.depth else 0
+        pairs = ring[start:] + ring[:start]
+        ts, vals = pairs[0::2], pairs[1::2]
+        if since is not None:
+            cut = next((i for i, t in enumerate(ts) if t >= since), len(ts))
+            ts, vals = ts[cut:], vals[cut:]
+        if n is not None:
+            ts, vals = ts[-n:] if n else [], vals[-n:] if n else []
+        return ts, vals
+
+    def stats_for(self, host: str, sensor: str, n: Optional[int] = None,
+                  since: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """count/min/max/avg/last und Steigung (Einheit pro Sekunde) über das Fenster"""
+        ts, vals = self.values(host, sensor, n, since)
+        if not vals:
+            return None
+        return {
+            "count": len(vals),
+            "min": min(vals),
+            "max": max(vals),
+            "avg": sum(vals) / len(vals),
+            "last": vals[-1],
+            "last_ts": ts[-1],
+            "slope": slope(ts, vals)
+        }
+
+    def _name_id(self, name: str) -> Optional[int]:
+        # Voller Name; gekürzte Namen aus series() ("…<Hash>") über den Anzeigenamen
+        name_id = self._name_ids.get(name_key(name))
+        return self._display_ids.get(name) if name_id is None else name_id
+
+    def _find(self, host: str, sensor: str) -> Optional[int]:
+        key = (self._name_id(host), self._name_id(sensor))
+        if None in key or key not in self._series:
+            self.refresh()
+            key = (self._name_id(host), self._name_id(sensor))
+        return self._series.get(key)
+
+    def reset_stats(self):
+        """Setzt die Zähler zurück (z.B. zu Beginn eines Laufs im Plugin-Modus)"""
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{s['written']} Werte, {s['series_created']} neue Serien "
+                f"({len(self._series_list)}/{self.series_cap}), {s['dropped']} verworfen")
+
+    def close(self):
+        with self._lock:
+            if self._mm is None:
+                return
+            self._data.release()
+            self._mm.close()
+            self._mm = None
+            os.close(self._fd)
+
+def slope(ts: List[float], values: List[float]) -> Optional[float]:
+    """Steigung der Ausgleichsgeraden (Einheit pro Sekunde); None bei < 2 Punkten"""
+    n = len(values)
+    if n < 2:
+        return None
+    mean_t = sum(ts) / n
+    mean_v = sum(values) / n
+    var = sum((t - mean_t) ** 2 for t in ts)
+    if var == 0:
+        return None
+    return sum((t - mean_t) * (v - mean_v) for t, v in zip(ts, values)) / var
+
+def open_tsdb(name: str, shard: Optional[str] = None) -> Optional[RingStore]:
+    """Writer für einen Collector; None wenn deaktiviert (EDGE_TSDB=0) oder nicht nutzbar"""
+    if not TSDB_ENABLED:
+        return None
+    # Pro Shard eine eigene Datei (ein Writer pro Datei)
+    path = state_path(name, shard, TSDB_DIR, FILE_SUFFIX)
+    try:
+        return RingStore(path, writable=True)
+    except BlockingIOError:
+        print(f"[!] TSDB {path} wird von einem anderen Prozess geschrieben, lokale Zeitreihen aus")
+    except (OSError, ValueError) as e:
+        print(f"[!] TSDB {path} nicht nutzbar, lokale Zeitreihen aus: {e}")
+    return None
+
+def open_readers(directory: str = TSDB_DIR) -> Dict[str, RingStore]:
+    """Alle Ringpuffer eines Verzeichnisses lesend öffnen ({Dateiname ohne Endung: Store})"""
+    stores = {}
+    for path in sorted(glob.glob(os.path.join(directory, f"*{FILE_SUFFIX}"))):
+        try:
+            stores[os.path.basename(path)[:-len(FILE_SUFFIX)]] = RingStore(path)
+        except (OSError, ValueError) as e:
+            print(f"[!] {path}: {e}")
+    return stores
+
+# ---- CLI ----
+def _fmt_time(ts: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Lokale Zeitreihen der Edge-Collectors abfragen")
+    parser.add_argument("--dir", default=TSDB_DIR, help=f"TSDB-Verzeichnis (Default: {TSDB_DIR})")
+    parser.add_argument("--store", help="Nur diese Datei, z.B. ipmi oder ilo-shard0of4")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list", help="Serien auflisten")
+    p_list.add_argument("--host")
+    p_last = sub.add_parser("last", help="Letzte N Werte einer Serie")
+    p_last.add_argument("host")
+    p_last.add_argument("sensor")
+    p_last.add_argument("-n", type=int, default=10)
+    p_stats = sub.add_parser("stats", help="min/max/avg/Steigung über ein Zeitfenster")
+    p_stats.add_argument("host")
+    p_stats.add_argument("sensor")
+    p_stats.add_argument("--minutes", type=float, default=60)
+    args = parser.parse_args(argv)
+
+    stores = open_readers(args.dir)
+    if args.store:
+        stores = {k: v for k, v in stores.items() if k == args.store}
+    if not stores:
+        print(f"[!] Keine Zeitreihen in {args.dir}")
+        return 1
+
+    found = False
+    for store_name, store in stores.items():
+        if args.command == "list":
+            for host, sensor, unit, count in store.series(args.host):
+                found = True
+                print(f"{store_name:<16} {host:<24} {sensor:<40} {count:>5} Werte {unit}")
+        elif args.command == "last":
+            ts, vals = store.values(args.host, args.sensor, n=args.n)
+            for t, v in zip(ts, vals):
+                found = True
+                print(f"{store_name:<16} {_fmt_time(t)}  {v:g}")
+        else:
+            started = time.perf_counter()
+            s = store.stats_for(args.host, args.sensor, since=time.time() - args.minutes * 60)
+            elapsed_us = (time.perf_counter() - started) * 1e6
+            if s is None:
+                continue
+            found = True
+            trend = f"{s['slope'] * 3600:+.3g}/h" if s['slope'] is not None else "n/a"
+            print(f"{store_name}: {s['count']} Werte in {args.minutes:g} min, min {s['min']:g}, "
+                  f"max {s['max']:g}, avg {s['avg']:.3g}, zuletzt {s['last']:g} ({_fmt_time(s['last_ts'])}), "
+                  f"Trend {trend} [{elapsed_us:.0f} µs]")
+    if not found:
+        print("[!] Keine passenden Serien gefunden")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,111 +1,391 @@
 #!/usr/bin/env python3
 import os
-import json
-import socket
+import glob
+import time
+import hashlib
+import asyncio
+import argparse
+import threading
 import yaml
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from requests.adapters import HTTPAdapter, Retry
 from urllib3.exceptions import InsecureRequestWarning
+from logstash_sender import LogstashSender, create_sender
+from edge_spool import open_spool
+from edge_shard import SHARD_SPEC, select_shard
+from edge_deadband import DeadbandFilter, KEYFRAME_EVERY
+from edge_health import HostHealth, HostOutcomes, PROBE, SKIP
+from edge_state import load_state, save_state, state_path
+from edge_deadline import Deadline, DeadlineExceeded
+from edge_tsdb import open_tsdb
+from edge_alerts import REDFISH_HEALTH_LEVELS, REDFISH_NOT_PRESENT, build_alert_doc, open_alerts
+from edge_rollup import RollupBuffer, ROLLUP_WINDOW, SAMPLE_INTERVAL, describe as describe_sampling, sample_passes
 requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
 
 # ---- Konfiguration (per ENV über dein Edge-Setup) ----
 EDGE_HOST = os.getenv("EDGE_HOST", "192.168.168.161")
 EDGE_PORT = int(os.getenv("EDGE_PORT", "10530"))
+EDGE_HTTP_PORT = int(os.getenv("EDGE_HTTP_PORT", "10531"))   # nur EDGE_OUTPUT=http
 HOSTS_FILE = os.getenv("ILO_HOSTS_FILE", "/etc/ilo/hosts.yml")
 TIMEOUT = float(os.getenv("ILO_TIMEOUT", "10.0"))
+MAX_WORKERS = int(os.getenv("ILO_MAX_WORKERS", "8"))
+POOL_SIZE = int(os.getenv("ILO_POOL_SIZE", "2"))
+DELTA_MODE = os.getenv("ILO_DELTA", "0").lower() in ("1", "true", "yes")
+COMPACT_MODE = os.getenv("ILO_COMPACT", "0").lower() in ("1", "true", "yes")
+DEADBANDS = {
+    "thermal": float(os.getenv("ILO_DEADBAND_TEMP", "0.5")),   # °C
+    "fan": float(os.getenv("ILO_DEADBAND_FAN", "2.0")),        # % bzw. RPM
+    "power": float(os.getenv("ILO_DEADBAND_POWER", "5.0"))     # W
+}
+PROBE_TIMEOUT = min(TIMEOUT, float(os.getenv("ILO_PROBE_TIMEOUT", "5.0")))  # Redfish Service Root
+DATASETS = [d.strip() for d in os.getenv("ILO_DATASETS", "thermal").split(",") if d.strip()]  # thermal,fan,power
+CAPS_MAX_AGE = float(os.getenv("ILO_CAPS_MAX_AGE", str(24 * 3600)))  # Service Root neu lesen nach (s)
+SESSION_AUTH = os.getenv("ILO_SESSION_AUTH", "1").lower() in ("1", "true", "yes")  # X-Auth-Token statt Basic Auth
+SESSION_RETRY = float(os.getenv("ILO_SESSION_RETRY", "3600"))  # nach nicht unterstütztem Login Basic Auth für (s)
 
-# ---- HTTP Session mit Retries aufbauen ----
-session = requests.Session()
+CHASSIS_PATH = "/redfish/v1/Chassis/1"
+# Messwert-Feld in metrics.* -> Einheit für die Konsolenausgabe
+METRIC_UNITS = {"celsius": "°C", "percent": "%", "rpm": "RPM", "watts": "W"}
+
+# ---- HTTP Sessions (eine Keep-Alive-Session mit eigenem Pool pro iLO) ----
 retries = Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504])
-session.mount("https://", HTTPAdapter(max_retries=retries))
-
-# ---- Logstash TCP Socket vorbereiten ----
-def open_socket():
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.settimeout(5.0)
-    s.connect((EDGE_HOST, EDGE_PORT))
-    return s
-
-def send_json(sock, doc: dict):
-    line = json.dumps(doc, ensure_ascii=False) + "\n"
-    sock.sendall(line.encode("utf-8"))
-
-# ---- Hosts laden ----
-with open(HOSTS_FILE, "r", encoding="utf-8") as f:
-    cfg = yaml.safe_load(f) or {}
-ilos = cfg.get("ilos", [])
-if not ilos:
-    print("[!] Keine iLO-Hosts in hosts.yml gefunden.")
-    raise SystemExit(1)
-
-# ---- Socket öffnen (einmal) ----
-try:
-    sock = open_socket()
-except Exception as e:
-    print(f"[!] Konnte nicht zu Logstash verbinden: {e}")
-    raise SystemExit(2)
-
-# ---- Abfrage & Versand ----
-for entry in ilos:
-    ilo_host = entry["host"]
-    ilo_name = entry.get("name", ilo_host)
-    customer = entry.get("customer", "unknown")
-    username = entry["username"]
-    password = entry["password"]
+_sessions = {}
+_sessions_lock = threading.Lock()
+_session_files = set()  # Session-State-Dateien der Läufe dieses Prozesses (für shutdown)
 
-    url = f"https://{ilo_host}/redfish/v1/Chassis/1/Thermal"
-    try:
-        resp = session.get(url, auth=(username, password), verify=False, timeout=TIMEOUT)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.RequestException as e:
-        # Fehlerereignis (ECS-konform als event.type=error)
-        err_doc = {
-            "@timestamp": datetime.now(timezone.utc).isoformat(),
-            "event": {
-                "kind": "event",
-                "category": ["hardware"],
-                "type": ["error"],
-                "outcome": "failure",
-                "dataset": "ilo.thermal"
-            },
-            "service": {"type": "ilo"},
-            "host": {"name": ilo_name, "ip": [ilo_host]},
-            "observer": {
-                "vendor": "HPE",
-                "product": "iLO"
-            },
-            "hpe": {"ilo": {"error": str(e)}}
+def get_session(ilo_host: str) -> requests.Session:
+    """Liefert die Session für einen iLO; TLS-Verbindungen bleiben über Requests hinweg offen"""
+    with _sessions_lock:
+        session = _sessions.get(ilo_host)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE,
+                                                  max_retries=retries))
+            _sessions[ilo_host] = session
+        return session
+
+# ---- Redfish-Fähigkeiten ($expand/$select) pro iLO ----
+class RedfishCaps:
+    """Unterstützte Query-Parameter pro iLO aus ProtocolFeaturesSupported der Service Root
+
+    Wird nur gebraucht, wenn Power gesammelt wird (Thermal enthält Temperaturen
+    und Lüfter bereits in einer Antwort). Der Zustand liegt in einer kleinen
+    JSON-Datei und wird nach max_age neu gelesen (Firmware-Updates).
+    Lehnt ein iLO eine Abfrage trotz Angabe ab, wird das Feature abgeschaltet.
+    """
+
+    def __init__(self, state_file: str, max_age: float = CAPS_MAX_AGE):
+        self.state_file = state_file
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.hosts = load_state(state_file, "Redfish-Caps").get("hosts", {})
+
+    def get(self, ilo_host: str):
+        with self._lock:
+            caps = self.hosts.get(ilo_host)
+            if caps is None or time.time() - caps.get("checked", 0) > self.max_age:
+                return None
+            return dict(caps)
+
+    def update_from_root(self, ilo_host: str, root: dict) -> dict:
+        features = root.get("ProtocolFeaturesSupported") or {}
+        expand = features.get("ExpandQuery") or {}
+        caps = {
+            "expand": bool(expand.get("NoLinks")),  # $expand=. (nur Unterressourcen, keine Links)
+            "levels": bool(expand.get("Levels")),
+            "select": bool(features.get("SelectQuery")),
+            "checked": time.time()
         }
+        with self._lock:
+            self.hosts[ilo_host] = caps
+        return dict(caps)
+
+    def disable(self, ilo_host: str, feature: str):
+        with self._lock:
+            if self.hosts.get(ilo_host, {}).get(feature):
+                self.hosts[ilo_host][feature] = False
+                print(f"[!] {ilo_host}: ${feature} abgelehnt, verwende Einzelabfragen")
+
+    def save(self):
+        with self._lock:
+            save_state(self.state_file, {"hosts": self.hosts})
+
+# ---- Redfish-Sessions (X-Auth-Token, über Läufe hinweg wiederverwendet) ----
+class SessionTokens:
+    """Redfish-Session pro iLO aus dem SessionService, gecacht in einer Datei mit Modus 0600
+
+    Statt bei jedem Request Basic Auth (volle Passwortprüfung im iLO) wird
+    einmal eine Session angelegt und deren X-Auth-Token wiederverwendet, bis
+    das iLO 401 liefert (abgelaufen/gelöscht) oder sich die Zugangsdaten
+    ändern. Unterstützt ein iLO den SessionService nicht, wird für
+    SESSION_RETRY Sekunden Basic Auth verwendet.
+    """
+
+    def __init__(self, state_file: str):
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self.stats = {'logins': 0, 'reused': 0, 'expired': 0}
+        self.hosts = load_state(state_file, "Session-State").get("hosts", {})
+
+    @staticmethod
+    def _fingerprint(username: str, password: str) -> str:
+        # Nur zum Erkennen geänderter Zugangsdaten, das Passwort selbst wird nicht gespeichert
+        return hashlib.sha256(f"{username}\0{password}".encode("utf-8")).hexdigest()[:16]
+
+    def token(self, ilo_host: str, auth, deadline: Deadline, timing: dict):
+        """Gültiges Token (gecacht oder neu angemeldet); None = Basic Auth verwenden"""
+        username, password = auth
+        fingerprint = self._fingerprint(username, password)
+        with self._lock:
+            entry = self.hosts.get(ilo_host) or {}
+        if entry.get("token") and entry.get("fingerprint") == fingerprint:
+            with self._lock:
+                self.stats['reused'] += 1
+            return entry["token"]
+        if entry.get("unsupported", 0) > time.time() - SESSION_RETRY:
+            return None
+        if entry.get("token"):
+            # Zugangsdaten geändert: alte Session abmelden, bevor eine neue angelegt wird
+            self.logout(ilo_host)
+
+        try:
+            resp = get_session(ilo_host).post(f"https://{ilo_host}/redfish/v1/SessionService/Sessions/",
+                                              json={"UserName": username, "Password": password},
+                                              verify=False, timeout=deadline.timeout(TIMEOUT))
+        finally:
+            timing["requests"] = timing.get("requests", 0) + 1
+        if resp.status_code in (404, 405, 501) or (resp.ok and not resp.headers.get("X-Auth-Token")):
+            print(f"[!] {ilo_host}: SessionService nicht verfügbar (HTTP {resp.status_code}), verwende Basic Auth")
+            with self._lock:
+                self.hosts[ilo_host] = {"unsupported": time.time()}
+            return None
+        resp.raise_for_status()
+        with self._lock:
+            self.hosts[ilo_host] = {
+                "token": resp.headers["X-Auth-Token"],
+                "location": resp.headers.get("Location"),
+                "fingerprint": fingerprint,
+                "created": time.time()
+            }
+            self.stats['logins'] += 1
+        return resp.headers["X-Auth-Token"]
+
+    def invalidate(self, ilo_host: str):
+        """Token vom iLO abgelehnt (401): beim nächsten Request neu anmelden"""
+        with self._lock:
+            if self.hosts.pop(ilo_host, None) is not None:
+                self.stats['expired'] += 1
+
+    def logout(self, ilo_host: str, timeout: float = PROBE_TIMEOUT) -> bool:
+        """Löscht die Session im iLO (DELETE auf die Location) und aus dem Cache"""
+        with self._lock:
+            entry = self.hosts.pop(ilo_host, None) or {}
+        if not entry.get("token") or not entry.get("location"):
+            return False
+        location = entry["location"]
+        url = location if location.startswith("https://") else f"https://{ilo_host}{location}"
         try:
-            send_json(sock, err_doc)
-        except Exception as se:
-            print(f"[!] Sende-Fehler (Error-Doc) an Logstash: {se}")
-        continue
+            get_session(ilo_host).delete(url, headers={"X-Auth-Token": entry["token"]},
+                                         verify=False, timeout=timeout)
+            return True
+        except requests.RequestException as e:
+            print(f"[!] {ilo_host}: Abmelden fehlgeschlagen: {e}")
+            return False
 
+    def logout_all(self) -> int:
+        with self._lock:
+            hosts = list(self.hosts)
+        return sum(1 for ilo_host in hosts if self.logout(ilo_host))
+
+    def save(self):
+        with self._lock:
+            # Tokens sind Zugangsdaten: Datei nur für den Besitzer lesbar
+            save_state(self.state_file, {"hosts": self.hosts}, mode=0o600)
+
+    def summary(self) -> str:
+        s = self.stats
+        return f"{s['logins']} Anmeldungen, {s['reused']} wiederverwendet, {s['expired']} abgelaufen"
+
+def get_json(ilo_host: str, path: str, auth, deadline: Deadline, timing: dict, tokens: SessionTokens = None) -> dict:
+    """Ein GET mit Timeout aus dem Restbudget; zählt Requests und Zeiten in timing
+
+    Mit auth (Benutzer, Passwort) und tokens wird das Session-Token verwendet,
+    falls verfügbar; lehnt das iLO es ab (401), wird einmal neu angemeldet.
+    """
+    for attempt in range(2):
+        headers = {}
+        basic = auth
+        if auth is not None and tokens is not None:
+            token = tokens.token(ilo_host, auth, deadline, timing)
+            if token is not None:
+                headers["X-Auth-Token"] = token
+                basic = None
+        resp = get_session(ilo_host).get(f"https://{ilo_host}{path}", auth=basic, headers=headers,
+                                         verify=False, timeout=deadline.timeout(TIMEOUT))
+        timing["requests"] = timing.get("requests", 0) + 1
+        # resp.elapsed: Senden des Requests bis Header empfangen (letzter Versuch)
+        timing["headers"] = timing.get("headers", 0.0) + resp.elapsed.total_seconds()
+        if resp.status_code == 401 and headers and attempt == 0:
+            tokens.invalidate(ilo_host)
+            continue
+        break
+    resp.raise_for_status()
+    parse_start = time.monotonic()
+    data = resp.json()
+    timing["json"] = timing.get("json", 0.0) + time.monotonic() - parse_start
+    return data
+
+def query_rejected(error: requests.HTTPError) -> bool:
+    """400/405/501: Query-Parameter nicht unterstützt (statt echtem Fehler)"""
+    return error.response is not None and error.response.status_code in (400, 405, 501)
+
+def get_selected(ilo_host: str, path: str, fields: str, caps: dict, auth, deadline: Deadline, timing: dict,
+                 store: RedfishCaps = None, tokens: SessionTokens = None) -> dict:
+    """GET mit $select=fields, falls unterstützt; bei Ablehnung ohne $select wiederholen"""
+    if caps.get("select"):
+        try:
+            return get_json(ilo_host, f"{path}?$select={fields}", auth, deadline, timing, tokens)
+        except requests.HTTPError as e:
+            if not query_rejected(e):
+                raise
+            if store is not None:
+                store.disable(ilo_host, "select")
+            caps["select"] = False
+    return get_json(ilo_host, path, auth, deadline, timing, tokens)
+
+def fetch_chassis(ilo_host: str, auth, datasets: list, deadline: Deadline, timing: dict,
+                  store: RedfishCaps, tokens: SessionTokens = None) -> dict:
+    """Liest Thermal (Temperaturen + Lüfter) und ggf. Power mit möglichst wenigen Requests
+
+    - nur thermal/fan: ein GET auf Thermal
+    - mit power und $expand: ein GET auf das Chassis mit eingebetteten Thermal/Power
+    - sonst: je ein GET auf Thermal und Power (mit $select, falls unterstützt)
+    """
+    thermal_path, power_path = f"{CHASSIS_PATH}/Thermal", f"{CHASSIS_PATH}/Power"
+    if "power" not in datasets:
+        caps = store.get(ilo_host) or {}
+        return {"Thermal": get_selected(ilo_host, thermal_path, "Temperatures,Fans", caps, auth, deadline, timing,
+                                        store, tokens)}
+
+    caps = store.get(ilo_host)
+    if caps is None:
+        caps = store.update_from_root(ilo_host, get_json(ilo_host, "/redfish/v1/", None, deadline, timing))
+    if caps["expand"]:
+        query = "$expand=.($levels=1)" if caps["levels"] else "$expand=."
+        if caps["select"]:
+            query += "&$select=Thermal,Power"
+        try:
+            chassis = get_json(ilo_host, f"{CHASSIS_PATH}?{query}", auth, deadline, timing, tokens)
+        except requests.HTTPError as e:
+            if not query_rejected(e):
+                raise
+            chassis = {}
+        thermal, power = chassis.get("Thermal") or {}, chassis.get("Power") or {}
+        if "Temperatures" in thermal and ("PowerControl" in power or "PowerSupplies" in power):
+            return {"Thermal": thermal, "Power": power}
+        # Nur Links statt eingebetteter Ressourcen: $expand wird ignoriert
+        store.disable(ilo_host, "expand")
+    return {
+        "Thermal": get_selected(ilo_host, thermal_path, "Temperatures,Fans", caps, auth, deadline, timing,
+                                store, tokens),
+        "Power": get_selected(ilo_host, power_path, "PowerControl,PowerSupplies", caps, auth, deadline, timing,
+                              store, tokens)
+    }
+
+# ---- Logstash-Sender (bleibt im Plugin-Modus über Läufe hinweg verbunden) ----
+_sender = None
+
+def get_sender() -> LogstashSender:
+    global _sender
+    if _sender is None:
+        _sender = create_sender(EDGE_HOST, EDGE_PORT, EDGE_HTTP_PORT, spool=open_spool("ilo"))
+    return _sender
+
+# ---- Hosts laden (im Plugin-Modus nur bei geänderter Datei neu einlesen) ----
+_ilos_cache = None  # (mtime, ilos)
+
+_tsdb = {}
+
+def get_tsdb(shard: str = None):
+    """Lokaler Ringpuffer pro Shard (bleibt im Plugin-Modus über Läufe hinweg offen)"""
+    if shard not in _tsdb:
+        _tsdb[shard] = open_tsdb("ilo", shard)
+    store = _tsdb[shard]
+    if store is not None:
+        store.reset_stats()
+    return store
+
+def load_ilos() -> list:
+    global _ilos_cache
+    mtime = os.stat(HOSTS_FILE).st_mtime
+    if _ilos_cache is not None and _ilos_cache[0] == mtime:
+        return _ilos_cache[1]
+    with open(HOSTS_FILE, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    ilos = cfg.get("ilos", [])
+    _ilos_cache = (mtime, ilos)
+    return ilos
+
+# ---- ECS-Dokumente ----
+def base_doc(ilo_host: str, ilo_name: str, dataset: str) -> dict:
+    # minimale ECS-Hülle eines Metrik-Dokuments
+    return {
+        "@timestamp": datetime.now(timezone.utc).isoformat(),
+        "event": {
+            "kind": "metric",
+            "category": ["hardware"],
+            "type": ["info"],
+            "outcome": "success",
+            "dataset": dataset
+        },
+        "service": {"type": "ilo"},
+        "host": {"name": ilo_name, "ip": [ilo_host]},
+        "observer": {
+            "vendor": "HPE",
+            "product": "iLO"
+        }
+    }
+
+def build_error_doc(ilo_host: str, ilo_name: str, error: Exception, dataset: str) -> dict:
+    # Fehlerereignis (ECS-konform als event.type=error), pro abgefragtem Dataset (thermal, fan, power)
+    return {
+        "@timestamp": datetime.now(timezone.utc).isoformat(),
+        "event": {
+            "kind": "event",
+            "category": ["hardware"],
+            "type": ["error"],
+            "outcome": "failure",
+            "dataset": f"ilo.{dataset}"
+        },
+        "service": {"type": "ilo"},
+        "host": {"name": ilo_name, "ip": [ilo_host]},
+        "observer": {
+            "vendor": "HPE",
+            "product": "iLO"
+        },
+        "hpe": {"ilo": {"error": str(error)}}
+    }
+
+def build_breaker_doc(ilo_host: str, ilo_name: str, info: dict, dataset: str) -> dict:
+    # Ein Fehler-Dokument pro Backoff-Fenster und Dataset für einen übersprungenen iLO
+    doc = build_error_doc(ilo_host, ilo_name,
+                          f"iLO übersprungen nach {info['failures']} Fehlern in Folge: {info.get('last_error')}",
+                          dataset)
+    retry_at = datetime.fromtimestamp(info["retry_at"], timezone.utc).isoformat() if info.get("retry_at") else None
+    doc["edge"] = {"breaker": {"state": "open", "failures": info["failures"], "retry_at": retry_at}}
+    return doc
+
+def build_thermal_docs(ilo_host: str, ilo_name: str, data: dict) -> list:
+    docs = []
     for sensor in data.get("Temperatures", []):
         temp = sensor.get("ReadingCelsius")
         if temp in (None, 0):
             continue
 
-        doc = {
-            "@timestamp": datetime.now(timezone.utc).isoformat(),
-            # minimale ECS:
-            "event": {
-                "kind": "metric",
-                "category": ["hardware"],
-                "type": ["info"],
-                "outcome": "success",
-                "dataset": "ilo.thermal"
-            },
-            "service": {"type": "ilo"},
-            "host": {"name": ilo_name, "ip": [ilo_host]},
-            "observer": {
-                "vendor": "HPE",
-                "product": "iLO"
-            },
-
+        doc = base_doc(ilo_host, ilo_name, "ilo.thermal")
+        doc.update({
             # vendor-/domänenspezifisch unter Namespace:
             "hpe": {
                 "ilo": {
@@ -130,20 +410,507 @@ for entry in ilos:
                     "celsius": temp
                 }
             }
-        }
+        })
 
         # None-Werte aus thresholds entfernen
         thresholds = doc["hpe"]["ilo"]["sensor"]["thresholds"]
         doc["hpe"]["ilo"]["sensor"]["thresholds"] = {k: v for k, v in thresholds.items() if v is not None}
+        docs.append(doc)
+    return docs
+
+def build_fan_docs(ilo_host: str, ilo_name: str, data: dict) -> list:
+    docs = []
+    for fan in data.get("Fans", []):
+        status = fan.get("Status") or {}
+        if status.get("State") == "Absent":
+            continue
+        doc = base_doc(ilo_host, ilo_name, "ilo.fan")
+        sensor = {
+            "name": fan.get("Name") or fan.get("FanName"),   # FanName: ältere iLO-Firmware
+            "context": fan.get("PhysicalContext"),
+            "health": status.get("Health", "Unknown"),
+            "state": status.get("State")
+        }
+        doc["hpe"] = {"ilo": {"sensor": {k: v for k, v in sensor.items() if v is not None}}}
+        reading = fan.get("Reading", fan.get("CurrentReading"))
+        if reading is not None:
+            unit = "percent" if (fan.get("ReadingUnits") or "Percent").lower() == "percent" else "rpm"
+            doc["metrics"] = {"fan": {unit: reading}}
+        docs.append(doc)
+    return docs
+
+def build_power_docs(ilo_host: str, ilo_name: str, data: dict) -> list:
+    # Gesamtverbrauch (PowerControl) und je Netzteil ein Dokument
+    docs = []
+    for control in data.get("PowerControl", []):
+        watts = control.get("PowerConsumedWatts")
+        if watts is None:
+            continue
+        power_metrics = control.get("PowerMetrics") or {}
+        doc = base_doc(ilo_host, ilo_name, "ilo.power")
+        sensor = {
+            "name": control.get("Name") or "Power Control",
+            "type": "power_control",
+            "health": (control.get("Status") or {}).get("Health", "Unknown"),
+            "capacity_watts": control.get("PowerCapacityWatts"),
+            "average_watts": power_metrics.get("AverageConsumedWatts"),
+            "min_watts": power_metrics.get("MinConsumedWatts"),
+            "max_watts": power_metrics.get("MaxConsumedWatts")
+        }
+        doc["hpe"] = {"ilo": {"sensor": {k: v for k, v in sensor.items() if v is not None}}}
+        doc["metrics"] = {"power": {"watts": watts}}
+        docs.append(doc)
+    for psu in data.get("PowerSupplies", []):
+        status = psu.get("Status") or {}
+        if status.get("State") == "Absent":
+            continue
+        doc = base_doc(ilo_host, ilo_name, "ilo.power")
+        sensor = {
+            "name": psu.get("Name") or f"Power Supply {psu.get('MemberId', '?')}",
+            "type": "power_supply",
+            "health": status.get("Health", "Unknown"),
+            "state": status.get("State"),
+            "model": psu.get("Model"),
+            "capacity_watts": psu.get("PowerCapacityWatts"),
+            "line_input_voltage": psu.get("LineInputVoltage")
+        }
+        doc["hpe"] = {"ilo": {"sensor": {k: v for k, v in sensor.items() if v is not None}}}
+        if psu.get("LastPowerOutputWatts") is not None:
+            doc["metrics"] = {"power": {"watts": psu["LastPowerOutputWatts"]}}
+        docs.append(doc)
+    return docs
+
+def metric_value(doc: dict):
+    """(Feld, Wert) des Messwerts, z.B. ("celsius", 42.0); (None, None) ohne Messwert"""
+    for values in (doc.get("metrics") or {}).values():
+        for field, value in values.items():
+            return field, value
+    return None, None
+
+# Redfish-/HPE-Schwellen aus hpe.ilo.sensor.thresholds -> Alert-Level
+THRESHOLD_LEVELS = {
+    "warning_user": "warning",
+    "critical_user": "critical",
+    "upper_critical": "critical",
+    "upper_fatal": "fatal"
+}
+
+def device_thresholds(sensor: dict) -> dict:
+    """Schwellen des iLO für edge_alerts ({"upper_critical": ("critical", 90), ...})"""
+    thresholds = sensor.get("thresholds") or {}
+    # iLO meldet nicht gesetzte Schwellen teils als 0
+    return {name: (level, thresholds[name]) for name, level in THRESHOLD_LEVELS.items() if thresholds.get(name)}
+
+def build_compact_doc(ilo_host: str, ilo_name: str, docs: list) -> dict:
+    # Ein Dokument pro iLO und Dataset mit Sensor-Array; 42-filter-ilo-metrics.conf (RZ) teilt es
+    # per split auf. Einträge = hpe.ilo.sensor des Einzel-Dokuments plus Messwert-Feld
+    # ("celsius", "percent", "rpm" oder "watts") und ggf. "deadband" bzw. "rollup".
+    doc = base_doc(ilo_host, ilo_name, docs[0]["event"]["dataset"])
+    sensors = []
+    for sensor_doc in docs:
+        entry = {k: v for k, v in sensor_doc["hpe"]["ilo"]["sensor"].items() if v is not None}
+        field, value = metric_value(sensor_doc)
+        if field is not None:
+            entry[field] = value
+        entry.update(sensor_doc.get("edge", {}))
+        sensors.append(entry)
+    doc["hpe"] = {"ilo": {"sensors": sensors}}
+    return doc
+
+def emit_rollups(rollup: RollupBuffer, args, sender: LogstashSender):
+    """Ein Dokument pro Sensor und Fenster: Status/Wert der letzten Abfrage plus edge.rollup"""
+    compact_docs = {}
+    for _, (ilo_host, ilo_name, doc), stats in rollup.rollups():
+        if stats is not None:
+            doc["edge"] = {"rollup": stats}
+            field, _ = metric_value(doc)
+            print(f"[✓] {ilo_name}: Sensor '{doc['hpe']['ilo']['sensor'].get('name')}' -> "
+                  f"{stats['last']} {METRIC_UNITS[field]} (min {stats['min']}, max {stats['max']}, "
+                  f"avg {stats['avg']}, {stats['count']} Samples)")
+        if args.compact:
+            compact_docs.setdefault((ilo_host, ilo_name, doc["event"]["dataset"]), []).append(doc)
+        else:
+            sender.send(doc)
+    for (ilo_host, ilo_name, _), docs in compact_docs.items():
+        sender.send(build_compact_doc(ilo_host, ilo_name, docs))
+
+# ---- Abfrage eines iLO (läuft im Worker-Thread) ----
+def collect_ilo(entry: dict, store: RedfishCaps, tokens: SessionTokens = None, probe: bool = False,
+                deadline: Deadline = None, datasets: list = None) -> dict:
+    # store/tokens gehören zum Lauf (kein Modul-Zustand, den ein abgebrochener Lauf noch verändert)
+    ilo_host = entry["host"]
+    ilo_name = entry.get("name", ilo_host)
+    result = {"host": ilo_host, "name": ilo_name, "docs": [], "error": None, "probe_failed": False,
+              "skipped": False, "timing": {}}
+    timing = result["timing"]
+
+    # Timeouts auf das Restbudget bis zur Deadline des Daemons kürzen; reicht es nicht, überspringen
+    deadline = deadline or Deadline(None)
+    datasets = datasets or ["thermal"]
+    try:
+        probe_timeout = min(PROBE_TIMEOUT, deadline.timeout(TIMEOUT))
+    except DeadlineExceeded:
+        result["skipped"] = True
+        return result
+
+    started = time.monotonic()
+    if probe:
+        # iLO im Backoff: erst die Service Root (ohne Auth, kurzer Timeout) prüfen
+        try:
+            resp = get_session(ilo_host).get(f"https://{ilo_host}/redfish/v1/", verify=False,
+                                             timeout=probe_timeout)
+            resp.raise_for_status()
+            if "power" in datasets:
+                store.update_from_root(ilo_host, resp.json())
+        except requests.RequestException as e:
+            result["error"] = e
+            result["probe_failed"] = True
+            timing["http"] = timing["total"] = time.monotonic() - started
+            return result
+    try:
+        data = fetch_chassis(ilo_host, (entry["username"], entry["password"]), datasets, deadline, timing,
+                             store, tokens)
+        timing["http"] = time.monotonic() - started - timing.get("json", 0.0)
+    except DeadlineExceeded:
+        result["skipped"] = True
+        return result
+    except requests.RequestException as e:
+        timing["http"] = time.monotonic() - started
+        result["error"] = e
+        result["docs"] += [build_error_doc(ilo_host, ilo_name, e, dataset) for dataset in datasets]
+        timing["total"] = time.monotonic() - started
+        return result
+
+    build_start = time.monotonic()
+    thermal = data.get("Thermal") or {}
+    if "thermal" in datasets:
+        result["docs"] += build_thermal_docs(ilo_host, ilo_name, thermal)
+    if "fan" in datasets:
+        result["docs"] += build_fan_docs(ilo_host, ilo_name, thermal)
+    if "power" in datasets:
+        result["docs"] += build_power_docs(ilo_host, ilo_name, data.get("Power") or {})
+    timing["build"] = time.monotonic() - build_start
+    timing["total"] = time.monotonic() - started
+    return result
 
+def log_latency(result: dict):
+    t = result["timing"]
+    parts = [f"HTTP {t.get('http', 0.0):.3f}s"]
+    if t.get("requests", 1) > 1:
+        parts.append(f"{t['requests']} Requests")
+    if "headers" in t:
+        parts.append(f"bis Header {t['headers']:.3f}s")
+    if "json" in t:
+        parts.append(f"JSON {t['json']:.3f}s")
+    if "build" in t:
+        parts.append(f"Docs {t['build']:.3f}s")
+    state = "Fehler" if result["error"] else "ok"
+    print(f"[⏱] {result['name']}: gesamt {t.get('total', 0.0):.3f}s ({', '.join(parts)}) [{state}]")
+
+def main(argv=None, cancel=None, deadline_at=None):
+    parser = argparse.ArgumentParser(description='iLO Thermal/Fan/Power Collector')
+    parser.add_argument('--temp', action='store_true', help='Temperaturen (ilo.thermal)')
+    parser.add_argument('--fan', action='store_true', help='Lüfter (ilo.fan)')
+    parser.add_argument('--power', action='store_true', help='Verbrauch und Netzteile (ilo.power)')
+    parser.add_argument('--all', action='store_true', help='Alle Daten')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f'Maximale Anzahl parallel abgefragter iLOs (Default: {MAX_WORKERS})')
+    parser.add_argument('--shard', default=SHARD_SPEC or None,
+                        help='Nur den Shard i/N des Inventars abfragen (z.B. 0/4, Default: EDGE_SHARD)')
+    parser.add_argument('--compact', action='store_true', default=COMPACT_MODE,
+                        help='Ein Dokument pro iLO mit Sensor-Array (Default: ILO_COMPACT)')
+    parser.add_argument('--delta', action='store_true', default=DELTA_MODE,
+                        help='Nur geänderte Temperaturen senden (Deadband, Default: ILO_DELTA)')
+    parser.add_argument('--keyframe-every', type=int, default=KEYFRAME_EVERY,
+                        help=f'Im Delta-Modus alle N Läufe vollständig senden (Default: {KEYFRAME_EVERY})')
+    parser.add_argument('--sample-interval', type=float, default=SAMPLE_INTERVAL,
+                        help='Innerhalb des Laufs alle N Sekunden abfragen und pro Sensor ein Rollup '
+                             'senden (0 = aus, Default: EDGE_SAMPLE_INTERVAL)')
+    parser.add_argument('--window', type=float, default=ROLLUP_WINDOW,
+                        help='Länge des Rollup-Fensters in Sekunden (0 = bis kurz vor die Deadline, '
+                             'Default: EDGE_ROLLUP_WINDOW)')
+    parser.add_argument('--basic-auth', action='store_true', default=not SESSION_AUTH,
+                        help='Basic Auth bei jedem Request statt Redfish-Session (Default: ILO_SESSION_AUTH=0)')
+    parser.add_argument('--logout', action='store_true',
+                        help='Alle gecachten Redfish-Sessions abmelden und beenden')
+    args = parser.parse_args(argv)
+
+    if args.logout:
+        return logout_sessions()
+
+    # Datensätze bestimmen (ohne Angabe: ILO_DATASETS, Default nur thermal)
+    if args.all:
+        datasets = ["thermal", "fan", "power"]
+    else:
+        datasets = [d for d, wanted in (("thermal", args.temp), ("fan", args.fan), ("power", args.power)) if wanted]
+    datasets = datasets or [d for d in DATASETS if d in DEADBANDS] or ["thermal"]
+
+    ilos = load_ilos()
+    if not ilos:
+        print("[!] Keine iLO-Hosts in hosts.yml gefunden.")
+        raise SystemExit(1)
+    if args.shard:
         try:
-            send_json(sock, doc)
-            print(f"[✓] {ilo_name}: Sensor '{sensor.get('Name')}' -> {temp} °C gesendet")
-        except Exception as e:
-            print(f"[!] Sende-Fehler an Logstash: {e}")
-
-# Socket schließen
-try:
-    sock.close()
-except Exception:
-    pass
+            ilos = select_shard(ilos, args.shard, key=lambda entry: entry.get("name", entry["host"]))
+        except ValueError as e:
+            print(f"[!] {e}")
+            raise SystemExit(1)
+        print(f"[*] Shard {args.shard}: {len(ilos)} iLOs")
+        if not ilos:
+            return 0
+
+    # ---- Logstash-Verbindung öffnen (persistent, gepuffert) ----
+    # Ist Logstash nicht erreichbar, wird trotzdem abgefragt; die Dokumente gehen in den Spool.
+    sender = get_sender()
+    sender.reset_stats()
+    try:
+        sender.connect()
+    except Exception as e:
+        if sender.spool is None:
+            print(f"[!] Konnte nicht zu Logstash verbinden: {e}")
+            raise SystemExit(2)
+        print(f"[!] Konnte nicht zu Logstash verbinden, Dokumente werden gespoolt: {e}")
+
+    rollup = RollupBuffer() if args.sample_interval > 0 else None
+    if rollup is not None:
+        print(f"[*] {describe_sampling(args.sample_interval, args.window)}")
+
+    deadband = None
+    if args.delta and rollup is not None:
+        # Ein Rollup pro Sensor und Fenster ist bereits die Datenreduktion
+        print("[*] Delta-Modus im Sampling-Modus ohne Wirkung, sende Rollups")
+    elif args.delta:
+        deadband = DeadbandFilter(state_path("ilo-deadband", args.shard), DEADBANDS, args.keyframe_every)
+        deadband.begin_cycle()
+
+    caps = RedfishCaps(state_path("ilo-redfish-caps", args.shard))
+    tokens = None if args.basic_auth else SessionTokens(state_path("ilo-sessions", args.shard))
+    if tokens is not None:
+        _session_files.add(tokens.state_file)
+    # Im Plugin-Modus bricht das cancel-Event des Daemons über die Deadline jede weitere Abfrage ab
+    deadline = Deadline.from_env(deadline_at, cancel)
+    tsdb = get_tsdb(args.shard)
+    alerts = open_alerts("ilo", args.shard)
+    if deadline.at is not None:
+        print(f"[*] {deadline.describe()}")
+    # Spool-Replay nur bis zur Reserve des Laufs, der Rest folgt im nächsten
+    sender.set_deadline(deadline)
+    health = HostHealth(state_path("ilo-health", args.shard))
+    # Ein Ergebnis pro iLO und Lauf, an HostHealth erst nach dem letzten Durchlauf
+    outcomes = HostOutcomes(health)
+    # Error- und Breaker-Dokumente des Fensters, gesendet nach dem letzten Durchlauf (wie die Rollups)
+    error_docs = []
+    cycle_start = time.monotonic()
+
+    # Ohne Sampling genau ein Durchlauf; mit Sampling bis Fensterende bzw. Deadline
+    for _ in sample_passes(args.sample_interval, args.window, deadline, cancel, rollup):
+        # ---- Circuit Breaker: iLOs im Backoff überspringen (ein Fehler-Dokument pro Backoff-Fenster) ----
+        # iLOs mit Fehler in einem früheren Durchlauf werden im selben Fenster nicht erneut abgefragt
+        admitted = []
+        for entry in ilos:
+            ilo_host = entry["host"]
+            decision = outcomes.admit(ilo_host)
+            if decision is None:
+                continue
+            if decision == SKIP:
+                if health.should_report(ilo_host):
+                    error_docs += [build_breaker_doc(ilo_host, entry.get("name", ilo_host), health.info(ilo_host),
+                                                     dataset) for dataset in datasets]
+                continue
+            admitted.append((entry, decision == PROBE))
+
+        # ---- Abfrage (parallel) & Versand ----
+        workers = max(1, min(args.workers, len(admitted) or 1))
+        print(f"[*] Frage {len(admitted)} iLOs ab: {', '.join(datasets)} "
+              f"({workers} parallel, {len(ilos) - len(admitted)} im Backoff)")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(collect_ilo, entry, caps, tokens, probe, deadline, datasets): entry
+                       for entry, probe in admitted}
+            for future in as_completed(futures):
+                if deadline.cancelled:
+                    # Abbruch durch den Daemon: ausstehende iLOs nicht mehr abfragen
+                    for pending in futures:
+                        pending.cancel()
+                    print("[!] Abbruch angefordert, verbleibende iLOs werden übersprungen")
+                    break
+                entry = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Unerwartete Antwort (z.B. fehlende Felder): nur dieses iLO gilt als fehlgeschlagen
+                    ilo_host, ilo_name = entry["host"], entry.get("name", entry["host"])
+                    error = f"{type(e).__name__}: {e}"
+                    print(f"[!] {ilo_name}: Fehler bei der Auswertung: {error}")
+                    outcomes.failure(ilo_host, error)
+                    error_docs += [build_error_doc(ilo_host, ilo_name, error, dataset) for dataset in datasets]
+                    continue
+                if result["skipped"]:
+                    # Kein Fehler des iLOs: weder Fehler-Dokument noch Circuit Breaker
+                    deadline.skip(result["host"])
+                    continue
+                if result["error"] is not None:
+                    outcomes.failure(result["host"], result["error"])
+                else:
+                    outcomes.success(result["host"])
+                if result["probe_failed"]:
+                    # Breaker-Dokument für das verlängerte Backoff folgt nach dem letzten Durchlauf
+                    print(f"[!] {result['name']}: Probe fehlgeschlagen: {result['error']}")
+                    continue
+                compact_docs = {}
+                for doc in result["docs"]:
+                    if result["error"] is not None:
+                        error_docs.append(doc)
+                        continue
+                    dataset = doc["event"]["dataset"]
+                    sensor = doc["hpe"]["ilo"]["sensor"]
+                    field, value = metric_value(doc)
+                    if tsdb is not None and value is not None:
+                        # Lokale Zeitreihe bekommt jeden Messwert, auch die vom Deadband unterdrückten
+                        tsdb.record(result["name"], f"{dataset.split('.', 1)[1]}/{sensor.get('name')}", value,
+                                    unit=METRIC_UNITS[field])
+                    if alerts is not None:
+                        # Vor Deadband/Rollup, damit jeder Messwert geprüft wird; nur Zustandswechsel erzeugen einen Alert
+                        alert = alerts.evaluate(f"{result['host']}|{dataset}|{sensor.get('name')}",
+                                                dataset.split(".", 1)[1], result["name"], str(sensor.get("name")),
+                                                value, REDFISH_HEALTH_LEVELS.get(sensor.get("health")),
+                                                device_thresholds(sensor),
+                                                present=sensor.get("state") not in REDFISH_NOT_PRESENT)
+                        if alert is not None:
+                            sender.send_priority(build_alert_doc(doc, alert))
+                            print(f"[!] ALERT {result['name']}: {sensor.get('name')} {alert['previous']} -> "
+                                  f"{alert['state']} ({value} {METRIC_UNITS.get(field, '')}, {alert['source'] or 'Entwarnung'})")
+                    if rollup is not None:
+                        # Sampling: nur puffern, Dokumente gibt es am Fensterende (emit_rollups)
+                        rollup.add(f"{result['host']}|{dataset}|{sensor.get('name')}", value,
+                                   (result["host"], result["name"], doc))
+                        continue
+                    if deadband is not None:
+                        kind = dataset.split(".", 1)[1]
+                        state = sensor.get("health") if "state" not in sensor else f"{sensor.get('health')}|{sensor['state']}"
+                        annotation = deadband.check(f"{result['host']}|{kind}|{sensor.get('name')}", kind, value, state)
+                        if annotation is None:
+                            continue
+                        doc["edge"] = {"deadband": annotation}
+                    if args.compact:
+                        compact_docs.setdefault(dataset, []).append(doc)
+                    else:
+                        sender.send(doc)
+                    reading = f"{value} {METRIC_UNITS[field]}" if field is not None else sensor.get("health")
+                    print(f"[✓] {result['name']}: Sensor '{sensor.get('name')}' -> {reading} gesendet")
+                for docs in compact_docs.values():
+                    sender.send(build_compact_doc(result["host"], result["name"], docs))
+                if result["error"] is not None:
+                    print(f"[!] {result['name']}: {result['error']}")
+                log_latency(result)
+
+    # Nach einem Abbruch durch den Daemon nichts Neues mehr senden und keinen State schreiben:
+    # der Lauf gilt als beendet, der nächste startet erst, wenn dieser Thread zurückkehrt
+    save_state = not deadline.cancelled
+    if not save_state:
+        print("[!] Lauf abgebrochen: keine Rollups, State wird nicht gespeichert")
+    else:
+        ilo_names = {entry["host"]: entry.get("name", entry["host"]) for entry in ilos}
+        for ilo_host in outcomes.commit():
+            # Backoff verlängert: ein Dokument für das neue Fenster
+            health.should_report(ilo_host)
+            error_docs += [build_breaker_doc(ilo_host, ilo_names.get(ilo_host, ilo_host), health.info(ilo_host),
+                                             dataset) for dataset in datasets]
+        for doc in error_docs:
+            sender.send(doc)
+        if rollup is not None:
+            emit_rollups(rollup, args, sender)
+
+    if deadline.skipped:
+        print(f"[!] Zeitmangel: {deadline.summary()}")
+
+    # Restpuffer senden, auch nach einem Abbruch (Verbindung wird per atexit/shutdown() geschlossen)
+    sender.flush()
+    print(f"[*] Logstash: {sender.summary()}")
+    if tsdb is not None:
+        print(f"[*] Lokale Zeitreihen: {tsdb.summary()}")
+    if alerts is not None:
+        if save_state:
+            try:
+                alerts.save()
+            except OSError as e:
+                print(f"[!] Alert-State konnte nicht gespeichert werden: {e}")
+        print(f"[*] Alerts: {alerts.summary()}")
+    if deadband is not None:
+        if save_state:
+            try:
+                deadband.save()
+            except OSError as e:
+                print(f"[!] Deadband-State konnte nicht gespeichert werden: {e}")
+        print(f"[*] Delta-Modus: {deadband.summary()}")
+    if save_state:
+        try:
+            health.save()
+        except OSError as e:
+            print(f"[!] Health-State konnte nicht gespeichert werden: {e}")
+        if caps.hosts:
+            try:
+                caps.save()
+            except OSError as e:
+                print(f"[!] Redfish-Caps konnten nicht gespeichert werden: {e}")
+    if tokens is not None:
+        # Auch nach einem Abbruch: neu angelegte Sessions sonst im iLO verwaist (begrenzte Slots)
+        try:
+            tokens.save()
+        except OSError as e:
+            print(f"[!] Session-State konnte nicht gespeichert werden: {e}")
+        print(f"[*] Redfish-Sessions: {tokens.summary()}")
+    print(f"[*] Circuit Breaker: {health.summary()}")
+    print(f"[*] Gesamtdauer: {time.monotonic() - cycle_start:.2f}s")
+    return 0 if save_state else 1
+
+def logout_sessions() -> int:
+    """--logout: Sessions aller Shards im iLO löschen (z.B. ExecStopPost des Services)"""
+    count = 0
+    for path in sorted(glob.glob(state_path("ilo-sessions*"))):
+        tokens = SessionTokens(path)
+        count += tokens.logout_all()
+        try:
+            tokens.save()
+        except OSError as e:
+            print(f"[!] Session-State {path} konnte nicht gespeichert werden: {e}")
+    print(f"[✓] {count} Redfish-Sessions abgemeldet")
+    return 0
+
+# ---- Plugin-Schnittstelle für den Edge Daemon (mode: plugin) ----
+def _run_plugin(args: list, cancel: threading.Event, deadline_at: float = None) -> int:
+    try:
+        return main(args, cancel, deadline_at) or 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+
+async def collect(args: list, context: dict) -> int:
+    """Ein Sammel-Lauf im Daemon-Prozess; HTTP-Sessions und Logstash-Verbindung bleiben erhalten"""
+    return await asyncio.to_thread(_run_plugin, list(args), context["cancel"], context.get("deadline"))
+
+def shutdown():
+    """Wird vom Daemon beim Beenden aufgerufen"""
+    if _sender is not None:
+        _sender.close()
+    # Sessions im iLO aufräumen, bevor die HTTP-Sessions geschlossen werden. Nur die
+    # State-Dateien der eigenen Läufe (je nach --shard/EDGE_SHARD mit Shard-Suffix);
+    # Sessions anderer Shard-Prozesse bleiben gültig.
+    for path in sorted(_session_files):
+        tokens = SessionTokens(path)
+        if not tokens.hosts:
+            continue
+        tokens.logout_all()
+        try:
+            tokens.save()
+        except OSError as e:
+            print(f"[!] Session-State {path} konnte nicht gespeichert werden: {e}")
+    _session_files.clear()
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+    for store in _tsdb.values():
+        if store is not None:
+            store.close()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,22 +6,73 @@ Sammelt Fan-, Temperatur- und Power-Daten via IPMI und sendet sie an Logstash
 
 import os
 import json
-import socket
 import argparse
+import re
+import asyncio
 import subprocess
 import sys
-import shlex
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
 
+from logstash_sender import LogstashSender, create_sender
+from edge_spool import open_spool
+from edge_shard import SHARD_SPEC, select_shard
+from edge_deadband import DeadbandFilter, KEYFRAME_EVERY
+from edge_health import HostHealth, HostOutcomes, PROBE, SKIP
+from edge_state import STATE_DIR, state_path
+from edge_deadline import Deadline, DeadlineExceeded
+from edge_tsdb import RingStore, open_tsdb
+from edge_alerts import AlertEvaluator, IPMI_NOT_PRESENT, IPMI_STATUS_LEVELS, build_alert_doc, open_alerts
+from edge_rollup import RollupBuffer, ROLLUP_WINDOW, SAMPLE_INTERVAL, describe as describe_sampling, sample_passes
+
 # ---- Konfiguration ----
 EDGE_HOST = os.getenv("EDGE_HOST", "192.168.168.161")
 EDGE_PORT = int(os.getenv("EDGE_PORT", "10550"))
+EDGE_HTTP_PORT = int(os.getenv("EDGE_HTTP_PORT", "10551"))   # nur EDGE_OUTPUT=http
 HOSTS_FILE = os.getenv("IPMI_HOSTS_FILE", "/etc/ipmi/hosts.json")
 TIMEOUT = float(os.getenv("IPMI_TIMEOUT", "30.0"))
 IPMI_COMMAND = os.getenv("IPMI_COMMAND", "ipmitool")
+MAX_WORKERS = int(os.getenv("IPMI_MAX_WORKERS", "16"))
+PER_HOST_CONCURRENCY = int(os.getenv("IPMI_PER_HOST_CONCURRENCY", "1"))
+SINGLE_SESSION = os.getenv("IPMI_SINGLE_SESSION", "0").lower() in ("1", "true", "yes")
+DELTA_MODE = os.getenv("IPMI_DELTA", "0").lower() in ("1", "true", "yes")
+COMPACT_MODE = os.getenv("IPMI_COMPACT", "0").lower() in ("1", "true", "yes")
+# Lokaler SDR-Cache pro Host (ipmitool -S), "off" deaktiviert
+SDR_CACHE_DIR = os.getenv("IPMI_SDR_CACHE_DIR", os.path.join(STATE_DIR, "sdr-cache"))
+SDR_CACHE_MAX_AGE = float(os.getenv("IPMI_SDR_CACHE_MAX_AGE", str(24 * 3600)))
+SDR_CACHE_RETRY = float(os.getenv("IPMI_SDR_CACHE_RETRY", "3600"))  # Wartezeit nach fehlgeschlagenem Dump
+
+# Deadband pro Datentyp für --delta (Änderung, ab der neu gesendet wird)
+DEADBANDS = {
+    'temp': float(os.getenv("IPMI_DEADBAND_TEMP", "0.5")),    # °C
+    'fan': float(os.getenv("IPMI_DEADBAND_FAN", "2.0")),      # Prozent
+    'power': float(os.getenv("IPMI_DEADBAND_POWER", "5.0"))   # Watt
+}
+
+# Ein SDR-Durchlauf über alle Sensoren (statt sdr type ... pro Datentyp)
+SDR_ELIST_COMMAND = "sdr elist"
+# Billiger Erreichbarkeits-Check für Hosts im Backoff (kein SDR-Zugriff)
+PROBE_COMMAND = "mc info"
+
+# IPMI Entity-IDs (Spalte 4 von "sdr elist", z.B. "29.1")
+FAN_ENTITY_IDS = ("29", "30")      # Cooling Device / Cooling Unit
+POWER_KEYWORDS = ('ps ', 'power supply', 'power supplies')
 
-def run_ipmi_command(host: str, username: str, password: str, command: str, debug: bool = False) -> Optional[str]:
+POWER_KEYWORD_RE = re.compile('|'.join(re.escape(keyword) for keyword in POWER_KEYWORDS))
+
+# Numerische SDR-Typen: Merkmal in der Reading-Spalte, abzuschneidender Suffix, Einheit
+SDR_NUMERIC_TYPES = {
+    'temp': ('degrees C', ' degrees C', 'celsius'),
+    'fan': ('percent', ' percent', 'percent')
+}
+# Bekannte Status-Codes der SDR-Spalte 3; bekannte Werte werden als geteilte Strings übernommen
+SDR_STATUS_CODES = {code: code for code in ('ok', 'ns', 'nc', 'cr', 'nr', 'lnc', 'lcr', 'lnr', 'unc', 'ucr', 'unr')}
+
+def run_ipmi_command(host: str, username: str, password: str, command: str, debug: bool = False,
+                     sdr_cache_file: Optional[str] = None, timeout: float = TIMEOUT) -> Optional[str]:
     """Führt IPMI-Kommando aus - KORREKT mit Liste"""
     try:
         # IPMI-Kommando als Liste (sicher und korrekt)
@@ -33,6 +84,10 @@ def run_ipmi_command(host: str, username: str, password: str, command: str, debu
             "-P", password
         ]
         
+        # SDR aus lokaler Datei statt SDR-Repository-Walk auf dem BMC
+        if sdr_cache_file:
+            cmd.extend(["-S", sdr_cache_file])
+        
         # Kommando-Parameter hinzufügen - "power supply" als einzelnes Argument
         if command == 'sdr type "power supply"':
             cmd.extend(['sdr', 'type', 'power supply'])
@@ -46,7 +101,7 @@ def run_ipmi_command(host: str, username: str, password: str, command: str, debu
             cmd,
             capture_output=True,
             text=True,
-            timeout=TIMEOUT,
+            timeout=timeout,
             check=True
         )
         
@@ -65,152 +120,131 @@ def run_ipmi_command(host: str, username: str, password: str, command: str, debu
         print(f"[!] Fehler für {host}: {e}")
         return None
 
-def parse_temperature_data(output: str) -> List[Dict[str, Any]]:
-    """Parst Temperatur-Daten"""
-    temps = []
+def parse_sdr(output: str, data_type: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Parst SDR-Zeilen in einem Durchlauf, tabellengesteuert für alle Datentypen
+    
+    Mit data_type ("sdr type ...") wird jede Zeile als dieser Typ geparst.
+    Ohne data_type ("sdr elist") wird der Typ pro Zeile bestimmt:
+    "degrees C" -> temp, Power-Keyword im Namen -> power,
+    Lüfter-Entity-ID oder "fan" im Namen -> fan.
+    Pro Zeile wird nur einmal gesplittet; gestrippt und kleingeschrieben
+    werden nur die Spalten, die der Typ wirklich braucht.
+    """
+    result: Dict[str, List[Dict[str, Any]]] = {'temp': [], 'fan': [], 'power': []}
     if not output:
-        return temps
+        return result
+    
+    status_codes = SDR_STATUS_CODES
+    is_power_name = POWER_KEYWORD_RE.search
+    # Bei festem Typ Tabelleneintrag und Zielliste einmal vorab auflösen
+    fixed_numeric = SDR_NUMERIC_TYPES.get(data_type) if data_type else None
+    fixed_append = result[data_type].append if data_type in result else None
     
     for line in output.split('\n'):
         if '|' not in line:
             continue
-            
-        parts = [p.strip() for p in line.split('|')]
+        parts = line.split('|')
         if len(parts) < 5:
             continue
-            
-        sensor_name = parts[0]
-        status = parts[2]
-        reading = parts[4]
         
-        if 'degrees C' in reading:
+        name_lower = None
+        if data_type is None:
+            name_lower = parts[0].strip().lower()
+            if 'degrees C' in parts[4]:
+                kind = 'temp'
+            elif is_power_name(name_lower):
+                kind = 'power'
+            elif parts[3].strip().split('.')[0] in FAN_ENTITY_IDS or 'fan' in name_lower:
+                kind = 'fan'
+            else:
+                continue
+            numeric = SDR_NUMERIC_TYPES.get(kind)
+            append = result[kind].append
+        else:
+            kind = data_type
+            numeric = fixed_numeric
+            append = fixed_append
+        
+        if numeric is not None:
+            marker, suffix, unit = numeric
+            if marker not in parts[4]:
+                continue
             try:
-                temp_value = float(reading.replace(' degrees C', ''))
-                temps.append({
-                    'name': sensor_name,
-                    'value': temp_value,
-                    'status': status,
-                    'unit': 'celsius'
-                })
+                value = float(parts[4].strip().replace(suffix, ''))
             except ValueError:
                 continue
-    
-    return temps
-
-def parse_fan_data(output: str) -> List[Dict[str, Any]]:
-    """Parst Fan-Daten"""
-    fans = []
-    if not output:
-        return fans
-    
-    for line in output.split('\n'):
-        if '|' not in line:
+            status = parts[2].strip()
+            append({
+                'name': parts[0].strip(),
+                'value': value,
+                'status': status_codes.get(status, status),
+                'unit': unit
+            })
             continue
-            
-        parts = [p.strip() for p in line.split('|')]
-        if len(parts) < 5:
+        
+        if kind != 'power':
+            continue
+        
+        # Power: nur Sensoren mit Power-Keyword und Watt/Presence/Redundancy-Angabe
+        sensor_name = parts[0].strip()
+        if name_lower is None:
+            name_lower = sensor_name.lower()
+            if not is_power_name(name_lower):
+                continue
+        reading = parts[4].strip()
+        reading_lower = reading.lower()
+        has_watts = 'watts' in reading_lower
+        has_presence = 'presence' in reading_lower
+        has_redundant = 'redundant' in reading_lower
+        if not (has_watts or has_presence or has_redundant):
             continue
-            
-        sensor_name = parts[0]
-        status = parts[2]
-        reading = parts[4]
         
-        if 'percent' in reading:
+        status = parts[2].strip()
+        sensor_data = {
+            'name': sensor_name,
+            'runtime_hours': parts[1].strip(),    # 41h, 42h, etc.
+            'status': status_codes.get(status, status),
+            'value_unknown': parts[3].strip(),    # 10.1, 10.2, etc. (unbekannte Bedeutung)
+            'raw_reading': reading
+        }
+        if has_watts:
             try:
-                duty_value = float(reading.replace(' percent', ''))
-                fans.append({
-                    'name': sensor_name,
-                    'value': duty_value,
-                    'status': status,
-                    'unit': 'percent'
-                })
+                sensor_data['value'] = float(reading.replace(' Watts', '').split(',')[0])
+                sensor_data['unit'] = 'watts'
             except ValueError:
-                continue
+                pass
+        if has_presence:
+            if 'presence detected' in reading_lower:
+                sensor_data['presence'] = 'detected'
+            elif 'device present' in reading_lower:
+                sensor_data['presence'] = 'present'
+            else:
+                sensor_data['presence'] = 'unknown'
+        if has_redundant:
+            sensor_data['redundancy'] = 'fully_redundant' if 'fully redundant' in reading_lower else reading_lower
+        append(sensor_data)
     
-    return fans
+    return result
+
+def parse_temperature_data(output: str) -> List[Dict[str, Any]]:
+    """Parst Temperatur-Daten"""
+    return parse_sdr(output, 'temp')['temp']
+
+def parse_fan_data(output: str) -> List[Dict[str, Any]]:
+    """Parst Fan-Daten"""
+    return parse_sdr(output, 'fan')['fan']
 
 def parse_power_data(output: str, debug: bool = False) -> List[Dict[str, Any]]:
     """Parst Power-Daten aus sdr type power supply"""
-    power_data = []
-    if not output:
-        return power_data
-    
-    if debug:
+    if debug and output:
         print(f"[DEBUG] Parse Power Data - Input: {len(output)} Zeichen")
         print(f"[DEBUG] Erste 200 Zeichen: {output[:200]}")
     
-    for line in output.split('\n'):
-        if '|' not in line:
-            continue
-            
-        parts = [p.strip() for p in line.split('|')]
-        if len(parts) < 5:
-            continue
-            
-        # Korrekte Spalten-Aufteilung:
-        # Spalte 0: Sensor Name (Power Supply 1)
-        # Spalte 1: Laufzeit in Stunden (41h) 
-        # Spalte 2: Status (ok)
-        # Spalte 3: Wert 10.1 (unbekannte Bedeutung)
-        # Spalte 4: Watts + Presence (60 Watts, Presence detected)
-        sensor_name = parts[0]      # Power Supply 1
-        runtime_hours = parts[1]    # 41h (Laufzeit in Stunden)
-        status = parts[2]           # ok
-        value_unknown = parts[3]    # 10.1 (unbekannte Bedeutung)
-        reading = parts[4]          # 60 Watts, Presence detected
-        
-        if debug:
-            print(f"[DEBUG] Sensor: '{sensor_name}' | Runtime: '{runtime_hours}' | Status: '{status}' | Value: '{value_unknown}' | Reading: '{reading}'")
-        
-        # Nur Power-Sensoren verarbeiten (PS, Power Supply, Power Supplies)
-        has_power_keyword = any(keyword in sensor_name.lower() for keyword in ['ps ', 'power supply', 'power supplies'])
-        has_watts = 'watts' in reading.lower()
-        has_presence = 'presence' in reading.lower()
-        has_redundant = 'redundant' in reading.lower()
-        
-        if debug:
-            print(f"[DEBUG] Has power keyword: {has_power_keyword}, Has watts: {has_watts}, Has presence: {has_presence}, Has redundant: {has_redundant}")
-        
-        if has_power_keyword and (has_watts or has_presence or has_redundant):
-            sensor_data = {
-                'name': sensor_name,
-                'runtime_hours': runtime_hours,    # 41h, 42h, etc.
-                'status': status,
-                'value_unknown': value_unknown,    # 10.1, 10.2, etc. (unbekannte Bedeutung)
-                'raw_reading': reading
-            }
-            
-            # Watt-Werte extrahieren
-            if has_watts:
-                try:
-                    power_value = float(reading.replace(' Watts', '').split(',')[0])
-                    sensor_data['value'] = power_value
-                    sensor_data['unit'] = 'watts'
-                except ValueError:
-                    pass
-            
-            # Presence-Status extrahieren
-            if has_presence:
-                if 'presence detected' in reading.lower():
-                    sensor_data['presence'] = 'detected'
-                elif 'device present' in reading.lower():
-                    sensor_data['presence'] = 'present'
-                else:
-                    sensor_data['presence'] = 'unknown'
-            
-            # Redundancy-Status extrahieren
-            if has_redundant:
-                if 'fully redundant' in reading.lower():
-                    sensor_data['redundancy'] = 'fully_redundant'
-                else:
-                    sensor_data['redundancy'] = reading.lower()
-            
-            power_data.append(sensor_data)
-            
-            if debug:
-                print(f"[DEBUG] ✓ Power sensor gefunden: {sensor_name} = {sensor_data}")
+    power_data = parse_sdr(output, 'power')['power']
     
     if debug:
+        for sensor_data in power_data:
+            print(f"[DEBUG] ✓ Power sensor gefunden: {sensor_data['name']} = {sensor_data}")
         print(f"[DEBUG] Gefundene Power-Sensoren: {len(power_data)}")
     
     return power_data
@@ -223,18 +257,32 @@ def print_json(doc: dict):
     print(json.dumps(doc, indent=2, ensure_ascii=False))
     print("=" * 80)
 
-def send_json(doc: dict):
-    """Sendet JSON an Logstash"""
-    try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(5.0)
-        sock.connect((EDGE_HOST, EDGE_PORT))
-        
-        line = json.dumps(doc, ensure_ascii=False) + "\n"
-        sock.sendall(line.encode("utf-8"))
-        sock.close()
-    except Exception as e:
-        print(f"[!] Fehler beim Senden an Logstash: {e}")
+_sender: Optional[LogstashSender] = None
+
+def get_sender() -> LogstashSender:
+    """Liefert den gemeinsamen Logstash-Sender (eine Verbindung pro Lauf)"""
+    global _sender
+    if _sender is None:
+        _sender = create_sender(EDGE_HOST, EDGE_PORT, EDGE_HTTP_PORT, spool=open_spool("ipmi"))
+    return _sender
+
+_tsdb: Dict[Optional[str], Optional[RingStore]] = {}
+
+def get_tsdb(shard: Optional[str] = None) -> Optional[RingStore]:
+    """Lokaler Ringpuffer pro Shard (bleibt im Plugin-Modus über Läufe hinweg offen)"""
+    if shard not in _tsdb:
+        _tsdb[shard] = open_tsdb("ipmi", shard)
+    store = _tsdb[shard]
+    if store is not None:
+        store.reset_stats()
+    return store
+
+def send_json(doc: dict, priority: bool = False):
+    """Sendet JSON an Logstash (gepuffert über die persistente Verbindung, Alerts sofort)"""
+    if priority:
+        get_sender().send_priority(doc)
+    else:
+        get_sender().send(doc)
 
 def create_error_document(host: str, host_name: str, data_type: str, error_msg: str) -> Dict[str, Any]:
     """Erstellt ECS-konformes Error-Dokument"""
@@ -317,7 +365,392 @@ def create_metric_document(host: str, host_name: str,
     
     return doc
 
-def main():
+def create_breaker_document(host: str, host_name: str, info: Dict[str, Any]) -> Dict[str, Any]:
+    """Ein Fehler-Dokument pro Backoff-Fenster für einen übersprungenen Host"""
+    retry_at = datetime.fromtimestamp(info["retry_at"], timezone.utc).isoformat() if info.get("retry_at") else None
+    doc = create_error_document(host, host_name, "health",
+                                f"Host übersprungen nach {info['failures']} Fehlern in Folge: {info.get('last_error')}")
+    doc["edge"] = {"breaker": {"state": "open", "failures": info["failures"], "retry_at": retry_at}}
+    return doc
+
+_hosts_cache: Optional[tuple] = None  # (mtime, hosts) für den Plugin-Modus
+
+def create_compact_document(host: str, host_name: str, data_type: str,
+                            metric_docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fasst die Sensor-Dokumente eines Hosts/Datentyps zu einem Dokument mit Sensor-Array zusammen
+    
+    Jeder Eintrag in ipmi.sensors entspricht ipmi.sensor des Einzel-Dokuments plus "value"
+    (und ggf. "deadband" bzw. "rollup"). Die RZ-Pipeline (44-filter-ipmi-metrics.conf) teilt das
+    Dokument per split wieder in Einzel-Events auf.
+    """
+    doc = create_metric_document(host, host_name, data_type, {})
+    del doc["ipmi"]["sensor"]
+    sensors = []
+    for metric_doc in metric_docs:
+        entry = {k: v for k, v in metric_doc["ipmi"]["sensor"].items() if v is not None}
+        for metric in metric_doc.get("metrics", {}).values():
+            entry["value"] = next(iter(metric.values()))
+        entry.update(metric_doc.get("edge", {}))
+        sensors.append(entry)
+    doc["ipmi"]["sensors"] = sensors
+    return doc
+
+def load_hosts() -> List[Dict[str, Any]]:
+    """Lädt die Host-Liste aus HOSTS_FILE (Array oder Objekt mit "hosts" Key)"""
+    global _hosts_cache
+    try:
+        mtime = os.stat(HOSTS_FILE).st_mtime
+        if _hosts_cache is not None and _hosts_cache[0] == mtime:
+            return _hosts_cache[1]
+        
+        with open(HOSTS_FILE, 'r') as f:
+            hosts_data = json.load(f)
+        
+        # Prüfen ob es ein Array oder ein Objekt mit "hosts" Key ist
+        if isinstance(hosts_data, list):
+            hosts = hosts_data
+        elif isinstance(hosts_data, dict) and 'hosts' in hosts_data:
+            hosts = hosts_data['hosts']
+        else:
+            print(f"[!] Unbekannte JSON-Struktur in {HOSTS_FILE}")
+            sys.exit(1)
+            
+        print(f"[*] {len(hosts)} Hosts aus {HOSTS_FILE} geladen")
+    except FileNotFoundError:
+        print(f"[!] Hosts-Datei {HOSTS_FILE} nicht gefunden")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"[!] Fehler beim Parsen von {HOSTS_FILE}: {e}")
+        sys.exit(1)
+    _hosts_cache = (mtime, hosts)
+    return hosts
+
+class HostTimer:
+    """Misst die Wall-Time pro Host (erster Kommando-Start bis letztes Kommando-Ende)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: Dict[str, List[float]] = {}
+    
+    def record(self, host_name: str, started: float, finished: float):
+        with self._lock:
+            span = self._spans.get(host_name)
+            if span is None:
+                self._spans[host_name] = [started, finished]
+            else:
+                span[0] = min(span[0], started)
+                span[1] = max(span[1], finished)
+    
+    def durations(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: end - start for name, (start, end) in self._spans.items()}
+
+class SdrCache:
+    """Lokaler SDR-Dump pro Host für "ipmitool -S <datei>"
+    
+    Ohne Cache liest ipmitool bei jedem Aufruf das komplette SDR-Repository
+    vom BMC, bevor es Werte abfragt. Mit einem Dump ("sdr dump") werden nur
+    noch die Messwerte gelesen. Der Dump wird neu erstellt, wenn er älter als
+    max_age ist oder sich die Anzahl der Sensorzeilen eines Kommandos
+    gegenüber der ersten Abfrage mit diesem Dump ändert. Schlägt eine
+    Abfrage mit Cache fehl, wird der Dump verworfen und ohne Cache
+    wiederholt.
+    """
+    
+    def __init__(self, directory: str, max_age: float = SDR_CACHE_MAX_AGE,
+                 retry_after: float = SDR_CACHE_RETRY):
+        self.directory = directory
+        self.max_age = max_age
+        self.retry_after = retry_after
+        os.makedirs(directory, mode=0o750, exist_ok=True)
+        self._lock = threading.Lock()
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self.stats = {'hits': 0, 'dumps': 0, 'invalidated': 0, 'failed': 0}
+    
+    def _paths(self, host: str):
+        safe = re.sub(r'[^A-Za-z0-9._-]', '_', host)
+        base = os.path.join(self.directory, safe)
+        return base + ".sdr", base + ".json"
+    
+    def _host_lock(self, host: str) -> threading.Lock:
+        with self._lock:
+            return self._host_locks.setdefault(host, threading.Lock())
+    
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+    
+    def _load_meta(self, meta_path: str) -> Dict[str, Any]:
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_meta(self, meta_path: str, meta: Dict[str, Any]):
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+    
+    def get(self, host: str, username: str, password: str, debug: bool = False,
+            deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Pfad eines gültigen Dumps; erstellt ihn bei Bedarf. None = ohne Cache abfragen"""
+        cache_path, meta_path = self._paths(host)
+        with self._host_lock(host):
+            meta = self._load_meta(meta_path)
+            now = time.time()
+            if os.path.exists(cache_path) and now - meta.get("created", 0) < self.max_age:
+                self._count('hits')
+                return cache_path
+            if now - meta.get("failed", 0) < self.retry_after:
+                return None
+            
+            # Dump in eine temporäre Datei, damit nie ein halber Dump benutzt wird
+            tmp_path = cache_path + ".tmp"
+            timeout = deadline.timeout(TIMEOUT) if deadline is not None else TIMEOUT
+            output = run_ipmi_command(host, username, password, f"sdr dump {tmp_path}", debug, timeout=timeout)
+            if output is None or not os.path.exists(tmp_path):
+                print(f"[!] SDR-Dump für {host} fehlgeschlagen, frage ohne Cache ab")
+                self._count('failed')
+                self._save_meta(meta_path, {"failed": now})
+                return None
+            os.replace(tmp_path, cache_path)
+            self._save_meta(meta_path, {"created": now, "counts": {}})
+            self._count('dumps')
+            return cache_path
+    
+    def verify(self, host: str, command: str, output: str) -> bool:
+        """Vergleicht die Sensorzeilen mit der ersten Abfrage seit dem Dump; False = Dump verworfen"""
+        cache_path, meta_path = self._paths(host)
+        rows = sum(1 for line in output.split('\n') if '|' in line)
+        with self._host_lock(host):
+            meta = self._load_meta(meta_path)
+            counts = meta.setdefault("counts", {})
+            expected = counts.get(command)
+            if expected is None:
+                counts[command] = rows
+                self._save_meta(meta_path, meta)
+                return True
+            if expected == rows:
+                return True
+        print(f"[!] Sensoranzahl für {host} geändert ({expected} -> {rows}), SDR-Cache wird neu erstellt")
+        self.invalidate(host)
+        return False
+    
+    def invalidate(self, host: str):
+        cache_path, meta_path = self._paths(host)
+        with self._host_lock(host):
+            for path in (cache_path, meta_path):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+        self._count('invalidated')
+    
+    def summary(self) -> str:
+        s = self.stats
+        return f"{s['hits']} Treffer, {s['dumps']} neue Dumps, {s['invalidated']} verworfen, {s['failed']} Dumps fehlgeschlagen"
+
+def open_sdr_cache() -> Optional[SdrCache]:
+    """SDR-Cache unter SDR_CACHE_DIR; None wenn deaktiviert oder nicht beschreibbar"""
+    if not SDR_CACHE_DIR or SDR_CACHE_DIR.lower() in ("off", "none", "0"):
+        return None
+    try:
+        return SdrCache(SDR_CACHE_DIR)
+    except OSError as e:
+        print(f"[!] SDR-Cache-Verzeichnis {SDR_CACHE_DIR} nicht nutzbar, Cache deaktiviert: {e}")
+        return None
+
+class HostProbe:
+    """Einmaliger "mc info"-Check pro Lauf für einen Host, dessen Backoff abgelaufen ist
+    
+    Alle Jobs des Hosts teilen sich das Ergebnis; schlägt der Probe fehl,
+    werden die SDR-Kommandos gar nicht erst gestartet.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ok: Optional[bool] = None
+    
+    def check(self, host: str, username: str, password: str, debug: bool = False,
+              timeout: float = TIMEOUT) -> bool:
+        with self._lock:
+            if self.ok is None:
+                self.ok = run_ipmi_command(host, username, password, PROBE_COMMAND, debug,
+                                           timeout=timeout) is not None
+            return self.ok
+
+def collect_data_type(host_config: Dict[str, Any], data_type: str, command: str,
+                      host_slots: threading.Semaphore, timer: HostTimer,
+                      debug: bool = False, sdr_cache: Optional[SdrCache] = None,
+                      probe: Optional[HostProbe] = None, deadline: Optional[Deadline] = None) -> Optional[str]:
+    """Führt ein IPMI-Kommando im Worker-Thread aus (begrenzt durch das Per-BMC-Limit)
+    
+    Jeder ipmitool-Aufruf bekommt höchstens das Restbudget bis zur Deadline;
+    reicht es nicht mehr, wird DeadlineExceeded geworfen statt zu starten.
+    """
+    host = host_config.get('ip') or host_config.get('host')
+    username, password = host_config['username'], host_config['password']
+    deadline = deadline or Deadline(None)
+    with host_slots:
+        started = time.monotonic()
+        try:
+            if probe is not None and not probe.check(host, username, password, debug,
+                                                     deadline.timeout(TIMEOUT)):
+                return None
+            cache_file = sdr_cache.get(host, username, password, debug, deadline) if sdr_cache else None
+            output = run_ipmi_command(host, username, password, command, debug, cache_file,
+                                      deadline.timeout(TIMEOUT))
+            if cache_file is None:
+                return output
+            if output is None:
+                # Dump evtl. veraltet (Firmware-Update, Hardwaretausch): ohne Cache wiederholen
+                sdr_cache.invalidate(host)
+                return run_ipmi_command(host, username, password, command, debug,
+                                        timeout=deadline.timeout(TIMEOUT))
+            sdr_cache.verify(host, command, output)
+            return output
+        finally:
+            timer.record(host_config['name'], started, time.monotonic())
+
+def process_output(host: str, host_name: str, data_type: str, command: str,
+                   output: Optional[str], args: argparse.Namespace,
+                   deadband: Optional[DeadbandFilter] = None,
+                   sensor_data: Optional[List[Dict[str, Any]]] = None,
+                   tsdb: Optional[RingStore] = None,
+                   rollup: Optional[RollupBuffer] = None,
+                   alerts: Optional[AlertEvaluator] = None,
+                   error_docs: Optional[List[Dict[str, Any]]] = None):
+    """Parst die Ausgabe eines IPMI-Kommandos und gibt die ECS-Dokumente aus
+    
+    Mit error_docs wird ein Error-Dokument nur gesammelt (Versand nach dem letzten Durchlauf).
+    """
+    print(f"\n[*] {data_type}-Daten von {host_name} ({host})")
+    
+    if output is None:
+        print(f"[!] Keine {data_type}-Daten erhalten")
+        # Error-Dokument erstellen und senden
+        error_doc = create_error_document(host, host_name, data_type, f"IPMI-Kommando fehlgeschlagen: {command}")
+        if error_docs is not None:
+            error_docs.append(error_doc)
+        elif args.console:
+            print_json(error_doc)
+        else:
+            send_json(error_doc)
+        return
+    
+    # Daten parsen (bei "sdr elist" bereits vom Aufrufer in einem Durchlauf geparst)
+    if sensor_data is None:
+        if data_type == 'temp':
+            sensor_data = parse_temperature_data(output)
+        elif data_type == 'fan':
+            sensor_data = parse_fan_data(output)
+        elif data_type == 'power':
+            sensor_data = parse_power_data(output, args.debug)
+        else:
+            return
+        
+    if not sensor_data:
+        print(f"[!] Keine {data_type}-Sensoren gefunden")
+        return
+        
+    # Einzelne JSON-Dokumente für jeden Sensor erstellen
+    compact_docs = []
+    for sensor in sensor_data:
+        # Lokale Zeitreihe bekommt jeden Messwert, auch die vom Deadband unterdrückten
+        if tsdb is not None and sensor.get('value') is not None:
+            tsdb.record(host_name, f"{data_type}/{sensor.get('name')}", sensor['value'], unit=sensor.get('unit', ''))
+        if alerts is not None:
+            # Vor Deadband/Rollup, damit jeder Messwert geprüft wird; nur Zustandswechsel erzeugen einen Alert
+            alert = alerts.evaluate(f"{host}|{data_type}|{sensor.get('name')}", data_type, host_name,
+                                    str(sensor.get('name')), sensor.get('value'),
+                                    IPMI_STATUS_LEVELS.get(sensor.get('status')),
+                                    present=sensor.get('status') not in IPMI_NOT_PRESENT)
+            if alert is not None:
+                alert_doc = build_alert_doc(create_metric_document(host, host_name, data_type, sensor), alert)
+                print(f"[!] ALERT {host_name}: {sensor.get('name')} {alert['previous']} -> {alert['state']} "
+                      f"({sensor.get('value')} {sensor.get('unit', '')}, {alert['source'] or 'Entwarnung'})")
+                if args.console:
+                    print_json(alert_doc)
+                else:
+                    send_json(alert_doc, priority=True)
+        if rollup is not None:
+            # Sampling: nur puffern, Dokumente gibt es am Fensterende (emit_rollups)
+            rollup.add(f"{host}|{data_type}|{sensor.get('name')}", sensor.get('value'),
+                       (host, host_name, data_type, sensor))
+            continue
+        annotation = None
+        if deadband is not None:
+            # Status inkl. Presence/Redundancy, damit z.B. ein PSU-Ausfall sofort gesendet wird
+            state = "|".join(str(sensor.get(k, '')) for k in ('status', 'presence', 'redundancy'))
+            annotation = deadband.check(f"{host}|{data_type}|{sensor.get('name')}", data_type,
+                                        sensor.get('value'), state)
+            if annotation is None:
+                continue
+        metric_doc = create_metric_document(host, host_name, data_type, sensor)
+        if annotation is not None:
+            metric_doc["edge"] = {"deadband": annotation}
+        if args.compact:
+            compact_docs.append(metric_doc)
+        elif args.console:
+            print_json(metric_doc)
+        else:
+            send_json(metric_doc)
+        # Bessere Ausgabe basierend auf Sensor-Typ
+        sensor_name = sensor.get('name', 'Unknown')
+        if 'value' in sensor and sensor['value'] is not None:
+            print(f"[✓] {host_name}: {sensor_name} -> {sensor['value']} {sensor.get('unit', '')}")
+        elif 'presence' in sensor:
+            print(f"[✓] {host_name}: {sensor_name} -> {sensor['presence']}")
+        elif 'redundancy' in sensor:
+            print(f"[✓] {host_name}: {sensor_name} -> {sensor['redundancy']}")
+        else:
+            print(f"[✓] {host_name}: {sensor_name} -> {sensor.get('status', 'N/A')}")
+    
+    if compact_docs:
+        compact_doc = create_compact_document(host, host_name, data_type, compact_docs)
+        if args.console:
+            print_json(compact_doc)
+        else:
+            send_json(compact_doc)
+
+def emit_rollups(rollup: RollupBuffer, args: argparse.Namespace):
+    """Ein Dokument pro Sensor und Fenster: Status/Wert der letzten Abfrage plus edge.rollup"""
+    compact_docs: Dict[tuple, List[Dict[str, Any]]] = {}
+    for _, (host, host_name, data_type, sensor), stats in rollup.rollups():
+        metric_doc = create_metric_document(host, host_name, data_type, sensor)
+        if stats is not None:
+            metric_doc["edge"] = {"rollup": stats}
+            print(f"[✓] {host_name}: {sensor.get('name')} -> {stats['last']} {sensor.get('unit', '')} "
+                  f"(min {stats['min']}, max {stats['max']}, avg {stats['avg']}, {stats['count']} Samples)")
+        if args.compact:
+            compact_docs.setdefault((host, host_name, data_type), []).append(metric_doc)
+        elif args.console:
+            print_json(metric_doc)
+        else:
+            send_json(metric_doc)
+    for (host, host_name, data_type), docs in compact_docs.items():
+        compact_doc = create_compact_document(host, host_name, data_type, docs)
+        if args.console:
+            print_json(compact_doc)
+        else:
+            send_json(compact_doc)
+
+def print_timing_summary(timer: HostTimer, total: float):
+    """Gibt die Wall-Time pro Host und den Speedup gegenüber serieller Abfrage aus"""
+    durations = timer.durations()
+    if not durations:
+        return
+    print("\n[*] Wall-Time pro Host:")
+    for host_name, duration in sorted(durations.items(), key=lambda item: item[1], reverse=True):
+        print(f"    {host_name}: {duration:.2f}s")
+    serial = sum(durations.values())
+    speedup = serial / total if total > 0 else 0.0
+    print(f"[*] Gesamtdauer: {total:.2f}s (seriell ~{serial:.2f}s, Speedup {speedup:.1f}x)")
+
+def main(argv: Optional[List[str]] = None, cancel: Optional[threading.Event] = None,
+         deadline_at: Optional[float] = None):
     parser = argparse.ArgumentParser(description='IPMI Data Collector')
     parser.add_argument('--temp', action='store_true', help='Temperatur-Daten')
     parser.add_argument('--fan', action='store_true', help='Fan-Daten')
@@ -325,8 +758,30 @@ def main():
     parser.add_argument('--all', action='store_true', help='Alle Daten')
     parser.add_argument('--console', action='store_true', help='Konsole ausgeben')
     parser.add_argument('--debug', action='store_true', help='Debug-Ausgabe aktivieren')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f'Maximale Anzahl paralleler IPMI-Kommandos (Default: {MAX_WORKERS})')
+    parser.add_argument('--per-host', type=int, default=PER_HOST_CONCURRENCY,
+                        help=f'Maximale parallele Kommandos pro BMC (Default: {PER_HOST_CONCURRENCY})')
+    parser.add_argument('--single-session', action='store_true', default=SINGLE_SESSION,
+                        help='Alle Sensoren mit einem "sdr elist" pro Host lesen')
+    parser.add_argument('--shard', default=SHARD_SPEC or None,
+                        help='Nur den Shard i/N des Inventars abfragen (z.B. 0/4, Default: EDGE_SHARD)')
+    parser.add_argument('--compact', action='store_true', default=COMPACT_MODE,
+                        help='Ein Dokument pro Host und Datentyp mit Sensor-Array (Default: IPMI_COMPACT)')
+    parser.add_argument('--delta', action='store_true', default=DELTA_MODE,
+                        help='Nur geänderte Sensorwerte senden (Deadband, Default: IPMI_DELTA)')
+    parser.add_argument('--keyframe-every', type=int, default=KEYFRAME_EVERY,
+                        help=f'Im Delta-Modus alle N Läufe vollständig senden (Default: {KEYFRAME_EVERY})')
+    parser.add_argument('--no-sdr-cache', action='store_true',
+                        help='SDR bei jeder Abfrage vom BMC lesen (kein ipmitool -S Cache)')
+    parser.add_argument('--sample-interval', type=float, default=SAMPLE_INTERVAL,
+                        help='Innerhalb des Laufs alle N Sekunden abfragen und pro Sensor ein Rollup '
+                             'senden (0 = aus, Default: EDGE_SAMPLE_INTERVAL)')
+    parser.add_argument('--window', type=float, default=ROLLUP_WINDOW,
+                        help='Länge des Rollup-Fensters in Sekunden (0 = bis kurz vor die Deadline, '
+                             'Default: EDGE_ROLLUP_WINDOW)')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Datentypen bestimmen
     data_types = []
@@ -344,29 +799,19 @@ def main():
         print("[!] Keine Datentypen ausgewählt.")
         sys.exit(1)
     
-    print(f"[*] Sammle IPMI-Daten: {', '.join(data_types)}")
+    workers = max(1, args.workers)
+    per_host = max(1, args.per_host)
+    mode = "single-session" if args.single_session else f"{per_host} pro BMC"
+    print(f"[*] Sammle IPMI-Daten: {', '.join(data_types)} ({workers} Worker, {mode})")
     
-    # Hosts aus hosts.json laden
-    try:
-        with open(HOSTS_FILE, 'r') as f:
-            hosts_data = json.load(f)
-        
-        # Prüfen ob es ein Array oder ein Objekt mit "hosts" Key ist
-        if isinstance(hosts_data, list):
-            hosts = hosts_data
-        elif isinstance(hosts_data, dict) and 'hosts' in hosts_data:
-            hosts = hosts_data['hosts']
-        else:
-            print(f"[!] Unbekannte JSON-Struktur in {HOSTS_FILE}")
+    hosts = load_hosts()
+    if args.shard:
+        try:
+            hosts = select_shard(hosts, args.shard, key=lambda h: h.get('name') or h.get('ip') or h.get('host'))
+        except ValueError as e:
+            print(f"[!] {e}")
             sys.exit(1)
-            
-        print(f"[*] {len(hosts)} Hosts aus {HOSTS_FILE} geladen")
-    except FileNotFoundError:
-        print(f"[!] Hosts-Datei {HOSTS_FILE} nicht gefunden")
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"[!] Fehler beim Parsen von {HOSTS_FILE}: {e}")
-        sys.exit(1)
+        print(f"[*] Shard {args.shard}: {len(hosts)} Hosts")
     
     command_map = {
         'temp': 'sdr type temperature',
@@ -374,64 +819,195 @@ def main():
         'power': 'sdr type "power supply"'
     }
     
-    # Für jeden Host und jeden Datentyp
-    for host_config in hosts:
-        # Unterstütze sowohl "ip" als auch "host" Feld
-        host = host_config.get('ip') or host_config.get('host')
-        username = host_config['username']
-        password = host_config['password']
-        host_name = host_config['name']
-        
-        print(f"\n[*] Verarbeite Host: {host_name} ({host})")
-        
-        for data_type in data_types:
-            print(f"\n[*] Sammle {data_type}-Daten von {host_name}...")
+    rollup = RollupBuffer() if args.sample_interval > 0 else None
+    if rollup is not None:
+        print(f"[*] {describe_sampling(args.sample_interval, args.window)}")
+    
+    deadband = None
+    if args.delta and rollup is not None:
+        # Ein Rollup pro Sensor und Fenster ist bereits die Datenreduktion
+        print("[*] Delta-Modus im Sampling-Modus ohne Wirkung, sende Rollups")
+    elif args.delta:
+        deadband = DeadbandFilter(state_path("ipmi-deadband", args.shard), DEADBANDS, args.keyframe_every)
+        deadband.begin_cycle()
+    
+    sdr_cache = None if args.no_sdr_cache else open_sdr_cache()
+    tsdb = get_tsdb(args.shard)
+    alerts = open_alerts("ipmi", args.shard)
+    health = HostHealth(state_path("ipmi-health", args.shard))
+    # Ein Ergebnis pro Host und Lauf, an HostHealth erst nach dem letzten Durchlauf
+    outcomes = HostOutcomes(health)
+    # Error- und Breaker-Dokumente des Fensters, gesendet nach dem letzten Durchlauf (wie die Rollups)
+    error_docs: List[Dict[str, Any]] = []
+    # Im Plugin-Modus bricht das cancel-Event des Daemons über die Deadline jede weitere Abfrage ab
+    deadline = Deadline.from_env(deadline_at, cancel)
+    if deadline.at is not None:
+        print(f"[*] {deadline.describe()}")
+    
+    timer = HostTimer()
+    cycle_start = time.monotonic()
+    if not args.console:
+        sender = get_sender()
+        sender.reset_stats()
+        # Spool-Replay nur bis zur Reserve des Laufs, der Rest folgt im nächsten
+        sender.set_deadline(deadline)
+    
+    # Ohne Sampling genau ein Durchlauf; mit Sampling bis Fensterende bzw. Deadline
+    for _ in sample_passes(args.sample_interval, args.window, deadline, cancel, rollup):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for host_config in hosts:
+                # Unterstütze sowohl "ip" als auch "host" Feld
+                host = host_config.get('ip') or host_config.get('host')
+            
+                # Circuit Breaker: Hosts im Backoff überspringen (ein Fehler-Dokument pro Backoff-Fenster),
+                # Hosts mit Fehler in einem früheren Durchlauf nicht erneut abfragen
+                decision = outcomes.admit(host)
+                if decision is None:
+                    continue
+                if decision == SKIP:
+                    if health.should_report(host):
+                        error_docs.append(create_breaker_document(host, host_config['name'], health.info(host)))
+                    continue
+                probe = HostProbe() if decision == PROBE else None
             
-            output = run_ipmi_command(host, username, password, command_map[data_type], args.debug)
+                host_slots = threading.Semaphore(per_host)
+                if args.single_session:
+                    # Ein ipmitool-Aufruf (eine RMCP+-Session, ein SDR-Walk) pro Host
+                    future = executor.submit(collect_data_type, host_config, 'sdr',
+                                             SDR_ELIST_COMMAND, host_slots, timer, args.debug, sdr_cache, probe,
+                                             deadline)
+                    futures[future] = (host, host_config['name'], None, probe)
+                    continue
+                # Jeder (Host, Datentyp) ist ein eigener Job; das Per-BMC-Semaphore verhindert,
+                # dass ein einzelner BMC mit parallelen RMCP+-Sessions überlastet wird.
+                for data_type in data_types:
+                    future = executor.submit(collect_data_type, host_config, data_type,
+                                             command_map[data_type], host_slots, timer, args.debug, sdr_cache, probe,
+                                             deadline)
+                    futures[future] = (host, host_config['name'], data_type, probe)
         
-            if output is None:
-                print(f"[!] Keine {data_type}-Daten erhalten")
-                # Error-Dokument erstellen und senden
-                error_doc = create_error_document(host, host_name, data_type, f"IPMI-Kommando fehlgeschlagen: {command_map[data_type]}")
-                if args.console:
-                    print_json(error_doc)
+            # Ausgabe im Haupt-Thread, sobald ein Job fertig ist
+            for future in as_completed(futures):
+                if deadline.cancelled:
+                    # Abbruch durch den Daemon: keine neuen ipmitool-Aufrufe mehr starten
+                    for pending in futures:
+                        pending.cancel()
+                    print("[!] Abbruch angefordert, verbleibende Hosts werden übersprungen")
+                    break
+                host, host_name, data_type, probe = futures[future]
+                try:
+                    output = future.result()
+                except DeadlineExceeded:
+                    # Kein Fehler des Hosts: weder Fehler-Dokument noch Circuit Breaker
+                    deadline.skip(host)
+                    continue
+                except Exception as e:
+                    print(f"[!] Fehler für {host}: {e}")
+                    output = None
+                deadline.complete(host)
+            
+                if probe is not None and probe.ok is False:
+                    # Probe fehlgeschlagen: ein Fehler pro Host statt eines pro Datentyp,
+                    # das Breaker-Dokument folgt nach dem letzten Durchlauf
+                    outcomes.failure(host, f"Probe fehlgeschlagen: {PROBE_COMMAND}")
+                    continue
+                if output is None:
+                    command = SDR_ELIST_COMMAND if data_type is None else command_map[data_type]
+                    outcomes.failure(host, f"IPMI-Kommando fehlgeschlagen: {command}")
                 else:
-                    send_json(error_doc)
-                continue
+                    outcomes.success(host)
             
-            # Daten parsen
-            if data_type == 'temp':
-                sensor_data = parse_temperature_data(output)
-            elif data_type == 'fan':
-                sensor_data = parse_fan_data(output)
-            elif data_type == 'power':
-                sensor_data = parse_power_data(output, args.debug)
+                if data_type is not None:
+                    process_output(host, host_name, data_type, command_map[data_type], output, args, deadband,
+                                   tsdb=tsdb, rollup=rollup, alerts=alerts, error_docs=error_docs)
+                    continue
+            
+                parsed = parse_sdr(output) if output is not None else {}
+                for routed_type in data_types:
+                    process_output(host, host_name, routed_type, SDR_ELIST_COMMAND, output, args,
+                                   deadband, parsed.get(routed_type), tsdb, rollup, alerts, error_docs)
+    
+    # Nach einem Abbruch durch den Daemon nichts Neues mehr senden und keinen State schreiben:
+    # der Lauf gilt als beendet, der nächste startet erst, wenn dieser Thread zurückkehrt
+    save_state = not deadline.cancelled
+    if not save_state:
+        print("\n[!] Lauf abgebrochen: keine Rollups, State wird nicht gespeichert")
+    else:
+        host_names = {h.get('ip') or h.get('host'): h['name'] for h in hosts}
+        for host in outcomes.commit():
+            # Backoff verlängert: ein Dokument für das neue Fenster
+            health.should_report(host)
+            error_docs.append(create_breaker_document(host, host_names.get(host, host), health.info(host)))
+        for error_doc in error_docs:
+            if args.console:
+                print_json(error_doc)
             else:
-                continue
-                
-            if not sensor_data:
-                print(f"[!] Keine {data_type}-Sensoren gefunden")
-                continue
-                
-            # Einzelne JSON-Dokumente für jeden Sensor erstellen
-            for sensor in sensor_data:
-                metric_doc = create_metric_document(host, host_name, data_type, sensor)
-                if args.console:
-                    print_json(metric_doc)
-                else:
-                    send_json(metric_doc)
-                # Bessere Ausgabe basierend auf Sensor-Typ
-                sensor_name = sensor.get('name', 'Unknown')
-                if 'value' in sensor and sensor['value'] is not None:
-                    print(f"[✓] {host_name}: {sensor_name} -> {sensor['value']} {sensor.get('unit', '')}")
-                elif 'presence' in sensor:
-                    print(f"[✓] {host_name}: {sensor_name} -> {sensor['presence']}")
-                elif 'redundancy' in sensor:
-                    print(f"[✓] {host_name}: {sensor_name} -> {sensor['redundancy']}")
-                else:
-                    print(f"[✓] {host_name}: {sensor_name} -> {sensor.get('status', 'N/A')}")
+                send_json(error_doc)
+        if rollup is not None:
+            emit_rollups(rollup, args)
+    
+    if deadline.skipped or deadline.partial:
+        print(f"\n[!] Zeitmangel: {deadline.summary()}")
     
+    if _sender is not None:
+        # Bereits Gepuffertes (gültige Messwerte) auch nach einem Abbruch noch senden
+        _sender.flush()
+        print(f"\n[*] Logstash: {_sender.summary()}")
+    
+    if sdr_cache is not None:
+        print(f"[*] SDR-Cache: {sdr_cache.summary()}")
+    
+    if tsdb is not None:
+        print(f"[*] Lokale Zeitreihen: {tsdb.summary()}")
+    
+    if alerts is not None:
+        if save_state:
+            try:
+                alerts.save()
+            except OSError as e:
+                print(f"[!] Alert-State konnte nicht gespeichert werden: {e}")
+        print(f"[*] Alerts: {alerts.summary()}")
+    
+    if save_state:
+        try:
+            health.save()
+        except OSError as e:
+            print(f"[!] Health-State konnte nicht gespeichert werden: {e}")
+    print(f"[*] Circuit Breaker: {health.summary()}")
+    
+    if deadband is not None:
+        if save_state:
+            try:
+                deadband.save()
+            except OSError as e:
+                print(f"[!] Deadband-State konnte nicht gespeichert werden: {e}")
+        print(f"[*] Delta-Modus: {deadband.summary()}")
+    
+    print_timing_summary(timer, time.monotonic() - cycle_start)
+    if not save_state:
+        return 1
     print("\n[✓] IPMI-Datensammlung abgeschlossen")
+    return 0
+
+# ---- Plugin-Schnittstelle für den Edge Daemon (mode: plugin) ----
+def _run_plugin(args: List[str], cancel: threading.Event, deadline_at: Optional[float] = None) -> int:
+    try:
+        return main(args, cancel, deadline_at) or 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+
+async def collect(args: List[str], context: Dict[str, Any]) -> int:
+    """Ein Sammel-Lauf im Daemon-Prozess; Hosts-Datei und Logstash-Verbindung bleiben erhalten"""
+    return await asyncio.to_thread(_run_plugin, list(args), context['cancel'], context.get('deadline'))
+
+def shutdown():
+    """Wird vom Daemon beim Beenden aufgerufen"""
+    if _sender is not None:
+        _sender.close()
+    for store in _tsdb.values():
+        if store is not None:
+            store.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Logstash Sender für Edge-Monitoring
+Hält eine TCP-Verbindung zum Edge-Logstash (codec json_lines) offen,
+bündelt NDJSON-Zeilen und sendet sie nach Größe oder Zeit gesammelt.
+Nicht zustellbare Zeilen landen im Disk-Spool (edge_spool) und werden
+nach dem nächsten erfolgreichen Verbindungsaufbau nachgesendet.
+Alternativ (EDGE_OUTPUT=http) werden die gebündelten Zeilen gzip-komprimiert
+per HTTP POST an einen Logstash http-Input gesendet.
+"""
+
+import os
+import ssl
+import gzip
+import json
+import base64
+import atexit
+import select
+import socket
+import threading
+import time
+import http.client
+from typing import Dict, Any, Optional
+
+from edge_spool import DiskSpool
+from edge_deadline import Deadline
+
+# ---- Konfiguration ----
+CONNECT_TIMEOUT = float(os.getenv("EDGE_CONNECT_TIMEOUT", "5.0"))
+FLUSH_BYTES = int(os.getenv("EDGE_FLUSH_BYTES", "65536"))
+FLUSH_INTERVAL = float(os.getenv("EDGE_FLUSH_INTERVAL", "1.0"))
+MAX_RETRIES = int(os.getenv("EDGE_SEND_RETRIES", "2"))
+SPOOL_RETRY_INTERVAL = float(os.getenv("EDGE_SPOOL_RETRY_INTERVAL", "30.0"))
+REPLAY_SECONDS = float(os.getenv("EDGE_SPOOL_REPLAY_SECONDS", "2.0"))     # Spool-Replay pro Flush
+
+# HTTP-Bulk-Ausgabe (EDGE_OUTPUT=http)
+OUTPUT = os.getenv("EDGE_OUTPUT", "tcp").lower()                        # tcp | http
+HTTP_BATCH_BYTES = int(os.getenv("EDGE_HTTP_BATCH_BYTES", str(512 * 1024)))  # unkomprimiert pro POST
+HTTP_FLUSH_INTERVAL = float(os.getenv("EDGE_HTTP_FLUSH_INTERVAL", "5.0"))
+HTTP_GZIP_LEVEL = int(os.getenv("EDGE_HTTP_GZIP_LEVEL", "6"))             # 0 = unkomprimiert
+HTTP_TIMEOUT = float(os.getenv("EDGE_HTTP_TIMEOUT", "15.0"))
+HTTP_PATH = os.getenv("EDGE_HTTP_PATH", "/")
+HTTP_TLS = os.getenv("EDGE_HTTP_TLS", "0").lower() in ("1", "true", "yes")
+HTTP_CA = os.getenv("EDGE_HTTP_CA", "")                                   # leer = System-CAs
+HTTP_USER = os.getenv("EDGE_HTTP_USER", "")
+HTTP_PASSWORD = os.getenv("EDGE_HTTP_PASSWORD", "")
+
+class HttpRejected(Exception):
+    """Der http-Input lehnt einen Batch dauerhaft ab (4xx außer 429); erneut senden hilft nicht"""
+
+    def __init__(self, status: int, reason: str):
+        super().__init__(f"HTTP {status} {reason}")
+        self.status = status
+
+class LogstashSender:
+    """Persistenter, gepufferter NDJSON-Sender für einen Logstash tcp-Input
+
+    Dokumente werden gepuffert und gesendet, sobald FLUSH_BYTES erreicht sind
+    oder der älteste gepufferte Eintrag FLUSH_INTERVAL Sekunden alt ist. Das
+    Alter prüft ein Hintergrund-Thread, damit ein Teilpuffer auch dann
+    rausgeht, wenn der Collector gerade nichts sendet (z.B. auf einen
+    langsamen Host wartet) und später beim Timeout abgebrochen wird.
+    Bei Verbindungsfehlern wird neu verbunden; close() (auch via atexit)
+    sendet den Rest des Puffers. Mit spool werden Zeilen, die auch nach
+    max_retries nicht zugestellt werden, auf Disk gepuffert; für
+    SPOOL_RETRY_INTERVAL Sekunden geht danach alles direkt in den Spool.
+    Der Replay des Spools hält den Lock, deshalb sendet ein Flush davon
+    höchstens REPLAY_SECONDS bzw. EDGE_SPOOL_REPLAY_MAX_BYTES und nie über die
+    Reserve der Deadline des Laufs (set_deadline) hinaus.
+    """
+
+    def __init__(self, host: str, port: int,
+                 connect_timeout: float = CONNECT_TIMEOUT,
+                 flush_bytes: int = FLUSH_BYTES,
+                 flush_interval: float = FLUSH_INTERVAL,
+                 max_retries: int = MAX_RETRIES,
+                 spool: Optional[DiskSpool] = None):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.spool = spool
+
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.RLock()
+        self._buffer = bytearray()
+        self._buffered_docs = 0
+        self._buffer_since: Optional[float] = None
+        self._connected_once = False
+        self._closed = False
+        self._down_until = 0.0
+        self._needs_replay = spool is not None
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.deadline: Optional[Deadline] = None
+
+        self.stats = {
+            'docs_sent': 0,
+            'bytes_sent': 0,
+            'docs_failed': 0,
+            'flushes': 0,
+            'reconnects': 0,
+            'docs_spooled': 0,
+            'docs_replayed': 0,
+            'docs_priority': 0
+        }
+        atexit.register(self.close)
+
+    def connect(self):
+        """Baut die TCP-Verbindung auf (wirft OSError bei Fehler)"""
+        with self._lock:
+            if self._sock is not None:
+                return
+            sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            self._sock = sock
+            self._needs_replay = self.spool is not None
+            if self._connected_once:
+                self.stats['reconnects'] += 1
+            self._connected_once = True
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _peer_closed(self) -> bool:
+        """Erkennt eine vom Logstash geschlossene Verbindung vor dem Schreiben"""
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+            if readable:
+                return self._sock.recv(1, socket.MSG_PEEK) == b''
+        except OSError:
+            return True
+        return False
+
+    def send(self, doc: Dict[str, Any]):
+        """Puffert ein Dokument und sendet bei Bedarf"""
+        line = (json.dumps(doc, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if not self._buffer:
+                self._buffer_since = time.monotonic()
+            self._buffer += line
+            self._buffered_docs += 1
+            if (len(self._buffer) >= self.flush_bytes
+                    or time.monotonic() - self._buffer_since >= self.flush_interval):
+                self.flush()
+            elif self._flusher is None and not self._closed:
+                self._flusher = threading.Thread(target=self._flush_loop, name="logstash-flush", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        """Sendet den Puffer nach flush_interval, auch wenn kein weiteres send() mehr kommt"""
+        while not self._stop.wait(max(0.1, self.flush_interval / 2)):
+            with self._lock:
+                if (self._buffer and self._buffer_since is not None
+                        and time.monotonic() - self._buffer_since >= self.flush_interval):
+                    self.flush()
+
+    def send_priority(self, doc: Dict[str, Any]) -> bool:
+        """Sendet ein Dokument (z.B. Alert) sofort, vor den gepufferten Routine-Dokumenten
+
+        Der Spool-Replay wird dafür zurückgestellt und beim nächsten normalen
+        Flush nachgeholt. Schlägt das Senden fehl, landet das Dokument wie
+        alle anderen im Spool.
+        """
+        line = (json.dumps(doc, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if not self._buffer:
+                self._buffer_since = time.monotonic()
+            self._buffer[0:0] = line
+            self._buffered_docs += 1
+            self.stats['docs_priority'] += 1
+            return self.flush(replay=False)
+
+    def flush(self, replay: bool = True) -> bool:
+        """Sendet den Puffer; bei Fehlern wird bis zu max_retries-mal neu verbunden"""
+        with self._lock:
+            if not self._buffer:
+                return True
+            payload = bytes(self._buffer)
+            docs = self._buffered_docs
+            self._buffer.clear()
+            self._buffered_docs = 0
+            self._buffer_since = None
+
+            # Logstash war eben nicht erreichbar: ohne neuen Connect-Versuch spoolen
+            if self.spool is not None and time.monotonic() < self._down_until:
+                self._to_spool(payload, docs)
+                return False
+
+            last_error = None
+            for _ in range(self.max_retries + 1):
+                try:
+                    if self._sock is not None and self._peer_closed():
+                        self._disconnect()
+                    self.connect()
+                    if self._needs_replay and replay:
+                        self._replay_spool()
+                    rejected = self._deliver(payload)
+                    self.stats['docs_sent'] += docs - rejected
+                    self.stats['bytes_sent'] += len(payload)
+                    self.stats['flushes'] += 1
+                    return not rejected
+                except OSError as e:
+                    last_error = e
+                    self._disconnect()
+
+            print(f"[!] Fehler beim Senden an Logstash ({self.host}:{self.port}): {last_error}")
+            if self.spool is not None:
+                self._down_until = time.monotonic() + SPOOL_RETRY_INTERVAL
+                self._to_spool(payload, docs)
+            else:
+                self.stats['docs_failed'] += docs
+            return False
+
+    def _write(self, payload: bytes):
+        """Überträgt NDJSON-Zeilen über die offene Verbindung (wirft OSError)"""
+        self._sock.sendall(payload)
+
+    def _deliver(self, payload: bytes) -> int:
+        """Sendet NDJSON-Zeilen; gibt die Zahl dauerhaft abgelehnter (verworfener) Dokumente zurück"""
+        self._write(payload)
+        return 0
+
+    def _to_spool(self, payload: bytes, docs: int):
+        try:
+            self.spool.append(payload)
+            self.stats['docs_spooled'] += docs
+            self._needs_replay = True
+        except OSError as e:
+            self.stats['docs_failed'] += docs
+            print(f"[!] Spool-Fehler, {docs} Dokumente verloren: {e}")
+
+    def _replay_spool(self):
+        """Sendet gespoolte Segmente in großen Chunks vor den neuen Daten (Reihenfolge bleibt erhalten)
+
+        Begrenzt auf REPLAY_SECONDS und das Restbudget der Deadline vor ihrer
+        Reserve; was nicht mehr passt, folgt bei einem späteren Flush.
+        """
+        budget = REPLAY_SECONDS
+        if self.deadline is not None:
+            if self.deadline.cancelled:
+                return
+            budget = min(budget, self.deadline.remaining() - self.deadline.reserve)
+        if budget <= 0:
+            return
+        failed = self.stats['docs_failed']
+        docs, nbytes, done = self.spool.replay(self._deliver, stop_at=time.monotonic() + budget)
+        self._needs_replay = not done
+        # Abgelehnte Zeilen sind schon als fehlgeschlagen gezählt
+        docs -= self.stats['docs_failed'] - failed
+        if docs:
+            self.stats['docs_replayed'] += docs
+            self.stats['bytes_sent'] += nbytes
+            print(f"[*] Spool: {docs} Dokumente ({nbytes} Bytes) nachgesendet"
+                  + ("" if done else ", Rest folgt"))
+
+    def set_deadline(self, deadline: Optional[Deadline]):
+        """Deadline des aktuellen Laufs (begrenzt den Spool-Replay; None = ohne Deadline)"""
+        with self._lock:
+            self.deadline = deadline
+
+    def close(self):
+        """Sendet den restlichen Puffer und schließt die Verbindung"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._stop.set()
+            self.flush()
+            self._disconnect()
+            if self.spool is not None:
+                self.spool.seal()
+
+    def reset_stats(self):
+        """Setzt die Zähler zurück (z.B. zu Beginn eines Laufs im Plugin-Modus)"""
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+    def summary(self) -> str:
+        """Kurze Zusammenfassung der Zähler für die Ausgabe am Ende eines Laufs"""
+        s = self.stats
+        return (f"{s['docs_sent']} Dokumente, {s['bytes_sent']} Bytes, {s['flushes']} Flushes, "
+                f"{s['reconnects']} Reconnects, {s['docs_spooled']} gespoolt, "
+                f"{s['docs_replayed']} nachgesendet, {s['docs_failed']} fehlgeschlagen"
+                + (f", {s['docs_priority']} mit Priorität" if s['docs_priority'] else ""))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class HttpBulkSender(LogstashSender):
+    """NDJSON-Batches per HTTP POST (gzip) an einen Logstash http-Input
+
+    Puffern, Spool und Retries wie LogstashSender; ein Flush ist ein POST
+    über eine Keep-Alive-Verbindung. Der http-Input braucht dafür
+    additional_codecs "application/x-ndjson" => "json_lines" (siehe
+    18-input-http-bulk.conf) und entpackt Content-Encoding gzip selbst.
+    5xx und 429 gelten wie Verbindungsfehler (Retry, dann Spool). Andere
+    4xx-Antworten würden bei jedem Replay wieder scheitern: der Batch wird
+    verworfen und als fehlgeschlagen gezählt, bei 413 vorher halbiert und
+    erneut gesendet.
+    """
+
+    def __init__(self, host: str, port: int,
+                 connect_timeout: float = CONNECT_TIMEOUT,
+                 flush_bytes: int = HTTP_BATCH_BYTES,
+                 flush_interval: float = HTTP_FLUSH_INTERVAL,
+                 max_retries: int = MAX_RETRIES,
+                 spool: Optional[DiskSpool] = None,
+                 path: str = HTTP_PATH,
+                 gzip_level: int = HTTP_GZIP_LEVEL,
+                 timeout: float = HTTP_TIMEOUT,
+                 tls: bool = HTTP_TLS):
+        super().__init__(host, port, connect_timeout, flush_bytes, flush_interval, max_retries, spool)
+        self.path = path
+        self.gzip_level = gzip_level
+        self.timeout = timeout
+        self.tls = tls
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._headers = {"Content-Type": "application/x-ndjson"}
+        if gzip_level > 0:
+            self._headers["Content-Encoding"] = "gzip"
+        if HTTP_USER:
+            token = base64.b64encode(f"{HTTP_USER}:{HTTP_PASSWORD}".encode("utf-8")).decode("ascii")
+            self._headers["Authorization"] = f"Basic {token}"
+        self.stats['bytes_wire'] = 0
+        self.stats['requests'] = 0
+
+    def connect(self):
+        """Baut die (Keep-Alive-)Verbindung zum http-Input auf (wirft OSError bei Fehler)"""
+        with self._lock:
+            if self._conn is not None:
+                return
+            if self.tls:
+                context = ssl.create_default_context(cafile=HTTP_CA or None)
+                conn = http.client.HTTPSConnection(self.host, self.port, timeout=self.connect_timeout,
+                                                   context=context)
+            else:
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=self.connect_timeout)
+            conn.connect()
+            conn.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            conn.sock.settimeout(self.timeout)
+            self._conn = conn
+            self._sock = conn.sock
+            self._needs_replay = self.spool is not None
+            if self._connected_once:
+                self.stats['reconnects'] += 1
+            self._connected_once = True
+
+    def _disconnect(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._sock = None
+
+    def _write(self, payload: bytes):
+        # Nach "Connection: close" (auch mitten im Replay) neu verbinden
+        self.connect()
+        body = gzip.compress(payload, compresslevel=self.gzip_level, mtime=0) if self.gzip_level > 0 else payload
+        try:
+            self._conn.request("POST", self.path, body=body, headers=self._headers)
+            response = self._conn.getresponse()
+            response.read()
+        except http.client.HTTPException as e:
+            raise OSError(f"HTTP-Fehler: {e!r}") from e
+        if response.will_close:
+            self._disconnect()
+        if response.status >= 500 or response.status == 429:
+            raise OSError(f"HTTP {response.status} {response.reason}")
+        if not 200 <= response.status < 300:
+            raise HttpRejected(response.status, response.reason)
+        self.stats['bytes_wire'] += len(body)
+        self.stats['requests'] += 1
+
+    def _deliver(self, payload: bytes) -> int:
+        try:
+            self._write(payload)
+            return 0
+        except HttpRejected as e:
+            docs = payload.count(b"\n")
+            if e.status == 413 and docs > 1:
+                # Zu groß für den http-Input: Hälften einzeln senden
+                cut = payload.rfind(b"\n", 0, len(payload) // 2) + 1 or payload.find(b"\n") + 1
+                return self._deliver(payload[:cut]) + self._deliver(payload[cut:])
+            print(f"[!] Logstash ({self.host}:{self.port}) lehnt {docs} Dokumente ab ({e}), verworfen")
+            self.stats['docs_failed'] += docs
+            return docs
+
+    def summary(self) -> str:
+        s = self.stats
+        ratio = s['bytes_wire'] / s['bytes_sent'] * 100 if s['bytes_sent'] else 0.0
+        return (f"{super().summary()}, {s['requests']} POSTs, "
+                f"{s['bytes_wire']} Bytes übertragen ({ratio:.0f}%)")
+
+def create_sender(host: str, port: int, http_port: int,
+                  spool: Optional[DiskSpool] = None) -> LogstashSender:
+    """Sender je nach EDGE_OUTPUT: tcp (json_lines, port) oder http (gzip-Bulk, http_port)"""
+    if OUTPUT == "http":
+        return HttpBulkSender(host, http_port, spool=spool)
+    if OUTPUT != "tcp":
+        print(f"[!] Unbekannter EDGE_OUTPUT='{OUTPUT}', verwende tcp")
+    return LogstashSender(host, port, spool=spool)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Strukturiertes Run-Log für den Edge Monitoring Daemon
+Ein JSON-Record pro Start/Ende eines Script-Laufs in rotierenden Segmenten,
+dazu ein Streaming-Reader mit kleinem Offset-Index pro Segment
+
+CLI:
+    python3 runlog.py stats --script ipmi --hours 24
+    python3 runlog.py tail --script ipmi -n 20
+"""
+
+import os
+import sys
+import json
+import time
+import bisect
+import argparse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# ---- Konfiguration ----
+RUNLOG_DIR = os.getenv("EDGE_RUNLOG_DIR", "/var/log/edge-monitoring/runs")
+SEGMENT_BYTES = int(os.getenv("EDGE_RUNLOG_SEGMENT_BYTES", str(8 * 1024 * 1024)))
+KEEP_SEGMENTS = int(os.getenv("EDGE_RUNLOG_KEEP", "20"))
+# Alle INDEX_STRIDE Bytes ein Index-Eintrag (Zeitstempel -> Offset)
+INDEX_STRIDE = int(os.getenv("EDGE_RUNLOG_INDEX_STRIDE", str(16 * 1024)))
+
+SEGMENT_PREFIX = "runs-"
+SEGMENT_SUFFIX = ".ndjson"
+INDEX_SUFFIX = ".idx"
+
+class RunLogWriter:
+    """Append-only Writer; rotiert nach segment_bytes und behält keep Segmente
+
+    Jedes Segment heißt runs-<start_ns>.ndjson und deckt die Zeit bis zum
+    Start des nächsten Segments ab. Die Index-Datei daneben enthält Zeilen
+    "<ts> <offset>", etwa alle INDEX_STRIDE Bytes eine.
+    """
+
+    def __init__(self, directory: str = RUNLOG_DIR,
+                 segment_bytes: int = SEGMENT_BYTES,
+                 keep: int = KEEP_SEGMENTS):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.keep = max(1, keep)
+        os.makedirs(directory, mode=0o750, exist_ok=True)
+        self._file = None
+        self._index = None
+        self._last_indexed = None
+
+    def _open_segment(self):
+        base = os.path.join(self.directory, f"{SEGMENT_PREFIX}{time.time_ns():020d}")
+        self._file = open(base + SEGMENT_SUFFIX, "ab")
+        self._index = open(base + INDEX_SUFFIX, "a", encoding="ascii")
+        self._last_indexed = None
+        self._prune()
+
+    def _prune(self):
+        for path in segments(self.directory)[:-self.keep]:
+            for p in (path, path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX):
+                try:
+                    os.unlink(p)
+                except OSError:
+                    pass
+
+    def write(self, event: Dict[str, Any]):
+        if self._file is None:
+            self._open_segment()
+        ts = time.time()
+        record = {"ts": round(ts, 3), **event}
+        line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+
+        offset = self._file.tell()
+        if self._last_indexed is None or offset - self._last_indexed >= INDEX_STRIDE:
+            self._index.write(f"{ts:.3f} {offset}\n")
+            self._index.flush()
+            self._last_indexed = offset
+        self._file.write(line)
+        self._file.flush()
+
+        if self._file.tell() >= self.segment_bytes:
+            self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = None
+            self._index = None
+
+# ---- Lesen ----
+def segments(directory: str = RUNLOG_DIR) -> List[str]:
+    """Alle Segmente, älteste zuerst"""
+    try:
+        names = [n for n in os.listdir(directory)
+                 if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX)]
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, n) for n in sorted(names)]
+
+def _segment_start(path: str) -> float:
+    name = os.path.basename(path)
+    return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) / 1e9
+
+def _load_index(path: str) -> Tuple[List[float], List[int]]:
+    times, offsets = [], []
+    try:
+        with open(path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX, "r", encoding="ascii") as f:
+            for line in f:
+                try:
+                    ts, offset = line.split()
+                    times.append(float(ts))
+                    offsets.append(int(offset))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return times, offsets
+
+def iter_events(directory: str = RUNLOG_DIR, since: float = 0.0,
+                until: Optional[float] = None,
+                script: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Streamt Records mit since <= ts (< until), ohne Segmente komplett zu laden
+
+    Segmente, die vor since enden, werden übersprungen; im ersten relevanten
+    Segment springt der Reader per Index an den letzten Eintrag <= since.
+    """
+    paths = segments(directory)
+    starts = [_segment_start(p) for p in paths]
+    for i, path in enumerate(paths):
+        if i + 1 < len(paths) and starts[i + 1] <= since:
+            continue
+        if until is not None and starts[i] >= until:
+            break
+
+        times, offsets = _load_index(path)
+        position = bisect.bisect_right(times, since) - 1
+        offset = offsets[position] if position >= 0 else 0
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            continue
+        with f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # abgeschnittene letzte Zeile nach Absturz
+                ts = record.get("ts", 0)
+                if ts < since:
+                    continue
+                if until is not None and ts >= until:
+                    return
+                if script is not None and record.get("script") != script:
+                    continue
+                yield record
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-Rank-Perzentil"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+def run_stats(directory: str = RUNLOG_DIR, since: float = 0.0,
+              script: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Erfolgsquote und Dauer-Perzentile pro Script aus den finish-Records"""
+    durations: Dict[str, List[float]] = {}
+    counts: Dict[str, Dict[str, int]] = {}
+    for record in iter_events(directory, since=since, script=script):
+        if record.get("event") != "finish":
+            continue
+        name = record.get("script")
+        per_status = counts.setdefault(name, {})
+        status = record.get("status", "unknown")
+        per_status[status] = per_status.get(status, 0) + 1
+        if record.get("duration") is not None:
+            durations.setdefault(name, []).append(record["duration"])
+
+    result = {}
+    for name, per_status in counts.items():
+        total = sum(per_status.values())
+        values = durations.get(name, [])
+        result[name] = {
+            "runs": total,
+            "by_status": per_status,
+            "success_rate": per_status.get("success", 0) / total * 100 if total else 0.0,
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "max": max(values) if values else None
+        }
+    return result
+
+# ---- CLI ----
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run-Log des Edge Monitoring Daemons auswerten")
+    parser.add_argument("--dir", default=RUNLOG_DIR, help="Run-Log-Verzeichnis")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = sub.add_parser("stats", help="Erfolgsquote und p95-Dauer pro Script")
+    stats_parser.add_argument("--script", help="Nur dieses Script")
+    stats_parser.add_argument("--hours", type=float, default=24, help="Zeitraum in Stunden (Default 24)")
+    stats_parser.add_argument("--json", action="store_true", help="Ausgabe als JSON")
+
+    tail_parser = sub.add_parser("tail", help="Letzte Records anzeigen")
+    tail_parser.add_argument("--script", help="Nur dieses Script")
+    tail_parser.add_argument("-n", type=int, default=20, help="Anzahl Records")
+    tail_parser.add_argument("--hours", type=float, default=24, help="Suchzeitraum in Stunden")
+
+    args = parser.parse_args(argv)
+    since = time.time() - args.hours * 3600
+
+    if args.command == "stats":
+        stats = run_stats(args.dir, since=since, script=args.script)
+        if args.json:
+            print(json.dumps(stats, indent=2))
+            return 0
+        if not stats:
+            print(f"[!] Keine Läufe in den letzten {args.hours:g}h gefunden ({args.dir})")
+            return 1
+        print(f"[*] Läufe der letzten {args.hours:g}h:")
+        for name, s in sorted(stats.items()):
+            p95 = f"{s['p95']:.1f}s" if s['p95'] is not None else "n/a"
+            p50 = f"{s['p50']:.1f}s" if s['p50'] is not None else "n/a"
+            print(f"   {name}: {s['runs']} Läufe, {s['success_rate']:.1f}% erfolgreich, "
+                  f"p50 {p50}, p95 {p95} {s['by_status']}")
+        return 0
+
+    # tail: nur die letzten n Records im Speicher halten
+    from collections import deque
+    for record in deque(iter_events(args.dir, since=since, script=args.script), maxlen=args.n):
+        print(json.dumps(record))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,61 @@
 #!/usr/bin/env python3
 """
 Status-Script für Edge Monitoring Daemon
-Zeigt aktuellen Status an
+Zeigt aktuellen Status an (live über den Status-Socket des Daemons,
+Fallback: Auswertung der Log-Datei)
 """
 
+import argparse
 import subprocess
 import json
 import os
+import socket
+import sys
+import time
 from datetime import datetime
 
+from runlog import RUNLOG_DIR, run_stats
+
+# Lokale Zeitreihen: edge_tsdb.py liegt bei den Collectors, nicht in /opt/monitoring
+SCRIPTS_DIR = os.getenv('EDGE_SCRIPTS_DIR', '/opt/python_scripts')
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+try:
+    from edge_tsdb import TSDB_DIR, open_readers
+except ImportError:
+    TSDB_DIR, open_readers = None, None
+
+# Status-Socket des Daemons - gleiche Reihenfolge wie im Daemon (root / ohne Root)
+SOCKET_PATHS = [
+    os.getenv('EDGE_STATUS_SOCKET', '/run/edge-monitoring/status.sock'),
+    os.path.expanduser('~/edge-monitoring.sock')
+]
+
+# Run-Log des Daemons (Fallback, wenn der Socket kein runlog_dir liefert)
+RUNLOG_DIRS = [RUNLOG_DIR, os.path.expanduser('~/edge-monitoring-runs')]
+
+def query_daemon(socket_paths=SOCKET_PATHS, timeout=2.0):
+    """Fragt den In-Memory-Zustand des Daemons ab; None wenn kein Socket antwortet"""
+    for socket_path in socket_paths:
+        if not os.path.exists(socket_path):
+            continue
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                sock.connect(socket_path)
+                chunks = []
+                while True:
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+            state = json.loads(b''.join(chunks).decode('utf-8'))
+            state['socket'] = socket_path
+            return state
+        except (OSError, ValueError):
+            continue
+    return None
+
 def get_daemon_status():
     """Holt den Status des Daemons"""
     try:
@@ -43,8 +90,101 @@ def get_daemon_status():
     except Exception as e:
         return "error", [f"Error: {e}"]
 
+def print_run_history(directories, hours=24):
+    """Erfolgsquote und p95-Dauer pro Script aus dem strukturierten Run-Log"""
+    for directory in directories:
+        if not directory or not os.path.isdir(directory):
+            continue
+        stats = run_stats(directory, since=time.time() - hours * 3600)
+        print(f"📈 Run History (last {hours}h, {directory}):")
+        print("-" * 40)
+        if not stats:
+            print("   No runs recorded")
+        for script_name, s in sorted(stats.items()):
+            p95 = f"{s['p95']:.1f}s" if s['p95'] is not None else "N/A"
+            print(f"   {script_name}: {s['runs']} runs, {s['success_rate']:.1f}% success, p95 {p95}")
+        print()
+        return True
+    return False
+
+def print_sensor_trends(host=None, minutes=60, directory=None):
+    """Letzter Wert, min/max und Trend pro Sensor aus den lokalen Zeitreihen (auch ohne Uplink)"""
+    if open_readers is None:
+        print(f"⚠️  edge_tsdb.py nicht gefunden (EDGE_SCRIPTS_DIR={SCRIPTS_DIR})")
+        return False
+    stores = open_readers(directory or TSDB_DIR)
+    print(f"🌡️  Sensor Trends (last {minutes:g}min, {directory or TSDB_DIR}):")
+    print("-" * 40)
+    since = time.time() - minutes * 60
+    found = False
+    for store_name, store in stores.items():
+        for series_host, sensor, unit, _ in store.series(host):
+            s = store.stats_for(series_host, sensor, since=since)
+            if s is None:
+                continue
+            found = True
+            trend = f"{s['slope'] * 3600:+.2f}/h" if s['slope'] is not None else "n/a"
+            print(f"   [{store_name}] {series_host} {sensor}: {s['last']:g} {unit} "
+                  f"(min {s['min']:g}, max {s['max']:g}, trend {trend}, {s['count']} values)")
+        store.close()
+    if not found:
+        print("   No sensor values recorded")
+    print()
+    return found
+
+def _format_time(value):
+    if not value:
+        return "Never"
+    return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M:%S')
+
+def print_live_status(state):
+    """Zeigt den Status aus dem Daemon-Snapshot an"""
+    print("\n" + "="*60)
+    print("📊 EDGE MONITORING DAEMON STATUS")
+    print("="*60)
+    print(f"🟢 Daemon Status: RUNNING (PID {state['pid']}, via {state['socket']})")
+    print(f"⏰ Uptime: {int(state['uptime'] // 3600)}h {int(state['uptime'] % 3600 // 60)}m")
+    print(f"📅 Started: {_format_time(state['started'])}")
+    print(f"🔄 Running: {state['running']}, Queued: {state['queued']}")
+    print(f"📅 Checked: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print()
+    
+    print("📋 Script Status (live):")
+    print("-" * 40)
+    for script_name, info in state['scripts'].items():
+        stats = info['stats']
+        print(f"🔄 {script_name.upper()} Script:")
+        print(f"   Mode: {info['mode']}, Interval: {info['interval']}s, Timeout: {info['timeout']}s")
+        if info['state'] == 'running':
+            print(f"   Status: 🔄 RUNNING (since {info['running_for']:.1f}s)")
+        elif info['state'] == 'stopping':
+            print(f"   Status: ⏳ STOPPING (cancelled plugin run still busy, since {info['running_for']:.1f}s)")
+        elif info['state'] == 'queued':
+            print("   Status: ⏳ QUEUED (waiting for job slot)")
+        elif info['state'] == 'disabled':
+            print("   Status: ⏹️  DISABLED")
+        else:
+            print("   Status: ⏸️  IDLE")
+        
+        total = stats['total_runs']
+        success_rate = (stats['successful_runs'] / total * 100) if total > 0 else 0
+        print(f"   Total runs: {total} (successful: {stats['successful_runs']}, failed: {stats['failed_runs']})")
+        print(f"   Success Rate: {success_rate:.1f}%")
+        print(f"   Last run: {_format_time(stats['last_run'])}"
+              + (f" ({stats['last_status']}, {stats['last_duration']:.1f}s)" if stats['last_duration'] is not None else ""))
+        if info['next_run']:
+            print(f"   Next run: {_format_time(info['next_run'])}")
+        if stats['last_lag'] is not None:
+            print(f"   Schedule Lag: {stats['last_lag']:.2f}s (max {stats['max_lag']:.2f}s)")
+        if stats['missed_ticks'] or stats['skipped_runs']:
+            print(f"   Missed Ticks: {stats['missed_ticks']}, Skipped: {stats['skipped_runs']}")
+        print()
+    
+    print_run_history([state.get('runlog_dir')])
+    print("="*60)
+
 def print_status():
-    """Zeigt den Status an"""
+    """Zeigt den Status an (aus den Logs)"""
     print("\n" + "="*60)
     print("📊 EDGE MONITORING DAEMON STATUS")
     print("="*60)
@@ -143,6 +283,8 @@ def print_status():
     
     print()
     
+    print_run_history(RUNLOG_DIRS)
+    
     # Log-Ausgabe
     print("📋 Recent Log Entries:")
     print("-" * 40)
@@ -156,4 +298,31 @@ def print_status():
     print("💡 Oder: journalctl -u edge-monitoring.service --since '5 minutes ago'")
 
 if __name__ == "__main__":
-    print_status()
+    parser = argparse.ArgumentParser(description='Status des Edge Monitoring Daemons')
+    parser.add_argument('--socket', help='Pfad zum Status-Socket des Daemons')
+    parser.add_argument('--json', action='store_true', help='Live-Zustand als JSON ausgeben')
+    parser.add_argument('--logs', action='store_true', help='Status nur aus den Logs ermitteln')
+    parser.add_argument('--sensors', nargs='?', const='', metavar='HOST',
+                        help='Sensor-Trends aus den lokalen Zeitreihen (optional nur ein Host)')
+    parser.add_argument('--minutes', type=float, default=60, help='Zeitfenster für --sensors')
+    parser.add_argument('--tsdb-dir', help='Verzeichnis der lokalen Zeitreihen (Default: EDGE_TSDB_DIR)')
+    args = parser.parse_args()
+    
+    if args.sensors is not None:
+        # Nur lokale Daten, braucht weder Daemon noch Uplink
+        found = print_sensor_trends(args.sensors or None, args.minutes, args.tsdb_dir)
+        raise SystemExit(0 if found else 1)
+    
+    state = None
+    if not args.logs:
+        state = query_daemon([args.socket] if args.socket else SOCKET_PATHS)
+    
+    if state is not None:
+        if args.json:
+            print(json.dumps(state, indent=2))
+        else:
+            print_live_status(state)
+    else:
+        if not args.logs:
+            print("⚠️  Status-Socket nicht erreichbar, werte Logs aus")
+        print_status()
@@ -0,0 +1,10 @@
+"""
+pytest-Setup für die Helfer-Module der Edge-Collectors
+Die Module liegen flach neben den Collectors (/opt/python_scripts), die
+Tests importieren sie deshalb direkt aus dem übergeordneten Verzeichnis.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
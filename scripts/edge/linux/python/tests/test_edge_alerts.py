@@ -0,0 +1,108 @@
+"""Alerts: Zustandswechsel mit Hysterese, Sensoren ohne Aussage, Regeln und Alert-Dokument"""
+
+import pytest
+
+from edge_alerts import AlertEvaluator, build_alert_doc, load_rules
+
+RULES = [{"name": "cpu", "sensor": "CPU*", "dataset": "temp", "warning": 80, "critical": 90, "hysteresis": 2}]
+
+def make_evaluator(tmp_path, rules=RULES, **kwargs) -> AlertEvaluator:
+    return AlertEvaluator(str(tmp_path / "alerts.json"), rules, **kwargs)
+
+def states(evaluator: AlertEvaluator, values, **kwargs):
+    """Ergebnis pro Messwert: neuer Zustand bei Wechsel, sonst None"""
+    result = []
+    for value in values:
+        alert = evaluator.evaluate("srv-01/CPU1", "temp", "srv-01", "CPU1", value, **kwargs)
+        result.append(alert and alert["state"])
+    return result
+
+def test_hysteresis_transitions(tmp_path):
+    evaluator = make_evaluator(tmp_path)
+    # Erstes "ok" ist kein Alert; Entwarnung erst 2 Grad unter der Schwelle
+    assert states(evaluator, [70, 85, 79, 78.5, 77]) == [None, "warning", None, None, "ok"]
+    assert states(evaluator, [95, 89, 87, 79, 60]) == ["critical", None, "warning", None, "ok"]
+    assert evaluator.stats["breaches"] == 2
+    assert evaluator.stats["recoveries"] == 3
+
+def test_escalation_uses_threshold_without_hysteresis(tmp_path):
+    evaluator = make_evaluator(tmp_path)
+    assert states(evaluator, [79, 89.5, 90]) == [None, "warning", "critical"]
+
+def test_alert_fields(tmp_path):
+    evaluator = make_evaluator(tmp_path)
+    alert = evaluator.evaluate("srv-01/CPU1", "temp", "srv-01", "CPU1", 92)
+    assert alert == {"state": "critical", "previous": "ok", "value": 92, "threshold": 90.0,
+                     "direction": "upper", "source": "rule:cpu"}
+
+def test_relative_hysteresis_for_device_thresholds(tmp_path):
+    evaluator = make_evaluator(tmp_path, rules=[], hysteresis_pct=5)
+    device = {"upper_critical": ("critical", 100.0)}
+    assert states(evaluator, [101, 96, 94], device=device) == ["critical", None, "ok"]
+
+def test_lower_thresholds(tmp_path):
+    rules = [{"sensor": "FAN*", "low_warning": 1000, "low_critical": 500, "hysteresis": 100}]
+    evaluator = make_evaluator(tmp_path, rules=rules)
+    result = []
+    for value in (3000, 900, 1050, 1150, 400):
+        alert = evaluator.evaluate("srv-01/FAN1", "fan", "srv-01", "FAN1", value)
+        result.append(alert and alert["state"])
+    assert result == [None, "warning", None, "ok", "critical"]
+
+def test_sensor_without_reading_keeps_state(tmp_path):
+    evaluator = make_evaluator(tmp_path)
+    assert states(evaluator, [95]) == ["critical"]
+    # Nicht vorhanden bzw. kein Messwert: keine falsche Entwarnung
+    assert states(evaluator, [None, None], present=False) == [None, None]
+    assert states(evaluator, [None]) == [None]
+    assert evaluator.sensors["srv-01/CPU1"]["level"] == "critical"
+    assert evaluator.stats["skipped"] == 3
+    assert states(evaluator, [50]) == ["ok"]
+
+def test_status_level_without_thresholds(tmp_path):
+    evaluator = make_evaluator(tmp_path, rules=[])
+    assert states(evaluator, [None], status_level="ok") == [None]
+    assert states(evaluator, [None, None], status_level="critical") == ["critical", None]
+    assert states(evaluator, [None], status_level="ok") == ["ok"]
+
+def test_state_survives_reload(tmp_path):
+    evaluator = make_evaluator(tmp_path)
+    assert states(evaluator, [85]) == ["warning"]
+    evaluator.save()
+
+    reloaded = make_evaluator(tmp_path)
+    assert states(reloaded, [84, 77]) == [None, "ok"]
+
+def test_rule_filters(tmp_path):
+    evaluator = make_evaluator(tmp_path)
+    assert evaluator.thresholds("thermal", "srv-01", "CPU1") == []
+    assert evaluator.thresholds("temp", "srv-01", "Inlet") == []
+    assert len(evaluator.thresholds("temp", "srv-01", "CPU1")) == 2
+
+def test_load_rules_skips_invalid(tmp_path):
+    path = tmp_path / "alerts.yml"
+    path.write_text(
+        "rules:\n"
+        "  - sensor: 'CPU*'\n"
+        "    critical: 90\n"
+        "  - sensor: 'Inlet*'\n"
+        "  - sensor: 'FAN*'\n"
+        "    low_warning: 1000\n"
+        "    hysteresis: -5\n"
+    )
+    assert load_rules(str(path)) == [{"sensor": "CPU*", "critical": 90}]
+    assert load_rules(str(tmp_path / "fehlt.yml")) == []
+
+@pytest.mark.parametrize("previous, state, event_type, action", [
+    ("ok", "warning", ["start"], "threshold-breach"),
+    ("warning", "critical", ["change"], "threshold-breach"),
+    ("critical", "ok", ["end"], "threshold-recovery"),
+])
+def test_build_alert_doc(previous, state, event_type, action):
+    metric_doc = {"event": {"kind": "metric", "dataset": "temp"}, "edge": {"delta": True}, "host": {"name": "srv-01"}}
+    alert = {"state": state, "previous": previous, "value": 91, "threshold": None}
+    doc = build_alert_doc(metric_doc, alert)
+    assert doc["event"]["type"] == event_type
+    assert doc["event"]["action"] == action
+    assert doc["edge"] == {"alert": {"state": state, "previous": previous, "value": 91}}
+    assert metric_doc["event"]["kind"] == "metric"
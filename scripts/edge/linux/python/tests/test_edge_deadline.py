@@ -0,0 +1,69 @@
+"""Deadline: Timeout pro Abfrage aus Restbudget und Reserve, Abbruch, übersprungene Hosts"""
+
+import math
+import threading
+import time
+
+import pytest
+
+from edge_deadline import DEADLINE_ENV, Deadline, DeadlineExceeded
+
+def test_without_deadline_default_timeout():
+    deadline = Deadline(None)
+    assert deadline.remaining() == math.inf
+    assert deadline.timeout(10.0) == 10.0
+    assert deadline.describe() == "keine Deadline"
+
+def test_timeout_capped_to_budget_minus_reserve():
+    deadline = Deadline(time.time() + 30, reserve=5, min_timeout=2)
+    assert deadline.timeout(10.0) == 10.0
+    # Restbudget 30s - 5s Reserve
+    assert 24.0 < deadline.timeout(60.0) <= 25.0
+
+def test_budget_below_min_timeout_raises():
+    deadline = Deadline(time.time() + 6, reserve=5, min_timeout=2)
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(10.0)
+
+def test_short_default_timeout_still_allowed():
+    # Budget ~1.5s reicht für eine Abfrage mit 1s Timeout, auch wenn min_timeout größer ist
+    deadline = Deadline(time.time() + 6.5, reserve=5, min_timeout=2)
+    assert deadline.timeout(1.0) == 1.0
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(10.0)
+
+def test_passed_deadline_raises():
+    deadline = Deadline(time.time() - 1, reserve=0, min_timeout=0.1)
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(10.0)
+
+def test_cancel_raises_even_without_deadline():
+    cancel = threading.Event()
+    deadline = Deadline(None, cancel=cancel)
+    assert deadline.timeout(10.0) == 10.0
+    cancel.set()
+    assert deadline.cancelled
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(10.0)
+
+def test_skipped_and_partial_counts():
+    deadline = Deadline(None)
+    deadline.skip("srv-01")          # gar nichts abgefragt
+    deadline.complete("srv-02")
+    deadline.skip("srv-02")          # nur ein Teil
+    deadline.complete("srv-03")      # vollständig
+    deadline.skip("srv-01")
+    assert deadline.skipped == 1
+    assert deadline.partial == 1
+
+def test_from_env(monkeypatch):
+    at = time.time() + 60
+    monkeypatch.setenv(DEADLINE_ENV, str(at))
+    assert Deadline.from_env().at == at
+    # Plugin-Kontext hat Vorrang vor der Umgebung
+    assert Deadline.from_env(at=at + 10).at == at + 10
+
+@pytest.mark.parametrize("value", ["", "morgen"])
+def test_from_env_missing_or_invalid(monkeypatch, value):
+    monkeypatch.setenv(DEADLINE_ENV, value)
+    assert Deadline.from_env().at is None
@@ -0,0 +1,156 @@
+"""Circuit Breaker: Schwelle, Backoff, Probe und ein Ergebnis pro Host und Lauf"""
+
+import time
+
+import pytest
+
+from edge_health import POLL, PROBE, SKIP, HostHealth, HostOutcomes
+
+def make_health(tmp_path, **kwargs) -> HostHealth:
+    kwargs.setdefault("threshold", 3)
+    kwargs.setdefault("base_backoff", 300)
+    kwargs.setdefault("max_backoff", 3600)
+    return HostHealth(str(tmp_path / "health.json"), **kwargs)
+
+def expire(health: HostHealth, host: str):
+    """Backoff-Fenster als abgelaufen markieren"""
+    health.hosts[host]["until"] = time.time() - 1
+
+def test_polls_until_threshold(tmp_path):
+    health = make_health(tmp_path)
+    for _ in range(2):
+        health.record_failure("srv-01", "timeout")
+        assert health.admit("srv-01") == POLL
+    assert "until" not in health.hosts["srv-01"]
+
+    health.record_failure("srv-01", "timeout")
+    assert health.hosts["srv-01"]["failures"] == 3
+    assert health.admit("srv-01") == SKIP
+    assert health.stats["opened"] == 1
+    assert health.stats["skipped"] == 1
+
+def test_backoff_doubles_per_failure_and_is_capped(tmp_path):
+    health = make_health(tmp_path, threshold=1, base_backoff=100, max_backoff=350)
+    pauses = []
+    for _ in range(4):
+        before = time.time()
+        health.record_failure("srv-01", "timeout")
+        pauses.append(health.hosts["srv-01"]["until"] - before)
+
+    # Basis * 2^k plus bis zu 10 % Jitter, ab dem dritten Fehler auf max_backoff begrenzt
+    for pause, expected in zip(pauses, (100, 200, 350, 350)):
+        assert expected <= pause <= expected * 1.1 + 1
+    assert health.stats["opened"] == 1
+
+def test_probe_after_backoff_and_close_on_success(tmp_path):
+    health = make_health(tmp_path, threshold=2)
+    health.record_failure("srv-01", "timeout")
+    health.record_failure("srv-01", "timeout")
+    assert health.admit("srv-01") == SKIP
+
+    expire(health, "srv-01")
+    assert health.admit("srv-01") == PROBE
+    assert health.stats["probed"] == 1
+
+    health.record_success("srv-01")
+    assert "srv-01" not in health.hosts
+    assert health.stats["recovered"] == 1
+    assert health.admit("srv-01") == POLL
+
+def test_failed_probe_extends_backoff(tmp_path):
+    health = make_health(tmp_path, threshold=1, base_backoff=100, max_backoff=10000)
+    health.record_failure("srv-01", "timeout")
+    expire(health, "srv-01")
+    assert health.admit("srv-01") == PROBE
+
+    before = time.time()
+    health.record_failure("srv-01", "timeout")
+    assert health.admit("srv-01") == SKIP
+    assert health.hosts["srv-01"]["until"] - before >= 200
+    assert health.stats["opened"] == 1
+
+def test_success_below_threshold_resets_counter(tmp_path):
+    health = make_health(tmp_path)
+    health.record_failure("srv-01", "timeout")
+    health.record_failure("srv-01", "timeout")
+    health.record_success("srv-01")
+    health.record_failure("srv-01", "timeout")
+    assert health.hosts["srv-01"]["failures"] == 1
+    assert health.admit("srv-01") == POLL
+    assert health.stats["recovered"] == 0
+
+def test_should_report_once_per_backoff_window(tmp_path):
+    health = make_health(tmp_path, threshold=1)
+    assert not health.should_report("srv-01")
+    health.record_failure("srv-01", "timeout")
+    assert health.should_report("srv-01")
+    assert not health.should_report("srv-01")
+
+    expire(health, "srv-01")
+    health.record_failure("srv-01", "timeout")
+    assert health.should_report("srv-01")
+
+def test_state_survives_reload(tmp_path):
+    health = make_health(tmp_path, threshold=1)
+    health.record_failure("srv-01", "connection refused")
+    health.save()
+
+    reloaded = make_health(tmp_path, threshold=1)
+    assert reloaded.admit("srv-01") == SKIP
+    assert reloaded.info("srv-01")["last_error"] == "connection refused"
+    assert reloaded.info("srv-01")["retry_at"] == health.hosts["srv-01"]["until"]
+
+@pytest.mark.parametrize("content", ["", "{kaputt", "[1, 2]"])
+def test_unreadable_state_starts_empty(tmp_path, content):
+    (tmp_path / "health.json").write_text(content)
+    assert make_health(tmp_path).hosts == {}
+
+# ---- HostOutcomes ----
+def test_outcomes_one_failure_per_run(tmp_path):
+    health = make_health(tmp_path)
+    outcomes = HostOutcomes(health)
+    # Fehler bei einem Datentyp, Erfolg bei einem anderen: der Lauf zählt als Fehler
+    assert outcomes.admit("srv-01") == POLL
+    outcomes.failure("srv-01", "temp: timeout")
+    outcomes.success("srv-01")
+    outcomes.failure("srv-01", "fan: timeout")
+    assert outcomes.admit("srv-01") is None
+
+    assert outcomes.commit() == []
+    assert health.hosts["srv-01"]["failures"] == 1
+    assert health.hosts["srv-01"]["last_error"] == "temp: timeout"
+
+def test_outcomes_admit_decides_once_per_run(tmp_path):
+    health = make_health(tmp_path, threshold=1)
+    health.record_failure("srv-01", "timeout")
+    expire(health, "srv-01")
+    outcomes = HostOutcomes(health)
+
+    assert outcomes.admit("srv-01") == PROBE
+    assert outcomes.admit("srv-01") == PROBE
+    assert health.stats["probed"] == 1
+
+    # Probe im ersten Durchlauf erfolgreich -> weitere Durchläufe fragen normal ab
+    outcomes.success("srv-01")
+    assert outcomes.admit("srv-01") == POLL
+    assert outcomes.commit() == []
+    assert "srv-01" not in health.hosts
+
+def test_outcomes_commit_returns_failed_probes(tmp_path):
+    health = make_health(tmp_path, threshold=1)
+    for host in ("srv-01", "srv-02"):
+        health.record_failure(host, "timeout")
+        expire(health, host)
+    outcomes = HostOutcomes(health)
+
+    assert outcomes.admit("srv-01") == PROBE
+    assert outcomes.admit("srv-02") == PROBE
+    assert outcomes.admit("srv-03") == POLL
+    outcomes.failure("srv-01", "timeout")
+    outcomes.success("srv-02")
+    outcomes.failure("srv-03", "timeout")
+
+    assert outcomes.commit() == ["srv-01"]
+    assert health.hosts["srv-01"]["failures"] == 2
+    assert "srv-02" not in health.hosts
+    assert health.hosts["srv-03"]["failures"] == 1
@@ -0,0 +1,114 @@
+"""Disk-Spool: Rotation, Größen-/Altersgrenzen, Locks und begrenzter Replay"""
+
+import os
+import time
+
+import pytest
+
+from edge_spool import DiskSpool
+
+def doc(i: int, size: int = 20) -> bytes:
+    """Eine NDJSON-Zeile mit genau size Bytes"""
+    line = f'{{"n":{i}}}'.encode()
+    return line + b" " * (size - len(line) - 1) + b"\n"
+
+def test_rotates_by_size_and_replays_in_order(tmp_path):
+    spool = DiskSpool(str(tmp_path), segment_bytes=40)
+    for i in range(5):
+        spool.append(doc(i))
+    assert len(spool.segments()) == 3
+    assert spool.stats["docs_spooled"] == 5
+
+    sent = []
+    docs, size, done = spool.replay(sent.append, chunk_bytes=1000)
+    assert (docs, size, done) == (5, 100, True)
+    assert b"".join(sent) == b"".join(doc(i) for i in range(5))
+    assert spool.segments() == []
+
+def test_rotation_enforces_max_bytes(tmp_path):
+    spool = DiskSpool(str(tmp_path), max_bytes=50, segment_bytes=20)
+    for i in range(5):
+        spool.append(doc(i))
+    # Vor jedem neuen Segment wird auf max_bytes gekürzt, älteste zuerst
+    assert spool.stats["segments_dropped"] == 2
+    sent = []
+    spool.replay(sent.append)
+    assert b"".join(sent) == doc(2) + doc(3) + doc(4)
+
+def test_rotation_drops_old_segments(tmp_path):
+    spool = DiskSpool(str(tmp_path), max_age=3600, segment_bytes=20)
+    spool.append(doc(0))
+    old = spool.segments()[0]
+    past = time.time() - 7200
+    os.utime(old, (past, past))
+    spool.append(doc(1))
+    assert old not in spool.segments()
+    assert spool.stats["segments_dropped"] == 1
+
+def test_open_segment_of_other_process_is_kept(tmp_path):
+    # Zweite Instanz = zweiter Prozess: flock gilt pro geöffneter Datei
+    writer = DiskSpool(str(tmp_path))
+    writer.append(doc(0))
+    other = DiskSpool(str(tmp_path), max_bytes=0, max_age=0)
+
+    other.enforce_limits()
+    assert len(other.segments()) == 1
+    assert other.stats["segments_dropped"] == 0
+
+    sent = []
+    assert other.replay(sent.append) == (0, 0, True)
+    assert sent == []
+
+    writer.seal()
+    assert other.replay(sent.append) == (1, 20, True)
+    assert other.segments() == []
+
+def test_replay_stops_at_max_bytes(tmp_path):
+    spool = DiskSpool(str(tmp_path), segment_bytes=1000)
+    for i in range(10):
+        spool.append(doc(i))
+
+    sent = []
+    docs, size, done = spool.replay(sent.append, chunk_bytes=40, max_bytes=60)
+    # Budget wird vor jedem Chunk geprüft: nach 2 Chunks à 40 Bytes ist es erschöpft
+    assert (docs, size, done) == (4, 80, False)
+    assert spool.pending_bytes() == 120
+
+    docs, size, done = spool.replay(sent.append, chunk_bytes=40)
+    assert (docs, size, done) == (6, 120, True)
+    assert b"".join(sent) == b"".join(doc(i) for i in range(10))
+    assert spool.stats["docs_replayed"] == 10
+
+def test_replay_stops_at_deadline(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    spool.append(doc(0))
+    sent = []
+    assert spool.replay(sent.append, stop_at=time.monotonic() - 1) == (0, 0, False)
+    assert sent == []
+    assert spool.pending_bytes() == 20
+
+def test_failed_write_keeps_unsent_rest(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    for i in range(4):
+        spool.append(doc(i))
+    sent = []
+
+    def write(chunk: bytes):
+        if sent:
+            raise ConnectionRefusedError("Logstash weg")
+        sent.append(chunk)
+
+    with pytest.raises(ConnectionRefusedError):
+        spool.replay(write, chunk_bytes=40)
+    assert sent == [doc(0) + doc(1)]
+
+    rest = []
+    assert spool.replay(rest.append) == (2, 40, True)
+    assert rest == [doc(2) + doc(3)]
+
+def test_line_longer_than_chunk_is_sent_whole(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    spool.append(doc(0, size=100) + doc(1))
+    sent = []
+    spool.replay(sent.append, chunk_bytes=30)
+    assert sent == [doc(0, size=100), doc(1)]
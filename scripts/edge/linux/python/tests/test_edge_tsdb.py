@@ -0,0 +1,106 @@
+"""Ringpuffer: Umlauf, Namenstabelle mit Hash, Kapazitätsgrenzen, Versionswechsel"""
+
+import os
+import struct
+
+import pytest
+
+from edge_tsdb import NAME_TEXT_BYTES, RingStore, slope
+
+def make_store(tmp_path, **kwargs) -> RingStore:
+    kwargs.setdefault("series_cap", 4)
+    kwargs.setdefault("depth", 3)
+    kwargs.setdefault("name_cap", 16)
+    return RingStore(str(tmp_path / "test.ring"), writable=True, **kwargs)
+
+def test_ring_wraps_and_keeps_newest(tmp_path):
+    store = make_store(tmp_path)
+    for i in range(2):
+        store.record("srv-01", "temp/CPU1", 40 + i, ts=1000 + i)
+    assert store.values("srv-01", "temp/CPU1") == ([1000, 1001], [40, 41])
+
+    for i in range(2, 7):
+        store.record("srv-01", "temp/CPU1", 40 + i, ts=1000 + i)
+    # depth 3: nur die letzten drei, älteste zuerst, auch nach mehreren Umläufen
+    assert store.values("srv-01", "temp/CPU1") == ([1004, 1005, 1006], [44, 45, 46])
+    assert store.values("srv-01", "temp/CPU1", n=2) == ([1005, 1006], [45, 46])
+    assert store.values("srv-01", "temp/CPU1", since=1006) == ([1006], [46])
+    assert store.series() == [("srv-01", "temp/CPU1", "", 3)]
+    assert store.stats["written"] == 7
+
+def test_reader_sees_writer(tmp_path):
+    store = make_store(tmp_path)
+    store.record("srv-01", "temp/CPU1", 40, ts=1000, unit="degrees C")
+    reader = RingStore(store.path)
+    assert reader.series() == [("srv-01", "temp/CPU1", "degrees C", 1)]
+
+    # Neue Serien nach dem Öffnen des Lesers
+    store.record("srv-02", "fan/FAN1", 3000, ts=1000)
+    assert reader.values("srv-02", "fan/FAN1") == ([1000], [3000])
+    reader.close()
+    store.close()
+
+def test_long_names_with_same_prefix_stay_apart(tmp_path):
+    store = make_store(tmp_path)
+    prefix = "temp/" + "x" * NAME_TEXT_BYTES
+    store.record("srv-01", prefix + "A", 1, ts=1000)
+    store.record("srv-01", prefix + "B", 2, ts=1000)
+
+    assert store.values("srv-01", prefix + "A") == ([1000], [1])
+    assert store.values("srv-01", prefix + "B") == ([1000], [2])
+    sensors = [sensor for _, sensor, _, _ in store.series("srv-01")]
+    assert len(set(sensors)) == 2
+    for sensor in sensors:
+        assert "…" in sensor
+        # Gekürzter Anzeigename aus series() funktioniert ebenfalls als Schlüssel
+        assert len(store.values("srv-01", sensor)[1]) == 1
+
+    reader = RingStore(store.path)
+    assert reader.values("srv-01", prefix + "B") == ([1000], [2])
+    assert sorted(s for _, s, _, _ in reader.series()) == sorted(sensors)
+    reader.close()
+
+def test_full_series_table_drops(tmp_path):
+    store = make_store(tmp_path, series_cap=2)
+    for sensor in ("a", "b", "c"):
+        store.record("srv-01", sensor, 1, ts=1000)
+    assert store.stats["series_created"] == 2
+    assert store.stats["dropped"] == 1
+    assert store.values("srv-01", "c") == ([], [])
+    # Bestehende Serien werden weiter beschrieben
+    store.record("srv-01", "a", 2, ts=1001)
+    assert store.values("srv-01", "a")[1] == [1, 2]
+
+def test_second_writer_is_refused(tmp_path):
+    store = make_store(tmp_path)
+    with pytest.raises(BlockingIOError):
+        make_store(tmp_path)
+    store.close()
+    make_store(tmp_path).close()
+
+def test_reopen_keeps_values(tmp_path):
+    store = make_store(tmp_path)
+    store.record("srv-01", "temp/CPU1", 40, ts=1000)
+    store.close()
+    store = make_store(tmp_path)
+    store.record("srv-01", "temp/CPU1", 41, ts=1001)
+    assert store.values("srv-01", "temp/CPU1") == ([1000, 1001], [40, 41])
+    assert store.stats["series_created"] == 0
+
+def test_version_1_file_is_recreated(tmp_path):
+    store = make_store(tmp_path)
+    store.record("srv-01", "temp/CPU1", 40, ts=1000)
+    store.close()
+    fd = os.open(str(tmp_path / "test.ring"), os.O_RDWR)
+    os.pwrite(fd, struct.pack("<I", 1), 8)
+    os.close(fd)
+
+    with pytest.raises(ValueError):
+        RingStore(str(tmp_path / "test.ring"))
+    store = make_store(tmp_path)
+    assert store.series() == []
+
+def test_slope():
+    assert slope([0, 60, 120], [10, 11, 12]) == pytest.approx(1 / 60)
+    assert slope([0], [10]) is None
+    assert slope([5, 5], [1, 2]) is None